@@ -1 +1,4 @@
-from .cass import *
\ No newline at end of file
+from .cass import CompactionValidation, AlterCmdGenerator, RebuildCmdGenerator
+
+# The commands the casstools entry points of setup.py refer to.
+__all__ = ["CompactionValidation", "AlterCmdGenerator", "RebuildCmdGenerator"]
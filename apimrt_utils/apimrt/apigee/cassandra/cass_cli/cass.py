@@ -1,9 +1,20 @@
 from cliff.command import Command
-from apimrt.apigee.cassandra.utils.cass_methods import MainCassandra
 from apimrt.apigee.cassandra.utils.comm_util import DEFAULT_CONFIG_FILE_PATH, get_available_compac_checks, \
     DEFAULT_CMD_GEN_DIR, DEFAULT_OUTPUT_PATH
 
-COMPACT_STRATEGY_TYPES = get_available_compac_checks()
+
+def __getattr__(name):
+    # Read from the config file on first use instead of whenever the CLI loads.
+    if name == "COMPACT_STRATEGY_TYPES":
+        return get_available_compac_checks()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def compact_strategy_help():
+    try:
+        return f"Supported compaction strategy checks {get_available_compac_checks()}"
+    except OSError:
+        return "Compaction strategy check defined in --cfg_file"
 
 
 class CompactionValidation(Command):
@@ -14,7 +25,7 @@ class CompactionValidation(Command):
         parser.add_argument("--cass_ips", type=str, required=True,
                             help="Provide cassandra ips as comma seperated values")
         parser.add_argument("--compac_strategy", nargs='?', default="column_family_compaction_strategy", type=str,
-                            help=f"Suppored Compaction stategy checks {COMPACT_STRATEGY_TYPES}")
+                            help=compact_strategy_help())
         parser.add_argument("--cfg_file", nargs='?', default=DEFAULT_CONFIG_FILE_PATH, type=str,
                             help="Provide path to config file")
         parser.add_argument("--output_dir", nargs='?', default=f"{DEFAULT_OUTPUT_PATH}", type=str,
@@ -26,6 +37,8 @@ class CompactionValidation(Command):
         compact_strategy = parsed_args.compac_strategy
         cfg_file = parsed_args.cfg_file
         output_path = parsed_args.output_dir
+        from apimrt.apigee.cassandra.utils.cass_methods import MainCassandra
+
         cass = MainCassandra(cfg_file)
         cass.cassandra_prechecks(cass_ips.split(','), compact_strategy, output_path)
 
@@ -38,7 +51,7 @@ class AlterCmdGenerator(Command):
         parser.add_argument("--cass_ips", type=str, required=True,
                             help="Provide cassandra ips as comma separated values")
         parser.add_argument("--compac_strategy", nargs='?', default="column_family_compaction_strategy", type=str,
-                            help=f"Suppored Compaction stategy checks {COMPACT_STRATEGY_TYPES}")
+                            help=compact_strategy_help())
         parser.add_argument("--cfg_file", nargs='?', default=DEFAULT_CONFIG_FILE_PATH, type=str,
                             help="Provide path to config file")
         parser.add_argument("--cmd_dir", nargs='?', default=f"{DEFAULT_CMD_GEN_DIR}", type=str,
@@ -50,6 +63,8 @@ class AlterCmdGenerator(Command):
         compact_strategy = parsed_args.compac_strategy
         cfg_file = parsed_args.cfg_file
         cmd_dir = parsed_args.cmd_dir
+        from apimrt.apigee.cassandra.utils.cass_methods import MainCassandra
+
         cass = MainCassandra(cfg_file)
         cass.cassandra_alter_command(cass_ips.split(',')[0], compact_strategy, cmd_dir)
 
@@ -62,7 +77,7 @@ class RebuildCmdGenerator(Command):
         parser.add_argument("--cass_ips", type=str, required=True,
                             help="Provide cassandra ips as comma separated values")
         parser.add_argument("--compac_strategy", nargs='?', default="column_family_compaction_strategy", type=str,
-                            help=f"Suppored Compaction stategy checks {COMPACT_STRATEGY_TYPES}")
+                            help=compact_strategy_help())
         parser.add_argument("--cfg_file", nargs='?', default=DEFAULT_CONFIG_FILE_PATH, type=str,
                             help="Provide path to config file")
         parser.add_argument("--cmd_dir", nargs='?', default=f"{DEFAULT_CMD_GEN_DIR}", type=str,
@@ -74,5 +89,7 @@ class RebuildCmdGenerator(Command):
         compact_strategy = parsed_args.compac_strategy
         cfg_file = parsed_args.cfg_file
         cmd_dir = parsed_args.cmd_dir
+        from apimrt.apigee.cassandra.utils.cass_methods import MainCassandra
+
         cass = MainCassandra(cfg_file)
         cass.cassandra_rebuild_command(cass_ips.split(',')[0], compact_strategy, cmd_dir)
@@ -1,3 +1,4 @@
+from functools import lru_cache
 from os import path
 import yaml
 from pathlib import Path
@@ -8,6 +9,7 @@ DEFAULT_CMD_GEN_DIR = "/tmp/casstools"
 DEFAULT_OUTPUT_PATH = "/tmp/cass_validation/outputs"
 
 
+@lru_cache(maxsize=None)
 def get_available_compac_checks():
     with open(DEFAULT_CONFIG_FILE_PATH, 'r') as config_file:
         compact_strategy_types = list(yaml.safe_load(config_file))
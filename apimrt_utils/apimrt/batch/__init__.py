@@ -0,0 +1,65 @@
+"""Runs a sequence of apimrt commands in one process."""
+
+import shlex
+import time
+from typing import Any, Dict, Iterable, Iterator, List
+
+from apimrt.daemon import run_captured
+
+# Commands that cannot be nested in a batch.
+__EXCLUDED_COMMANDS__ = ("batch", "serve")
+
+
+class BatchException(Exception):
+    pass
+
+
+def parse_commands(lines: Iterable[str]) -> List[List[str]]:
+    """Splits the lines of a batch file into command-line arguments.
+
+    Blank lines and `#` comments are skipped, a leading `apimrt` is optional.
+
+    Raises:
+        BatchException: A line cannot be split or runs a command that cannot be nested.
+    """
+
+    commands = []
+    for number, line in enumerate(lines, start=1):
+        try:
+            argv = shlex.split(line, comments=True)
+        except ValueError as excp:
+            raise BatchException(f"line {number}: {excp}") from excp
+        if argv and argv[0] == "apimrt":
+            argv = argv[1:]
+        if not argv:
+            continue
+        if argv[0] in __EXCLUDED_COMMANDS__:
+            raise BatchException(f"line {number}: {argv[0]} cannot run in a batch")
+        commands.append(argv)
+    return commands
+
+
+def run_batch(commands: Iterable[List[str]], stop_on_error: bool = False) -> Iterator[Dict[str, Any]]:
+    """Runs the commands one after the other, sharing the caches of this process.
+
+    Args:
+        commands: command-line arguments of each command
+        stop_on_error: skip the remaining commands after one fails
+
+    Yields:
+        The command, its exit code, stdout, stderr and duration in seconds, as
+        soon as it finished.
+    """
+
+    for argv in commands:
+        start = time.monotonic()
+        exit_code, stdout, stderr = run_captured(argv)
+        yield {
+            "command": argv,
+            "exit_code": exit_code,
+            "stdout": stdout,
+            "stderr": stderr,
+            "duration": round(time.monotonic() - start, 3),
+        }
+        if exit_code != 0 and stop_on_error:
+            return
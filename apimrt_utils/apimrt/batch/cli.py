@@ -0,0 +1,68 @@
+import json
+import sys
+from argparse import ArgumentParser, Namespace
+
+from cliff.command import Command
+
+from . import BatchException, parse_commands, run_batch
+
+
+class BatchCLI(Command):
+    """Command-line interface for running many apimrt commands in one process.
+
+    Args:
+        Command (Command): Registers the BatchCLI as a cliff `Command`.
+    """
+
+    def get_parser(self, prog_name: str) -> ArgumentParser:
+        """Parses the command-line arguments supplied to the batch command.
+
+        Args:
+            prog_name (str): The name of the program.
+
+        Returns:
+            ArgumentParser: The argument parser object.
+        """
+
+        parser = super(BatchCLI, self).get_parser(prog_name)
+        parser.add_argument(
+            "-f",
+            "--file",
+            dest="file",
+            help="File with one apimrt command per line, - reads the commands from stdin",
+            default="-",
+        )
+        parser.add_argument(
+            "--stop_on_error",
+            dest="stop_on_error",
+            help="Skip the remaining commands once a command fails",
+            action="store_true",
+            default=False,
+        )
+        return parser
+
+    def take_action(self, parsed_args: Namespace):
+        """Runs the commands and prints one JSON result per line as each finishes.
+
+        Args:
+            parsed_args (Namespace): The parsed command-line arguments.
+
+        Returns:
+            int: 0 if every command succeeded, 1 otherwise.
+        """
+
+        try:
+            if parsed_args.file == "-":
+                commands = parse_commands(sys.stdin)
+            else:
+                with open(parsed_args.file, "r") as commands_file:
+                    commands = parse_commands(commands_file)
+        except (BatchException, OSError) as _e:
+            print(_e, file=sys.stderr)
+            return 1
+
+        failed = False
+        for result in run_batch(commands, stop_on_error=parsed_args.stop_on_error):
+            failed = failed or result["exit_code"] != 0
+            print(json.dumps(result), flush=True)
+        return 1 if failed else 0
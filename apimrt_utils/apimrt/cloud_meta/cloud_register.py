@@ -1,17 +1,104 @@
 from abc import ABCMeta, abstractmethod
+from collections.abc import MutableMapping
 import apimrt
+import importlib
+import importlib.util
 import yaml
 import os
 
 from typing import Dict, Optional, List, Tuple, Any, Union
 
-clouds_factory = {}
+from .secrets_cache import cached_secrets, invalidates_secrets
+
+
+class CloudFactory(MutableMapping):
+    """Registry of the clouds by name, importing a cloud's module on first use.
+
+    Clouds are registered with the module defining their CloudMetaRegister
+    subclass, so only the SDKs of the cloud actually used get imported. Clouds
+    whose package is not installed are left out.
+    """
+
+    def __init__(self) -> None:
+        self._modules: Dict[str, str] = {}
+        self._clouds: Dict[str, type] = {}
+
+    def register(self, name: str, module: str) -> None:
+        """Registers the module to import once the cloud is looked up."""
+        try:
+            if importlib.util.find_spec(module) is None:
+                return
+        except ModuleNotFoundError:   # The cloud package is excluded from this build
+            return
+        self._modules[name] = module
+
+    def __getitem__(self, name: str) -> type:
+        if name not in self._clouds and name in self._modules:
+            try:
+                importlib.import_module(self._modules[name])
+            except ModuleNotFoundError as excp:
+                raise KeyError(f"{name}: {excp}") from excp
+        return self._clouds[name]
+
+    def __setitem__(self, name: str, cloud: type) -> None:
+        self._clouds[name] = cloud
+
+    def __delitem__(self, name: str) -> None:
+        self._modules.pop(name, None)
+        del self._clouds[name]
+
+    def __contains__(self, name: object) -> bool:
+        return name in self._clouds or name in self._modules
+
+    def __iter__(self):
+        return iter(dict.fromkeys([*self._modules, *self._clouds]))
+
+    def __len__(self) -> int:
+        return len(set(self._modules) | set(self._clouds))
+
+
+clouds_factory = CloudFactory()
+
+# Secret accessors wrapped with the optional secrets cache on every registered cloud.
+__SECRET_READERS__: Tuple[str, ...] = ("get_secrets",)
+__SECRET_WRITERS__: Tuple[str, ...] = ("update_secrets", "update_secrets_batch")
+
+
+class SecretConflictError(Exception):
+    """Raised when a secret was modified concurrently between reading and writing it."""
+    pass
+
+
+def merge_secrets(current: Dict[str, Any], updates: Dict[str, Any]) -> Tuple[Dict[str, Any], Dict[str, List[str]]]:
+    """Applies the updates to a copy of the current secrets.
+
+    Returns:
+        The merged secrets and the 'added', 'updated' and 'unchanged' key
+        lists. The lists never contain values, so they are safe to print.
+    """
+    merged = dict(current)
+    diff: Dict[str, List[str]] = {"added": [], "updated": [], "unchanged": []}
+    for key, value in updates.items():
+        if key not in current:
+            diff["added"].append(key)
+        elif current[key] != value:
+            diff["updated"].append(key)
+        else:
+            diff["unchanged"].append(key)
+        merged[key] = value
+    return merged, diff
 
 
 class CloudMeta(ABCMeta):
     def __init__(cls, clsname, bases, methods):
         super().__init__(clsname, bases, methods)
         if hasattr(cls, 'name') and cls.name:
+            for method in __SECRET_READERS__:
+                if method in methods:
+                    setattr(cls, method, cached_secrets(methods[method]))
+            for method in __SECRET_WRITERS__:
+                if method in methods:
+                    setattr(cls, method, invalidates_secrets(methods[method]))
             clouds_factory[cls.name] = cls
 
 
@@ -53,6 +140,20 @@ class CloudMetaRegister(metaclass=CloudMeta):
         """
         raise NotImplementedError
 
+    def update_secrets_batch(self, updates: Dict[str, str], secret_name=None, expected_version=None) -> dict:
+        """Applies several key updates with a single write per secret.
+
+        Args:
+            updates: keys and their new values
+            secret_name: if secret name is not passed by default project secrets will be updated
+            expected_version: version the secret must still have, the update is
+                rejected with SecretConflictError otherwise
+
+        Returns:
+            The 'added', 'updated' and 'unchanged' keys and the 'version' written.
+        """
+        raise NotImplementedError
+
     @abstractmethod
     def get_scaling_groups(self) -> List[str]:
         raise NotImplementedError
@@ -0,0 +1,149 @@
+"""Shared client of the instance metadata services of the clouds.
+
+All clouds use one pooled HTTP session with short timeouts. Facts that do not
+change during the life of an instance, like its region, project or instance
+id, are fetched once per process.
+"""
+
+import os
+import threading
+import time
+from typing import Any, Dict, Optional, Tuple
+
+__TIMEOUT_ENV__: str = "APIMRT_METADATA_TIMEOUT"
+
+# Connect and read timeout, the metadata services answer within milliseconds
+# on the instance and not at all anywhere else.
+__TIMEOUT__: Tuple[float, float] = (1.0, 3.0)
+__RETRIES__: int = 2
+
+_session = None
+_session_lock = threading.Lock()
+_memo: Dict[Tuple, Any] = {}
+_tokens: Dict[str, Tuple[str, float]] = {}
+_tokens_lock = threading.Lock()
+
+
+def get_session():
+    """Returns the process wide metadata session."""
+
+    global _session
+    with _session_lock:
+        if _session is None:
+            import requests
+            from requests.adapters import HTTPAdapter
+            from urllib3.util.retry import Retry
+
+            retries = Retry(
+                total=__RETRIES__,
+                backoff_factor=0.2,
+                status_forcelist=(429, 500, 502, 503, 504),
+            )
+            session = requests.Session()
+            session.mount("http://", HTTPAdapter(max_retries=retries))
+            # The metadata endpoints must be reached directly, never through a proxy.
+            session.trust_env = False
+            _session = session
+        return _session
+
+
+def clear_metadata_cache() -> None:
+    """Forgets the memoized facts and tokens, e.g. between tests."""
+
+    _memo.clear()
+    with _tokens_lock:
+        _tokens.clear()
+
+
+def _timeout() -> Tuple[float, float]:
+    try:
+        timeout = float(os.environ[__TIMEOUT_ENV__])
+    except (KeyError, ValueError):
+        return __TIMEOUT__
+    return (timeout, timeout)
+
+
+class MetadataClient:
+    """Client of one cloud's instance metadata service.
+
+    Args:
+        headers: headers the service requires on every request
+        token_url: URL handing out session tokens, e.g. the IMDSv2 token of AWS
+        token_ttl_header: request header with the lifetime of a new token
+        token_header: header passing the token with every request
+        token_ttl: seconds a token is valid
+    """
+
+    def __init__(
+            self,
+            headers: Optional[Dict[str, str]] = None,
+            token_url: Optional[str] = None,
+            token_ttl_header: Optional[str] = None,
+            token_header: Optional[str] = None,
+            token_ttl: int = 21600,
+    ) -> None:
+        self._headers = dict(headers or {})
+        self._token_url = token_url
+        self._token_ttl_header = token_ttl_header
+        self._token_header = token_header
+        self._token_ttl = token_ttl
+
+    def _token(self) -> Optional[str]:
+        """Returns a valid session token, reusing it until shortly before it expires."""
+
+        with _tokens_lock:
+            token, expires = _tokens.get(self._token_url, (None, 0.0))
+            if token is not None and time.monotonic() < expires:
+                return token
+            try:
+                response = get_session().put(
+                    self._token_url,
+                    headers={self._token_ttl_header: str(self._token_ttl)},
+                    timeout=_timeout(),
+                )
+                response.raise_for_status()
+            except Exception:
+                # Token-less requests still work where the tokens are optional.
+                return None
+            token = response.text
+            _tokens[self._token_url] = (token, time.monotonic() + self._token_ttl - 60)
+            return token
+
+    def _get(self, url: str, params: Optional[Dict[str, str]] = None):
+        headers = dict(self._headers)
+        if self._token_url:
+            token = self._token()
+            if token is not None:
+                headers[self._token_header] = token
+        response = get_session().get(url, params=params, headers=headers, timeout=_timeout())
+        response.raise_for_status()
+        return response
+
+    def text(self, url: str, params: Optional[Dict[str, str]] = None, memo: bool = True) -> str:
+        """Fetches a text value.
+
+        Args:
+            url: the metadata URL
+            params: query parameters
+            memo: keep the value for the rest of the process, False for values
+                that change like credentials
+        """
+
+        key = ("text", url, tuple(sorted((params or {}).items())))
+        if memo and key in _memo:
+            return _memo[key]
+        value = self._get(url, params).text
+        if memo:
+            _memo[key] = value
+        return value
+
+    def json(self, url: str, params: Optional[Dict[str, str]] = None, memo: bool = True) -> Any:
+        """Fetches a JSON document, see text."""
+
+        key = ("json", url, tuple(sorted((params or {}).items())))
+        if memo and key in _memo:
+            return _memo[key]
+        value = self._get(url, params).json()
+        if memo:
+            _memo[key] = value
+        return value
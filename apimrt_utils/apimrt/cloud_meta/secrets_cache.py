@@ -0,0 +1,185 @@
+"""Optional read cache for the secrets of the registered clouds.
+
+The cache is off unless `APIMRT_SECRETS_CACHE_TTL` is set to a positive number
+of seconds. Secrets are then kept in process for that long, and additionally
+on disk when `APIMRT_SECRETS_CACHE_DIR` points to a job scoped directory and
+`APIMRT_SECRETS_CACHE_KEY` holds a Fernet key to encrypt the entries with.
+The variables are read on every access, so a changed setting takes effect
+without restarting a long running process. Entries are kept per cloud and
+secret, e.g. `aws-myproject-secret`.
+"""
+
+import copy
+import functools
+import json
+import os
+import re
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional, Tuple
+
+try:
+    from cryptography.fernet import Fernet, InvalidToken
+except ImportError:  # pragma: no cover
+    Fernet = None
+    InvalidToken = Exception
+
+__TTL_ENV__: str = "APIMRT_SECRETS_CACHE_TTL"
+__DIR_ENV__: str = "APIMRT_SECRETS_CACHE_DIR"
+__KEY_ENV__: str = "APIMRT_SECRETS_CACHE_KEY"
+
+_SCOPE_INVALID = re.compile(r"[^A-Za-z0-9_.-]")
+
+
+class SecretsCache:
+    """In-process and encrypted on-disk cache of secrets per cloud.
+
+    Args:
+        ttl: seconds a cached secret is served for, 0 disables the cache
+        cache_dir: directory of the encrypted entries, None keeps them in process only
+        key: Fernet key encrypting the on-disk entries, required for the disk cache
+    """
+
+    def __init__(self, ttl: float = 0, cache_dir: Optional[str] = None, key: Optional[str] = None) -> None:
+        self.config = (ttl, cache_dir, key)
+        self._ttl = ttl
+        self._memory: Dict[str, Tuple[float, Any]] = {}
+        self._lock = threading.Lock()
+        self._cache_dir = Path(cache_dir) if cache_dir and key and Fernet is not None else None
+        self._fernet = Fernet(key) if self._cache_dir is not None else None
+
+    @staticmethod
+    def config_from_env() -> Tuple[float, Optional[str], Optional[str]]:
+        try:
+            ttl = float(os.environ.get(__TTL_ENV__, 0))
+        except ValueError:
+            ttl = 0
+        return ttl, os.environ.get(__DIR_ENV__), os.environ.get(__KEY_ENV__)
+
+    @classmethod
+    def from_env(cls) -> "SecretsCache":
+        return cls(*cls.config_from_env())
+
+    @property
+    def enabled(self) -> bool:
+        return self._ttl > 0
+
+    def _entry_path(self, scope: str) -> Path:
+        return self._cache_dir / f"{scope}.secrets"
+
+    def get(self, scope: str) -> Optional[Any]:
+        """Returns the cached secrets of the scope, or None when missing or expired."""
+
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(scope)
+            if entry and now - entry[0] < self._ttl:
+                return entry[1]
+        if self._cache_dir is None:
+            return None
+        try:
+            with open(self._entry_path(scope), "rb") as entry_file:
+                # The token timestamp enforces the time to live on disk.
+                data = self._fernet.decrypt(entry_file.read(), ttl=int(self._ttl))
+        except (OSError, InvalidToken):
+            return None
+        cached_at, secrets = json.loads(data)
+        with self._lock:
+            self._memory[scope] = (cached_at, secrets)
+        return secrets
+
+    def put(self, scope: str, secrets: Any) -> None:
+        now = time.time()
+        with self._lock:
+            self._memory[scope] = (now, secrets)
+        if self._cache_dir is None:
+            return
+        try:
+            self._cache_dir.mkdir(mode=0o700, parents=True, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=self._cache_dir, prefix=f".{scope}-")
+            try:
+                with os.fdopen(fd, "wb") as tmp_file:
+                    tmp_file.write(self._fernet.encrypt(json.dumps([now, secrets]).encode("utf-8")))
+                os.replace(tmp_path, self._entry_path(scope))
+            except BaseException:
+                os.unlink(tmp_path)
+                raise
+        except OSError:
+            # The secrets were fetched fine, only the next process pays for a miss.
+            pass
+
+    def invalidate(self, scope: str) -> None:
+        with self._lock:
+            self._memory.pop(scope, None)
+        if self._cache_dir is None:
+            return
+        try:
+            os.unlink(self._entry_path(scope))
+        except FileNotFoundError:
+            pass
+
+
+_cache: Optional[SecretsCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_secrets_cache() -> SecretsCache:
+    """Returns the process wide cache, recreated whenever its environment changes."""
+
+    global _cache
+    config = SecretsCache.config_from_env()
+    with _cache_lock:
+        if _cache is None or _cache.config != config:
+            _cache = SecretsCache(*config)
+        return _cache
+
+
+def reset_secrets_cache() -> None:
+    """Drops the process wide cache and the secrets it keeps in process."""
+
+    global _cache
+    with _cache_lock:
+        _cache = None
+
+
+def secrets_scope(cloud: Any) -> str:
+    """The cache entry of the cloud's project secret, e.g. aws-myproject-secret."""
+
+    return _SCOPE_INVALID.sub("_", f"{cloud.name}-{cloud.get_project_secret_name()}")
+
+
+def cached_secrets(get_secrets: Callable) -> Callable:
+    """Serves the cloud's default project secrets from the cache."""
+
+    @functools.wraps(get_secrets)
+    def wrapper(self, *args, **kwargs):
+        cache = get_secrets_cache()
+        if not cache.enabled or args or kwargs:
+            return get_secrets(self, *args, **kwargs)
+        scope = secrets_scope(self)
+        secrets = cache.get(scope)
+        if secrets is None:
+            secrets = get_secrets(self)
+            if secrets is not None:
+                cache.put(scope, secrets)
+        # Callers get their own copy, changing it must not change the cache.
+        return copy.deepcopy(secrets)
+
+    return wrapper
+
+
+def invalidates_secrets(update_secrets: Callable) -> Callable:
+    """Drops the cached secrets of the cloud once they are modified."""
+
+    @functools.wraps(update_secrets)
+    def wrapper(self, *args, **kwargs):
+        try:
+            return update_secrets(self, *args, **kwargs)
+        finally:
+            cache = get_secrets_cache()
+            if cache.enabled:
+                cache.invalidate(secrets_scope(self))
+
+    return wrapper
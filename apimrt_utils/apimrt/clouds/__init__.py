@@ -1,21 +1,13 @@
-import os
-import importlib
-import pkgutil
-
-
-def find_modules(package_name):
-    modules = []
-    for _, module_name, ispkg in pkgutil.walk_packages(package_name.__path__, package_name.__name__ + "."):
-        try:
-            if ispkg:
-                modules += find_modules(importlib.import_module(module_name))
-            else:
-                modules.append(importlib.import_module(module_name))
-        except ModuleNotFoundError:   # It will not load other cloud modules because of missing dependencies
-            pass
-
-    return modules
-
-for module in find_modules(__import__(__name__, fromlist=["*"])):
-    globals()[module.__name__] = module
-
+from apimrt.cloud_meta import cloud_register
+
+# Module defining each cloud, imported only once that cloud is used.
+__CLOUD_MODULES__ = {
+    'alibaba': 'apimrt.clouds.alibaba.alibaba_meta',
+    'aws': 'apimrt.clouds.aws.aws_meta',
+    'azure': 'apimrt.clouds.azure.azure_meta',
+    'cc3': 'apimrt.clouds.cc3.cc3_meta',
+    'gcp': 'apimrt.clouds.gcp.gcp_meta',
+}
+
+for name, module in __CLOUD_MODULES__.items():
+    cloud_register.clouds_factory.register(name, module)
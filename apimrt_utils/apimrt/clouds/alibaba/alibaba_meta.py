@@ -1,6 +1,7 @@
 from apimrt.cloud_meta.cloud_register import CloudMetaRegister
+from apimrt.cloud_meta.metadata import MetadataClient
 from apimrt.clouds.alibaba.alibaba_utils import AliBabaUtil
-import requests
+from functools import cached_property
 from typing import Any
 import logging
 
@@ -11,15 +12,16 @@ class AlibabaMeta(CloudMetaRegister):
     name = 'alibaba'
     metadata_url = "http://100.100.100.200/latest/dynamic/instance-identity/document"
     metadata_sts_url = "http://100.100.100.200/latest/meta-data/ram/security-credentials/"
+    metadata = MetadataClient()
 
-    def __init__(self) -> None:
-        resp: Any = requests.get(self.metadata_url).json()
-        self._METADATA = resp
-        role: Any = requests.get(self.metadata_sts_url)
-        if role.status_code == 200:
-            sts_resp: Any = requests.get(
-                f"{self.metadata_sts_url}{role.text}").json()
-            self._METADATA_STS = sts_resp
+    @property
+    def _METADATA(self) -> Any:
+        return self.metadata.json(self.metadata_url)
+
+    @cached_property
+    def _METADATA_STS(self) -> Any:
+        # The STS credentials expire, they are kept for the life of this object only.
+        return self.metadata.json(f"{self.metadata_sts_url}{self.get_role_name()}", memo=False)
 
     def get_region_id(self) -> str:
         return self._METADATA["region-id"]
@@ -57,6 +59,12 @@ class AlibabaMeta(CloudMetaRegister):
             secret_name = f"{secret_name}"
         return ali_util.update_secrets(key,value,secret_name)
 
+    def update_secrets_batch(self, updates, secret_name=None, expected_version=None):
+        ali_util = self.get_ali_util()
+        if secret_name is None:
+            secret_name = self.get_project_secret_name()
+        return ali_util.update_secrets_batch(updates, secret_name, expected_version)
+
     def get_scaling_groups(self):
         ali_util = self.get_ali_util()
         asg_ids = ali_util.get_scaling_groups(project_name=self.get_project_name())
@@ -87,8 +95,7 @@ class AlibabaMeta(CloudMetaRegister):
         return ali_util.get_instance_tags(instance_id)
 
     def get_role_name(self):
-        role_name = requests.get(self.metadata_sts_url)
-        return role_name.text
+        return self.metadata.text(self.metadata_sts_url)
 
     def flatten_list(self, lst):
         flat_list = []
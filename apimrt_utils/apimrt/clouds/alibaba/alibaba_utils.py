@@ -22,8 +22,13 @@ from aliyunsdkram.request.v20150501.ListPoliciesForRoleRequest import ListPolici
 from aliyunsdkram.request.v20150501.GetPolicyRequest import GetPolicyRequest
 from aliyunsdkecs.request.v20140526.DescribeSnapshotsRequest import DescribeSnapshotsRequest
 from aliyunsdkkms.request.v20160120 import UpdateSecretRequest
+from aliyunsdkkms.request.v20160120.PutSecretValueRequest import PutSecretValueRequest
 from oss2.exceptions import NoSuchBucket
+
+from apimrt.cloud_meta.cloud_register import SecretConflictError, merge_secrets
 import logging
+import uuid
+from typing import Any, Dict, Optional
 
 logger = logging.getLogger(__name__)
 # logging.basicConfig(level=logging.INFO, format="%(asctime)s %(message)s", datefmt="%Y-%m-%d %H:%M:%S")
@@ -124,6 +129,31 @@ class AliBabaUtil:
             logger.error(f"UnexpectedError: {excp}")
             raise excp
 
+    def update_secrets_batch(self, updates: Dict[str, str], secret_name: str,
+                             expected_version: Optional[str] = None) -> Dict[str, Any]:
+        """Stores one new secret version with all updates applied to the current one.
+
+        KMS has no conditional write, the version is only checked between
+        reading and writing, a writer racing in that window is not detected.
+        """
+        request = GetSecretValueRequest()
+        request.set_SecretName(secret_name)
+        response = self._send_request(request)
+        version = response['VersionId']
+        if expected_version is not None and version != expected_version:
+            raise SecretConflictError(f"{secret_name} is at version {version}, expected {expected_version}")
+        merged, diff = merge_secrets(json.loads(response['SecretData']), updates)
+        if not diff['added'] and not diff['updated']:
+            return {**diff, 'version': version}
+
+        new_version = str(uuid.uuid4())
+        request = PutSecretValueRequest()
+        request.set_SecretName(secret_name)
+        request.set_VersionId(new_version)
+        request.set_SecretData(json.dumps(merged))
+        self._send_request(request)
+        return {**diff, 'version': new_version}
+
 
     def get_instance_private_ip(self, instance_id: str) -> str:
         try:
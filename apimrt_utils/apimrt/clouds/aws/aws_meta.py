@@ -1,5 +1,5 @@
 from apimrt.cloud_meta import CloudMetaRegister
-import requests
+from apimrt.cloud_meta.metadata import MetadataClient
 from apimrt.clouds.aws.aws_utils import AwsUtil
 
 
@@ -7,24 +7,24 @@ class AwsMeta(CloudMetaRegister):
     name = 'aws'
 
     metadata_url = "http://169.254.169.254/latest/meta-data"
+    metadata = MetadataClient(
+        token_url="http://169.254.169.254/latest/api/token",
+        token_ttl_header="X-aws-ec2-metadata-token-ttl-seconds",
+        token_header="X-aws-ec2-metadata-token",
+    )
 
     def get_region(self):
-        headers = {}
-        return requests.get(f"{self.metadata_url}/placement/region").text
+        return self.metadata.text(f"{self.metadata_url}/placement/region")
 
     def get_project_name(self):
-        headers = {}
-        return requests.get(
-            f"{self.metadata_url}/tags/instance/Project"
-        ).text
+        return self.metadata.text(f"{self.metadata_url}/tags/instance/Project")
 
     def get_secrets(self):
         aws_obj = AwsUtil(self.get_region())
         return aws_obj.get_secrets(f"{self.get_project_name()}-secret")
 
     def get_instance_profile_name(self):
-        response = requests.get(f'{self.metadata_url}/iam/info')
-        instance_profile_arn = response.json()['InstanceProfileArn']
+        instance_profile_arn = self.metadata.json(f'{self.metadata_url}/iam/info')['InstanceProfileArn']
         instance_profile_name = instance_profile_arn.split('/')[-1]
         return instance_profile_name
 
@@ -70,6 +70,12 @@ class AwsMeta(CloudMetaRegister):
             secret_name = self.get_project_secret_name()
         return aws_obj.update_secrets(key,value,secret_name)
 
+    def update_secrets_batch(self, updates, secret_name=None, expected_version=None):
+        aws_obj = AwsUtil(self.get_region())
+        if secret_name is None:
+            secret_name = self.get_project_secret_name()
+        return aws_obj.update_secrets_batch(updates, secret_name, expected_version)
+
     def get_scaling_groups(self):
         aws_obj = AwsUtil(self.get_region())
         return aws_obj.get_asg_list_by_tag('Project', self.get_project_name())
@@ -1,14 +1,41 @@
 import base64
 import boto3
+from botocore.config import Config
 from botocore.exceptions import ClientError, WaiterError
-from typing import Any, Dict, List, Optional, Union
+from typing import Any, Dict, List, Optional, Tuple, Union
 import json
 import logging
+import threading
 from datetime import datetime
 import time
 
+from apimrt.cloud_meta.cloud_register import SecretConflictError, merge_secrets
+
 logger = logging.getLogger(__name__)
 
+# Shared by all clients, the pool is sized for the concurrent calls of the
+# threaded helpers and the retries back off on throttling.
+__CLIENT_CONFIG__: Config = Config(
+    max_pool_connections=32,
+    connect_timeout=5,
+    read_timeout=60,
+    retries={'mode': 'standard', 'max_attempts': 5},
+)
+
+# Clients are thread safe and shared by the process, resources are not and are
+# kept per thread. Both are keyed by (service, region).
+_clients: Dict[Tuple[str, Optional[str]], Any] = {}
+_clients_lock = threading.Lock()
+_resources = threading.local()
+
+
+def clear_client_cache() -> None:
+    """Drops the cached clients and resources, e.g. between tests."""
+
+    with _clients_lock:
+        _clients.clear()
+    _resources.cache = {}
+
 
 # logging.basicConfig(level=logging.INFO, format="%(asctime)s %(message)s", datefmt="%Y-%m-%d %H:%M:%S")
 
@@ -75,20 +102,38 @@ class AwsUtil:
         self.region = region
 
     def get_client(self, client_type):
-        """
+        """Returns the process wide client of a service in this region.
 
         :param client_type:
         :return:
         """
-        return boto3.client(client_type, self.region)
+        key = (client_type, self.region)
+        client = _clients.get(key)
+        if client is None:
+            # Creating clients from the shared default session is not thread safe.
+            with _clients_lock:
+                client = _clients.get(key)
+                if client is None:
+                    client = boto3.client(client_type, self.region, config=__CLIENT_CONFIG__)
+                    _clients[key] = client
+        return client
 
     def get_resource(self, client_type):
-        """
+        """Returns this thread's resource of a service in this region.
 
         :param client_type:
         :return:
         """
-        return boto3.resource(client_type, self.region)
+        cache = getattr(_resources, 'cache', None)
+        if cache is None:
+            cache = _resources.cache = {}
+        key = (client_type, self.region)
+        resource = cache.get(key)
+        if resource is None:
+            with _clients_lock:
+                resource = boto3.resource(client_type, self.region, config=__CLIENT_CONFIG__)
+            cache[key] = resource
+        return resource
 
     def complete_lifecycle_action(self, LifecycleHookName: str, AutoScalingGroupName: str, EC2InstanceId: str,
                                   LifecycleActionToken: str,
@@ -695,3 +740,58 @@ class AwsUtil:
         except Exception as excp:
             logger.error(f"UpdateFailedError: {excp}")
             raise excp
+
+    def update_secrets_batch(self, updates: Dict[str, str], secretname: str,
+                             expected_version: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Writes all updates as one new secret version and promotes it to AWSCURRENT
+        only if the version it was based on is still current.
+        :param updates: keys and their new values
+        :param secretname: secrets manager name
+        :param expected_version: version id the secret must still have
+        :return: added, updated and unchanged keys and the current version id
+        """
+        client = self.get_client("secretsmanager")
+        resp = client.get_secret_value(SecretId=secretname)
+        version = resp['VersionId']
+        if expected_version is not None and version != expected_version:
+            raise SecretConflictError(f"{secretname} is at version {version}, expected {expected_version}")
+        current = json.loads(resp['SecretString'] if 'SecretString' in resp else resp['SecretBinary'])
+        merged, diff = merge_secrets(current, updates)
+        if not diff['added'] and not diff['updated']:
+            return {**diff, 'version': version}
+
+        new_version = client.put_secret_value(
+            SecretId=secretname,
+            SecretString=json.dumps(merged),
+            VersionStages=['AWSPENDING'],
+        )['VersionId']
+        try:
+            # Moving AWSCURRENT fails when it is no longer on the version read above.
+            client.update_secret_version_stage(
+                SecretId=secretname,
+                VersionStage='AWSCURRENT',
+                MoveToVersionId=new_version,
+                RemoveFromVersionId=version,
+            )
+        except ClientError as e:
+            self._remove_pending_stage(client, secretname, new_version)
+            if e.response.get('Error', {}).get('Code') in ('InvalidParameterException', 'InvalidRequestException'):
+                raise SecretConflictError(
+                    f"{secretname} was modified concurrently, version {new_version} was not made current"
+                ) from e
+            logger.error(f"UpdateFailedError: {e}")
+            raise e
+        return {**diff, 'version': new_version}
+
+    @staticmethod
+    def _remove_pending_stage(client, secretname: str, version: str) -> None:
+        """Takes AWSPENDING off a version that was not made current, so no later write or rotation picks it up."""
+        try:
+            client.update_secret_version_stage(
+                SecretId=secretname,
+                VersionStage='AWSPENDING',
+                RemoveFromVersionId=version,
+            )
+        except ClientError as e:
+            logger.error(f"Could not remove AWSPENDING from version {version} of {secretname}: {e}")
@@ -1,16 +1,15 @@
 from apimrt.cloud_meta.cloud_register import CloudMetaRegister
+from apimrt.cloud_meta.metadata import MetadataClient
 from apimrt.clouds.azure.azure_utils import AzureUtil
-import requests
 
 
 class AzureMeta(CloudMetaRegister):
     name = 'azure'
+    metadata = MetadataClient(headers={'Metadata': 'true'})
 
     def get_rg_name(self):
         param = {"api-version": "2021-12-13"}
-        headers = {'Metadata': 'true'}
-        data = requests.get("http://169.254.169.254/metadata/instance", params=param,
-                            headers=headers).json()
+        data = self.metadata.json("http://169.254.169.254/metadata/instance", params=param)
         return data["compute"]["resourceGroupName"]
 
     def get_project_name(self):
@@ -36,6 +35,13 @@ class AzureMeta(CloudMetaRegister):
             secret_name = f"https://{secret_name}.vault.azure.net/"
         return azure_util.update_secrets(key,value,secret_name)
 
+    def update_secrets_batch(self, updates, secret_name=None, expected_version=None):
+        azure_util = AzureUtil(rg_name=self.get_rg_name())
+        if secret_name is None:
+            secret_name = self.get_project_name()
+        return azure_util.update_secrets_batch(
+            updates, f"https://{secret_name}.vault.azure.net/", expected_version)
+
     def get_scaling_groups(self):
         azure_util = AzureUtil(rg_name=self.get_rg_name())
         return azure_util.get_scale_set_name_list()
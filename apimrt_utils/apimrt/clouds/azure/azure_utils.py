@@ -4,9 +4,13 @@ import subprocess
 import json
 import re
 import datetime
+import threading
+import time
 from datetime import timezone
+from concurrent.futures import ThreadPoolExecutor
 from itertools import tee
 from subprocess import CalledProcessError
+from typing import Any, Dict, Iterable, Optional, Tuple
 from azure.mgmt.compute import ComputeManagementClient
 from azure.mgmt.network import NetworkManagementClient
 from azure.mgmt.resource import ResourceManagementClient
@@ -22,8 +26,117 @@ from azure.mgmt.compute.models import VirtualMachineScaleSetStorageProfile, \
     VirtualMachineScaleSet, VirtualMachineScaleSetVMProfile, ImageReference
 from azure.mgmt.compute.models import Snapshot
 
+from apimrt.cloud_meta.cloud_register import SecretConflictError, merge_secrets
+
 logger = logging.getLogger(__name__)
 
+# Seconds before expiry at which a cached token is renewed.
+__TOKEN_REFRESH_MARGIN__: int = 300
+
+# Concurrent requests when reading the secrets of a vault.
+__SECRET_WORKERS__: int = 8
+
+# Scale sets listed at the same time.
+__SCALE_SET_WORKERS__: int = 8
+
+# Blob transfers move blocks of __BLOB_BLOCK_SIZE__ bytes on
+# __BLOB_CONCURRENCY__ connections, which bounds the memory they need.
+__BLOB_CONCURRENCY__: int = 4
+__BLOB_BLOCK_SIZE__: int = 8 * 1024 * 1024
+__BLOB_COPY_POLL_INTERVAL__: float = 1.0
+
+# The IP index is listed again once it is older than __IP_INDEX_TTL__. Within
+# __IP_INDEX_REFRESH_INTERVAL__ of a listing its entries are trusted as they
+# are, after that a hit is checked against the NIC and an unknown IP lists the
+# resource group again, so a batch of lookups for IPs that are gone rebuilds it once.
+__IP_INDEX_TTL__: float = 300.0
+__IP_INDEX_REFRESH_INTERVAL__: float = 30.0
+
+_UNSET = object()
+_lock = threading.RLock()
+_credential = None
+_clients: Dict[Tuple[type, str], Any] = {}
+_ip_indexes: Dict[Tuple[str, str], Dict[str, Dict[str, Any]]] = {}
+_ip_index_built: Dict[Tuple[str, str], float] = {}
+_connection_strings: Dict[Tuple[str, str], str] = {}
+_default_subscription_id: Any = _UNSET
+
+
+def clear_client_cache() -> None:
+    """Forgets the credential, the clients, the IP indexes, the storage connection
+    strings and the subscription looked up with az, e.g. between tests."""
+
+    global _credential, _default_subscription_id
+    with _lock:
+        _credential = None
+        _clients.clear()
+        _ip_indexes.clear()
+        _ip_index_built.clear()
+        _connection_strings.clear()
+        _default_subscription_id = _UNSET
+
+
+class _CachedTokenCredential:
+    """Hands out a token until shortly before it expires.
+
+    The management clients each ask their credential for a token, and the CLI
+    credential starts an az process for every one of them.
+    """
+
+    def __init__(self, credential) -> None:
+        self.credential = credential
+        self._tokens: Dict[Tuple, Any] = {}
+        self._tokens_lock = threading.Lock()
+
+    def get_token(self, *scopes, **kwargs):
+        key = scopes + (kwargs.get('tenant_id'), kwargs.get('claims'))
+        with self._tokens_lock:
+            token = self._tokens.get(key)
+            if token is None or token.expires_on - __TOKEN_REFRESH_MARGIN__ <= time.time():
+                token = self.credential.get_token(*scopes, **kwargs)
+                self._tokens[key] = token
+            return token
+
+    def close(self) -> None:
+        self.credential.close()
+
+
+def _lookup_subscription_id() -> Optional[str]:
+    """The subscription of the logged in az account, asked for once per process.
+
+    az runs without holding _lock, so clients of other subscriptions are not
+    blocked behind it. A failed lookup is not cached and is retried next time.
+    """
+
+    global _default_subscription_id
+    with _lock:
+        if _default_subscription_id is not _UNSET:
+            return _default_subscription_id
+    subscription_id = None
+    try:
+        output = subprocess.check_output('az account show', shell=True)
+        data = json.loads(output)
+        subscription_id = data['id']
+    except CalledProcessError as excp:
+        logger.error(excp)
+    #
+    try:
+        if subscription_id is None:
+            output = subprocess.check_output(
+                'az login --identity', shell=True)
+            data = json.loads(output)
+            subscription_id = data[0]['id']
+    except CalledProcessError as excp:
+        logger.error(excp)
+    if subscription_id is None:
+        return None
+    with _lock:
+        # A concurrent lookup may have published first, every caller sees the same id.
+        if _default_subscription_id is _UNSET:
+            _default_subscription_id = subscription_id
+        return _default_subscription_id
+
+
 class AzureUtil:
     def __init__(self, rg_name: str, subscription_id: str = None) -> str:
         '''
@@ -37,22 +150,8 @@ class AzureUtil:
             self.subscription_id = os.environ.get(
                 'AZURE_SUBSCRIPTION_ID', None)
         #
-        try:
-            if self.subscription_id is None:
-                output = subprocess.check_output('az account show', shell=True)
-                data = json.loads(output)
-                self.subscription_id = data['id']
-        except CalledProcessError as excp:
-            logger.error(excp)
-        #
-        try:
-            if self.subscription_id is None:
-                output = subprocess.check_output(
-                    'az login --identity', shell=True)
-                data = json.loads(output)
-                self.subscription_id = data[0]['id']
-        except CalledProcessError as excp:
-            logger.error(excp)
+        if self.subscription_id is None:
+            self.subscription_id = _lookup_subscription_id()
 
     def get_credential_chain(self):
         mgmt_cred = ManagedIdentityCredential()
@@ -61,45 +160,61 @@ class AzureUtil:
         default_cred = DefaultAzureCredential()
         return ChainedTokenCredential(mgmt_cred, cli_cred, env_cred, default_cred)
 
+    @property
+    def credential(self):
+        """The credential chain shared by all clients of the process, with its tokens cached."""
+
+        global _credential
+        with _lock:
+            if _credential is None:
+                _credential = _CachedTokenCredential(self.get_credential_chain())
+            return _credential
+
+    def _management_client(self, client_class):
+        """Builds a management client on first use and reuses it for the subscription."""
+
+        key = (client_class, self.subscription_id)
+        with _lock:
+            client = _clients.get(key)
+            if client is None:
+                client = client_class(
+                    credential=self.credential,
+                    subscription_id=self.subscription_id
+                    )
+                _clients[key] = client
+            return client
+
     @property
     def compute_client(self):
-        return ComputeManagementClient(
-            credential=self.get_credential_chain(),
-            subscription_id=self.subscription_id
-            )
+        return self._management_client(ComputeManagementClient)
 
     @property
     def network_client(self):
-        return NetworkManagementClient(
-            credential=self.get_credential_chain(),
-            subscription_id=self.subscription_id
-            )
+        return self._management_client(NetworkManagementClient)
 
     @property
     def resource_client(self):
-        return ResourceManagementClient(
-            credential=self.get_credential_chain(),
-            subscription_id=self.subscription_id
-            )
+        return self._management_client(ResourceManagementClient)
 
     @property
     def storage_client(self):
-        return StorageManagementClient(
-            credential=self.get_credential_chain(),
-            subscription_id=self.subscription_id
-            )
+        return self._management_client(StorageManagementClient)
+
     @property
     def authorization_client(self):
-        return AuthorizationManagementClient(
-            credential=self.get_credential_chain(),
-            subscription_id=self.subscription_id
-        )
+        return self._management_client(AuthorizationManagementClient)
 
     def secret_client(self, key_vault_url: str):
-        return SecretClient(
-            credential=self.get_credential_chain(),
-            vault_url=key_vault_url
-            )
+        key = (SecretClient, key_vault_url)
+        with _lock:
+            client = _clients.get(key)
+            if client is None:
+                client = SecretClient(
+                    credential=self.credential,
+                    vault_url=key_vault_url
+                    )
+                _clients[key] = client
+            return client
 
     def get_rg_name_list(self):
         return [rg.name for rg in self.resource_client.resource_groups.list()]
@@ -117,14 +232,10 @@ class AzureUtil:
                 )]
 
     def get_vm_name_from_ip(self,vm_ip):
-        vm_list = self.get_vm_name_list()
-        for vm in vm_list:
-            nic = vm.network_profile.network_interfaces[0].id
-            nic = nic.split("/")[-1]
-            network_interface = self.compute_client.network_interfaces.get(self.rg_name, nic)
-            for ipconfig in network_interface.ip_configurations:
-                if ipconfig.private_ip_address == vm_ip:
-                    print(vm.name)
+        instance = self.get_instance_from_ip(vm_ip)
+        if instance:
+            print(instance['name'])
+            return instance['name']
 
     def get_scale_set_vm_name_list(self, scale_set_name: str):
         return [vmss.name for vmss in
@@ -152,21 +263,45 @@ class AzureUtil:
             )
 
     def get_scale_set_instance_ip_list(self, scale_set_name: str):
+        # One listing of the instances and one of their NICs, instead of a request per instance.
+        nic_ips = {}
+        for nic in self.network_client.network_interfaces.list_virtual_machine_scale_set_network_interfaces(
+                self.rg_name, scale_set_name):
+            if nic.virtual_machine is not None:
+                nic_ips[(nic.virtual_machine.id.lower(), nic.name)] = {
+                    ip_configuration.name: ip_configuration.private_ip_address
+                    for ip_configuration in nic.ip_configurations}
         ip_list = []
-        scale_set_list = self.get_scale_set_vm_data(scale_set_name)
-        for scale_set in scale_set_list:
+        for scale_set in self.get_scale_set_vm_data(scale_set_name):
             nic_name = scale_set.network_profile_configuration.network_interface_configurations[
                 0].name
             ip_config = scale_set.network_profile_configuration.network_interface_configurations[
                 0].ip_configurations[0].name
             instance_id = scale_set.instance_id
-            ip_address = self.network_client.network_interfaces.get_virtual_machine_scale_set_ip_configuration(
-                self.rg_name, scale_set_name, instance_id, nic_name, ip_config).private_ip_address
+            ip_address = nic_ips.get((scale_set.id.lower(), nic_name), {}).get(ip_config)
+            if ip_address is None:
+                # Created after the NICs were listed.
+                logger.warning(f'No IP address yet for instance {instance_id} of {scale_set_name}')
+                continue
             logger.info(
                 f'NIC name: {nic_name}, IP config: {ip_config}, Instance_ID: {instance_id}, IP address: {ip_address}')
             ip_list.append(ip_address)
         return ip_list
 
+    def get_scale_sets_instance_ip_lists(self, scale_set_names: Optional[Iterable[str]] = None) -> Dict[str, list]:
+        """Lists the instance IPs of several scale sets concurrently.
+
+        :param scale_set_names: all scale sets of the resource group by default
+        :return: scale set name to its instance IPs
+        """
+        if scale_set_names is None:
+            scale_set_names = self.get_scale_set_name_list()
+        scale_set_names = list(scale_set_names)
+        if not scale_set_names:
+            return {}
+        with ThreadPoolExecutor(max_workers=min(__SCALE_SET_WORKERS__, len(scale_set_names))) as executor:
+            return dict(zip(scale_set_names, executor.map(self.get_scale_set_instance_ip_list, scale_set_names)))
+
     def get_scale_set_tags(self, scale_set_name: str):
         return self.get_scale_set_data(scale_set_name).tags
 
@@ -203,85 +338,105 @@ class AzureUtil:
         self.resource_client.tags.create_or_update_at_scope(
             resource_id, tag_body)
 
-    def upload_to_blob(self, container_name: str, blob_name: str, upload_file_path: str, connection_string: str = None):
-        # Example: download_from_blob(container_name='test_container', blob_name='folder_name/file_name', upload_file_path='/home/file_name', connection_string)
+    def blob_service_client(self, connection_string: str = None):
+        """Returns the blob service client of a storage account, the backup account by default."""
         if connection_string is None:
             logger.info('Connection string not provided, using default')
             connection_string = self.storage_connection_string()
-        blob_service_client = BlobServiceClient.from_connection_string(
-            connection_string)
+        key = (BlobServiceClient, connection_string)
+        with _lock:
+            client = _clients.get(key)
+            if client is None:
+                client = BlobServiceClient.from_connection_string(
+                    connection_string,
+                    max_block_size=__BLOB_BLOCK_SIZE__,
+                    max_single_put_size=__BLOB_BLOCK_SIZE__,
+                    max_single_get_size=__BLOB_BLOCK_SIZE__,
+                    max_chunk_get_size=__BLOB_BLOCK_SIZE__,
+                    )
+                _clients[key] = client
+            return client
+
+    @staticmethod
+    def _wait_for_copy(blob_client, copy: Dict[str, Any]) -> None:
+        status = copy['copy_status']
+        while status == 'pending':
+            time.sleep(__BLOB_COPY_POLL_INTERVAL__)
+            status = blob_client.get_blob_properties().copy.status
+        if status != 'success':
+            raise HttpResponseError(message=f'Copy to {blob_client.blob_name} ended with status {status}')
 
-        container_list = blob_service_client.list_containers()
-        if container_name not in [container.name for container in container_list]:
-            blob_service_client.create_container(container_name)
-        else:
-            logger.info(f'Container {container_name} already exists')
+    def upload_to_blob(self, container_name: str, blob_name: str, upload_file_path: str, connection_string: str = None):
+        # Example: download_from_blob(container_name='test_container', blob_name='folder_name/file_name', upload_file_path='/home/file_name', connection_string)
+        blob_service_client = self.blob_service_client(connection_string)
 
         container_client = blob_service_client.get_container_client(
             container_name)
-        blob_list = [blob.name for blob in container_client.list_blobs()]
+        if not container_client.exists():
+            try:
+                container_client.create_container()
+            except ResourceExistsError:
+                logger.info(f'Container {container_name} already exists')
+        else:
+            logger.info(f'Container {container_name} already exists')
+
         logger.info(
             f'Uploading {upload_file_path} to {container_name}/{blob_name}')
-        blob_client = blob_service_client.get_blob_client(
-            container=container_name, blob=blob_name)
+        blob_client = container_client.get_blob_client(blob_name)
 
-        if blob_name in blob_list:
+        if blob_client.exists():
             time_stamp = datetime.datetime.now(
                 datetime.timezone.utc).strftime("%Y%m%dT%H%M%S%f%Z")
             logger.info(
                 f'Blob {blob_name} already exists backing up contents to {blob_name}_backup_{time_stamp}')
-            backup = blob_service_client.get_blob_client(
-                container=container_name, blob=f'{blob_name}_backup_{time_stamp}')
-            file_contents = self.download_from_blob(
-                container_name=container_name, blob_name=blob_name)
-            backup.upload_blob(file_contents, overwrite=True)
+            backup = container_client.get_blob_client(
+                f'{blob_name}_backup_{time_stamp}')
+            # Copied by the storage service, the contents never pass through this host.
+            # The copy has to finish before the blob is overwritten.
+            self._wait_for_copy(backup, backup.start_copy_from_url(blob_client.url))
 
         with open(upload_file_path, "rb") as data:
-            blob_client.upload_blob(data, overwrite=True)
+            blob_client.upload_blob(data, overwrite=True, max_concurrency=__BLOB_CONCURRENCY__)
 
     def download_from_blob(self, container_name: str, blob_name: str, download_file_path: str = None, connection_string: str = None):
         # Example: download_from_blob(container_name='test_container', blob_name='folder_name/file_name', download_file_path='/home/file_name', connection_string)
-        if connection_string is None:
-            logger.info('Connection string not provided, using default')
-            connection_string = self.storage_connection_string()
-        blob_service_client = BlobServiceClient.from_connection_string(
-            connection_string)
-        container_list = blob_service_client.list_containers()
-        if container_name not in [container.name for container in container_list]:
-            logger.error(f'Container {container_name} not found')
-            return
+        blob_service_client = self.blob_service_client(connection_string)
         container_client = blob_service_client.get_container_client(
             container_name)
-        blob_list = [blob.name for blob in container_client.list_blobs()]
-        if blob_name not in blob_list:
+        if not container_client.exists():
+            logger.error(f'Container {container_name} not found')
+            return
+        blob_client = container_client.get_blob_client(blob_name)
+        if not blob_client.exists():
             logger.error(f'Blob {blob_name} not found')
             return
         if download_file_path is None:
             logger.info(
                 f'Downloading {container_name}/{blob_name} content to object')
-            blob_client = blob_service_client.get_blob_client(
-                container=container_name, blob=blob_name)
-            return blob_client.download_blob().readall()
+            return blob_client.download_blob(max_concurrency=__BLOB_CONCURRENCY__).readall()
         else:
             logger.info(
                 f'Downloading {container_name}/{blob_name} to {download_file_path}')
             with open(download_file_path, "wb") as data:
-                blob_client = blob_service_client.get_blob_client(
-                    container=container_name, blob=blob_name)
-                blob_data = blob_client.download_blob()
+                blob_data = blob_client.download_blob(max_concurrency=__BLOB_CONCURRENCY__)
                 blob_data.readinto(data)
 
-    def get_secrets(self, key_vault_url: str):
-        # To be optimized
-        secrets = {}
+    def get_secrets(self, key_vault_url: str, names: Optional[Iterable[str]] = None) -> Dict[str, str]:
+        """Reads the secrets of a vault, several at a time.
+
+        :param key_vault_url: URL of the vault
+        :param names: read only these secrets instead of all secrets of the vault
+        """
+        client = self.secret_client(key_vault_url)
         try:
-            secret_properties = self.secret_client(
-                key_vault_url).list_properties_of_secrets()
-            key_list = [keys.__dict__['_vault_id'].__dict__[
-                '_resource_id'].__dict__['name'] for keys in secret_properties]
-            for key in key_list:
-                secrets[key] = self.get_secret_value(key, key_vault_url)
-            return secrets
+            if names is None:
+                names = [properties.name for properties in client.list_properties_of_secrets()]
+            names = list(names)
+            if not names:
+                return {}
+            with ThreadPoolExecutor(max_workers=min(__SECRET_WORKERS__, len(names))) as executor:
+                values = executor.map(lambda name: client.get_secret(name).value, names)
+                return dict(zip(names, values))
         except ResourceNotFoundError as excp:
             logger.error(excp)
             # return None
@@ -304,6 +459,45 @@ class AzureUtil:
             logger.error(excp)
             raise excp
 
+    def update_secrets_batch(self, updates: Dict[str, str], key_vault_url: str,
+                             expected_version: Optional[Dict[str, str]] = None) -> Dict[str, Any]:
+        """Sets only the changed secrets of the vault, without listing the whole vault.
+
+        Every key is a secret of its own in Key Vault, which has no conditional
+        write. The check is best effort: the versions read at the start, and
+        expected_version[key] when given, are compared once more right before
+        the secrets are set, a writer racing in between is not detected.
+        The secrets are read and set several at a time.
+        """
+        client = self.secret_client(key_vault_url)
+        expected_version = expected_version or {}
+
+        def read(name):
+            try:
+                secret = client.get_secret(name)
+            except ResourceNotFoundError:
+                return None
+            return secret.value, secret.properties.version
+
+        with ThreadPoolExecutor(max_workers=min(__SECRET_WORKERS__, len(updates) or 1)) as executor:
+            secrets = dict(zip(updates, executor.map(read, updates)))
+            current = {name: secret[0] for name, secret in secrets.items() if secret}
+            versions = {name: secret[1] for name, secret in secrets.items() if secret}
+            for name in updates:
+                if name in expected_version and versions.get(name) != expected_version[name]:
+                    if name not in versions:
+                        raise SecretConflictError(f"{name} does not exist, expected version {expected_version[name]}")
+                    raise SecretConflictError(
+                        f"{name} is at version {versions[name]}, expected {expected_version[name]}")
+            merged, diff = merge_secrets(current, updates)
+            changed = diff['added'] + diff['updated']
+
+            for name, secret in zip(changed, executor.map(read, changed)):
+                if (secret[1] if secret else None) != versions.get(name):
+                    raise SecretConflictError(f"{name} was modified concurrently")
+            new_versions = executor.map(lambda name: client.set_secret(name, merged[name]).properties.version, changed)
+            return {**diff, 'version': dict(zip(changed, new_versions))}
+
     def get_storage_account_list(self):
         return list(
             self.storage_client.storage_accounts.list_by_resource_group(
@@ -322,8 +516,13 @@ class AzureUtil:
         return {"storage_account_name": storage_account_name, "key_value": [key.value for key in self.storage_client.storage_accounts.list_keys(self.rg_name, storage_account_name).keys][0]}
 
     def storage_connection_string(self):
-        key_details = self.get_storage_account_key()
-        return f'DefaultEndpointsProtocol=https;AccountName={key_details["storage_account_name"]};AccountKey={key_details["key_value"]};EndpointSuffix=core.windows.net'
+        # Looking the key up takes two ARM requests, it is done once per resource group.
+        key = (self.subscription_id, self.rg_name)
+        with _lock:
+            if key not in _connection_strings:
+                key_details = self.get_storage_account_key()
+                _connection_strings[key] = f'DefaultEndpointsProtocol=https;AccountName={key_details["storage_account_name"]};AccountKey={key_details["key_value"]};EndpointSuffix=core.windows.net'
+            return _connection_strings[key]
 
     def get_image_rg_scaleset(self, scale_set_name):
         scale_set_vms = self.compute_client.virtual_machine_scale_sets.get(
@@ -404,31 +603,110 @@ class AzureUtil:
                 _list.append(itr)
         print(_list)
             
+    @staticmethod
+    def _instance_entry(vm, nic, scale_set=None) -> Dict[str, Any]:
+        if vm is None:
+            # Listed between the VM and the NIC listing, the name is part of the id.
+            return {'name': nic.virtual_machine.id.split('/')[-1], 'id': nic.virtual_machine.id, 'nic': nic.id,
+                    'scale_set': scale_set, 'instance_id': None, 'tags': {}, 'disks': []}
+        storage_profile = getattr(vm, 'storage_profile', None)
+        return {
+            'name': vm.name,
+            'id': vm.id,
+            'nic': nic.id,
+            'scale_set': scale_set,
+            'instance_id': getattr(vm, 'instance_id', None) if scale_set else None,
+            'tags': vm.tags or {},
+            'disks': [disk.name for disk in storage_profile.data_disks] if storage_profile else [],
+        }
+
+    def _index_nics(self, index, nics, vms, scale_set=None) -> None:
+        for nic in nics:
+            if nic.virtual_machine is None:
+                continue
+            entry = self._instance_entry(vms.get(nic.virtual_machine.id.lower()), nic, scale_set)
+            for ip_configuration in nic.ip_configurations:
+                if ip_configuration.private_ip_address:
+                    index[ip_configuration.private_ip_address] = entry
+
+    def get_ip_index(self, rg_name: str = None, refresh: bool = False) -> Dict[str, Dict[str, Any]]:
+        """Maps the private IPs of the VMs and scale set instances of a resource group to them.
+
+        Built from one listing of the NICs and the VMs of the resource group and of
+        each scale set, and kept for __IP_INDEX_TTL__ seconds.
+
+        :param rg_name: resource group, the one of this object by default
+        :param refresh: list the resource group again
+        :return: IP to name, id, nic, scale_set, instance_id, tags and data disk names
+        """
+        rg_name = rg_name or self.rg_name
+        key = (self.subscription_id, rg_name)
+        with _lock:
+            fresh = time.monotonic() - _ip_index_built.get(key, float('-inf')) < __IP_INDEX_TTL__
+            if not refresh and fresh and key in _ip_indexes:
+                return _ip_indexes[key]
+        index = {}
+        vms = {vm.id.lower(): vm for vm in self.compute_client.virtual_machines.list(rg_name)}
+        self._index_nics(index, self.network_client.network_interfaces.list(rg_name), vms)
+        for scale_set in self.compute_client.virtual_machine_scale_sets.list(rg_name):
+            try:
+                vms = {vm.id.lower(): vm for vm in self.compute_client.virtual_machine_scale_set_vms.list(
+                    rg_name, scale_set.name)}
+                nics = list(self.network_client.network_interfaces.list_virtual_machine_scale_set_network_interfaces(
+                    rg_name, scale_set.name))
+            except HttpResponseError as excp:
+                # Instances of flexible scale sets are plain VMs and already indexed.
+                logger.debug(f'Skipping NICs of scale set {scale_set.name}: {excp}')
+                continue
+            self._index_nics(index, nics, vms, scale_set.name)
+        with _lock:
+            _ip_indexes[key] = index
+            _ip_index_built[key] = time.monotonic()
+        return index
+
+    def _nic_has_ip(self, rg_name: str, instance: Dict[str, Any], instance_ip: str) -> bool:
+        """Whether the NIC of an indexed instance still has the IP and belongs to the instance."""
+        nic_name = instance['nic'].split('/')[-1]
+        try:
+            if instance['scale_set']:
+                if instance['instance_id'] is None:
+                    return False
+                nic = self.network_client.network_interfaces.get_virtual_machine_scale_set_network_interface(
+                    rg_name, instance['scale_set'], instance['instance_id'], nic_name)
+            else:
+                nic = self.network_client.network_interfaces.get(rg_name, nic_name)
+        except ResourceNotFoundError:
+            return False
+        return nic.virtual_machine is not None \
+            and nic.virtual_machine.id.lower() == instance['id'].lower() \
+            and any(ip_configuration.private_ip_address == instance_ip for ip_configuration in nic.ip_configurations)
+
+    def get_instance_from_ip(self, instance_ip, rg_name=None) -> Optional[Dict[str, Any]]:
+        """Looks an IP up in the index.
+
+        The index is trusted for __IP_INDEX_REFRESH_INTERVAL__ seconds after it
+        was listed. After that, a hit is checked against its NIC, as the IP may
+        have moved to another instance, and the resource group is listed again
+        when the check fails or the IP is unknown.
+        """
+        rg_name = rg_name or self.rg_name
+        key = (self.subscription_id, rg_name)
+        instance = self.get_ip_index(rg_name).get(instance_ip)
+        with _lock:
+            built = _ip_index_built.get(key, 0.0)
+        if time.monotonic() - built < __IP_INDEX_REFRESH_INTERVAL__:
+            return instance
+        if instance is None or not self._nic_has_ip(rg_name, instance, instance_ip):
+            instance = self.get_ip_index(rg_name, refresh=True).get(instance_ip)
+        return instance
+
     def get_instance_name_from_ip(self, instance_ip, rg_name):
-        nic = self.network_client.network_interfaces.list(rg_name)
-        for n in nic:
-            for ip in n.ip_configurations:
-                if ip.private_ip_address == instance_ip:
-                    vm_name = n.virtual_machine.id.split('/')[-1]
-                    return self.compute_client.virtual_machines.get(rg_name, vm_name).name
-                else:
-                    instance_name = self.get_vmss_instance_name_from_ip(instance_ip, rg_name)
-                    if instance_name:
-                        return instance_name
-    
+        instance = self.get_instance_from_ip(instance_ip, rg_name)
+        return instance['name'] if instance else None
+
     def get_vmss_instance_name_from_ip(self, instance_ip, rg_name):
-        scale_set_list = self.get_scale_set_name_list()
-        for scale_set in scale_set_list:
-            scale_set_data = self.get_scale_set_vm_data(scale_set)
-            for scale_data in scale_set_data:
-                nic_name = scale_data.network_profile_configuration.network_interface_configurations[0].name
-                ip_config = scale_data.network_profile_configuration.network_interface_configurations[
-                            0].ip_configurations[0].name
-                instance_id = scale_data.instance_id
-                ip_address = self.network_client.network_interfaces.get_virtual_machine_scale_set_ip_configuration(
-                rg_name, scale_set, instance_id, nic_name, ip_config).private_ip_address
-                if ip_address == instance_ip:
-                    return scale_data.name
+        instance = self.get_instance_from_ip(instance_ip, rg_name)
+        return instance['name'] if instance and instance['scale_set'] else None
 
     def get_instance_tags(self, instance_name):
         vm = self.compute_client.virtual_machines.get(self.rg_name, instance_name)
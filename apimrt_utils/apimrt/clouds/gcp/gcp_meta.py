@@ -1,25 +1,19 @@
 from apimrt.cloud_meta import CloudMetaRegister
+from apimrt.cloud_meta.metadata import MetadataClient
 from apimrt.clouds.gcp.gcp_utils import GcpUtil
-import requests
 import json
 
 
 class Gcp(CloudMetaRegister):
     name = 'gcp'
     metadata_url = "http://metadata.google.internal/computeMetadata/v1/"
+    metadata = MetadataClient(headers={'Metadata-Flavor': 'Google'})
     
     def get_project_name(self):
-        headers = {}
-        headers['Metadata-Flavor'] = 'Google'
-        project_name = requests.get(f"{self.metadata_url}instance/attributes/project",
-                                    headers=headers).text
-        return project_name
+        return self.metadata.text(f"{self.metadata_url}instance/attributes/project")
     
     def get_service_account(self):
-        headers = {}
-        headers['Metadata-Flavor'] = 'Google'
-        service_acc = requests.get(f"{self.metadata_url}instance/service-accounts/",
-                                    headers=headers).text
+        service_acc = self.metadata.text(f"{self.metadata_url}instance/service-accounts/")
         service_acc = list(filter(None, service_acc.split('\n')))
         service_acc = [item.rstrip('/') for item in service_acc if item]
         return service_acc
@@ -30,19 +24,14 @@ class Gcp(CloudMetaRegister):
         service_acc = next((item for item in service_acc if item != 'default'), None)
         token = '{"access_token":""}'
         if service_acc != None:
-            headers = {}
-            headers['Metadata-Flavor'] = 'Google'
-            token = requests.get(f"{self.metadata_url}instance/service-accounts/{service_acc}/token",
-                                        headers=headers).text
+            # Access tokens expire, they are fetched every time.
+            token = self.metadata.text(f"{self.metadata_url}instance/service-accounts/{service_acc}/token",
+                                       memo=False)
         
         return (json.loads(token))['access_token']
     
     def get_global_project_id(self):
-        headers = {}
-        headers['Metadata-Flavor'] = 'Google'
-        project_id = requests.get(f"{self.metadata_url}project/numeric-project-id",
-                                    headers=headers).text
-        return project_id
+        return self.metadata.text(f"{self.metadata_url}project/numeric-project-id")
 
     def get_secrets(self):
         gcp_util = GcpUtil(project_id=self.get_global_project_id())
@@ -59,6 +48,12 @@ class Gcp(CloudMetaRegister):
             secret_name = f"{self.get_global_project_id()}/secrets/{secret_name}"
         return gcp_util.update_secrets(key,value,secret_name)
 
+    def update_secrets_batch(self, updates, secret_name=None, expected_version=None):
+        gcp_util = GcpUtil(project_id=self.get_global_project_id())
+        if secret_name is None:
+            secret_name = self.get_project_secret_name()
+        return gcp_util.update_secrets_batch(updates, secret_name, expected_version)
+
     def get_scaling_groups(self):
         pass
 
@@ -1,5 +1,5 @@
 import sys
-from typing import Any, Optional
+from typing import Any, Dict, Optional
 from time import time
 import json
 import base64
@@ -10,6 +10,8 @@ from google.api_core.extended_operation import ExtendedOperation
 from google.cloud import secretmanager
 from google.cloud import compute_v1
 
+from apimrt.cloud_meta.cloud_register import SecretConflictError, merge_secrets
+
 logger = logging.getLogger(__name__)
 
 class GcpUtil:
@@ -99,6 +101,48 @@ class GcpUtil:
         except Exception as excp:
             logger.error(f"UpdateFailedError: {excp}")
             raise excp
+
+    def update_secrets_batch(self, updates: Dict[str, str], secret_id: str,
+                             expected_version: Optional[str] = None) -> Dict[str, Any]:
+        """Adds one secret version with all updates applied to the latest version.
+
+        Secret Manager has no conditional write, versions are numbered
+        sequentially though, so any version created between reading and
+        writing shows up as a gap and is reported as a conflict. `latest` is
+        the newest version, so the payload of the version before the one added
+        here is added again on top and the stale one is disabled, which keeps
+        the other writer's payload readable as `latest`.
+        """
+        client = secretmanager.SecretManagerServiceClient()
+        secret_name = f"projects/{self.project_id}/secrets/{secret_id}"
+        response = client.access_secret_version(request={"name": f"{secret_name}/versions/latest"})
+        version = response.name.split('/')[-1]
+        if expected_version is not None and version != str(expected_version):
+            raise SecretConflictError(f"{secret_id} is at version {version}, expected {expected_version}")
+        merged, diff = merge_secrets(json.loads(response.payload.data.decode("UTF-8")), updates)
+        if not diff['added'] and not diff['updated']:
+            return {**diff, 'version': version}
+
+        new_version = client.add_secret_version(
+            request={"parent": secret_name, "payload": {"data": json.dumps(merged).encode("UTF-8")}}
+        ).name.split('/')[-1]
+        if int(new_version) != int(version) + 1:
+            message = (f"{secret_id} was modified concurrently, version {new_version} was added on top of "
+                       f"{int(new_version) - int(version) - 1} other new version(s) based on version {version}")
+            try:
+                previous = client.access_secret_version(
+                    request={"name": f"{secret_name}/versions/{int(new_version) - 1}"})
+                restored = client.add_secret_version(
+                    request={"parent": secret_name, "payload": {"data": previous.payload.data}}
+                ).name.split('/')[-1]
+                client.disable_secret_version(request={"name": f"{secret_name}/versions/{new_version}"})
+            except Exception as excp:
+                logger.error(f"UpdateFailedError: {excp}")
+                raise SecretConflictError(f"{message}, it could not be reverted and is the latest version") from excp
+            raise SecretConflictError(
+                f"{message}, version {restored} restores version {int(new_version) - 1} and {new_version} is disabled"
+            )
+        return {**diff, 'version': new_version}
         
     
     def list_attached_volumes(self, zone, instance_name):
@@ -1,8 +1,11 @@
 from cliff.command import Command
 from cliff.lister import Lister
-from apimrt.common_cloud.utils.commcloud_utils import get_cloud_obj
+from apimrt.common_cloud.utils.commcloud_utils import get_cloud_obj, get_cloud_provider
+from apimrt.cloud_meta.cloud_register import SecretConflictError
 import json
 import logging
+import sys
+import yaml
 
 
 class GetProjectName(Command):
@@ -54,16 +57,65 @@ class UpdateSecrets(Command):
         print(json.dumps(cloud.update_secrets(key, value, secret_name=secret_name), indent=4))
 
 
+class UpdateSecretsBatch(Command):
+    """Updates several secret keys with a single write, by default updates the project secrets"""
+
+    def get_parser(self, prog_name):
+        parser = super(UpdateSecretsBatch, self).get_parser(prog_name)
+        parser.add_argument("--secret_name", type=str, required=False,
+                            help="provide the secret id or secret name by default uses the project secret",
+                            default=None)
+        parser.add_argument("-f", "--file", type=str, required=False, default=None,
+                            help="YAML or JSON file with the keys and values to be updated")
+        parser.add_argument("--set", dest="updates", action="append", default=[], metavar="KEY=VALUE",
+                            help="key and value to be updated, can be repeated")
+        parser.add_argument("--expected_version", type=str, required=False, default=None,
+                            help="version the secret must still have, a JSON map of key to version on azure")
+        return parser
+
+    def take_action(self, parsed_args):
+        updates = {}
+        if parsed_args.file:
+            with open(parsed_args.file, "r") as updates_file:
+                updates.update(yaml.safe_load(updates_file) or {})
+        for update in parsed_args.updates:
+            key, sep, value = update.partition("=")
+            if not sep or not key:
+                print(f"Expected KEY=VALUE but got {update!r}", file=sys.stderr)
+                return 1
+            updates[key] = value
+        if not updates:
+            print("Nothing to update, specify --file or --set", file=sys.stderr)
+            return 1
+
+        expected_version = parsed_args.expected_version
+        if expected_version and expected_version.lstrip().startswith("{"):
+            expected_version = json.loads(expected_version)
+
+        cloud = get_cloud_obj()
+        try:
+            result = cloud.update_secrets_batch(
+                {key: str(value) for key, value in updates.items()},
+                secret_name=parsed_args.secret_name,
+                expected_version=expected_version,
+            )
+        except SecretConflictError as _e:
+            print(_e, file=sys.stderr)
+            return 1
+        print(json.dumps(result, indent=4))
+
+
 class GetCloudType(Command):
     """Provides the cloud type"""
 
     def get_parser(self, prog_name):
         parser = super(GetCloudType, self).get_parser(prog_name)
+        parser.add_argument("--refresh", action="store_true", default=False,
+                            help="detect the cloud type again instead of using the cached one")
         return parser
 
     def take_action(self, parsed_args):
-        cloud = get_cloud_obj()
-        print(cloud.name)
+        print(get_cloud_provider(refresh=parsed_args.refresh))
 
 
 class GetSecret(Command):
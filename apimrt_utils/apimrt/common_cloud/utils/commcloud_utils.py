@@ -1,20 +1,142 @@
 from apimrt import clouds
 from apimrt.cloud_meta import cloud_register
-from cloud_detect import provider
-import requests
+from pathlib import Path
+from typing import Optional
+import json
+import os
+import socket
+import tempfile
+import time
 import logging
 
+logger = logging.getLogger(__name__)
 
-PROVIDER_TIMEOUT = 60
+# Seconds the endpoints, probed concurrently, get to answer. They answer
+# within milliseconds on their own cloud, so this only bounds the wait elsewhere.
+PROVIDER_TIMEOUT = 2
 
-def get_cloud_provider():
-    cloud_provider = provider(timeout=PROVIDER_TIMEOUT)
+# Provider override, also set by the global --cloud-provider option.
+__PROVIDER_ENV__: str = "APIMRT_CLOUD_PROVIDER"
+__PROVIDER_TIMEOUT_ENV__: str = "APIMRT_CLOUD_PROVIDER_TIMEOUT"
+__PROVIDER_CACHE_ENV__: str = "APIMRT_CLOUD_PROVIDER_CACHE"
+__PROVIDER_CACHE_FILE__: Path = Path("~/.cache/apimrt/cloud-provider")
+
+# Assumed when no metadata endpoint answered. That may also be a cloud host
+# whose endpoint was slow, so the answer is cached for __FALLBACK_TTL__
+# seconds only and the endpoints are probed again after that.
+__FALLBACK_PROVIDER__: str = "cc3"
+__FALLBACK_TTL__: float = 3600.0
+
+_cloud_provider: Optional[str] = None
+_cloud_provider_expires: Optional[float] = None
+
+
+def _provider_cache_file() -> Path:
+    return Path(os.environ.get(__PROVIDER_CACHE_ENV__, __PROVIDER_CACHE_FILE__)).expanduser()
+
+
+def _read_cached_provider() -> Optional[str]:
+    """Returns the provider detected earlier on this host, if any."""
+
+    try:
+        with open(_provider_cache_file(), "r") as cache_file:
+            cached = json.load(cache_file)
+    except (OSError, ValueError):
+        return None
+    # The home directory may be shared or copied, the entry only counts for the host that wrote it.
+    if not isinstance(cached, dict) or cached.get("host") != socket.gethostname():
+        return None
+    cloud_provider = cached.get("provider")
+    if cloud_provider not in cloud_register.clouds_factory:
+        return None
+    if cloud_provider == __FALLBACK_PROVIDER__:
+        # Earlier versions wrote the fallback without an expiry, it is probed again.
+        expires = cached.get("expires")
+        if not isinstance(expires, (int, float)) or expires <= time.time():
+            return None
+    return cloud_provider
+
+
+def _write_cached_provider(cloud_provider: str, expires: Optional[float] = None) -> None:
+    """Caches the provider for this host, until the expiry time, if any."""
+
+    entry = {"host": socket.gethostname(), "provider": cloud_provider}
+    if expires is not None:
+        entry["expires"] = expires
+    cache_file = _provider_cache_file()
+    try:
+        cache_file.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=cache_file.parent, prefix=f".{cache_file.name}-")
+        try:
+            with os.fdopen(fd, "w") as tmp_file:
+                json.dump(entry, tmp_file)
+            os.replace(tmp_path, cache_file)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+    except OSError as excp:
+        # Detection worked, the next command only has to probe again.
+        logger.debug(f"Could not cache the cloud provider: {excp}")
+
+
+def detect_cloud_provider() -> Optional[str]:
+    """Probes the metadata endpoints of all supported providers concurrently.
+
+    They get PROVIDER_TIMEOUT seconds to answer, or $APIMRT_CLOUD_PROVIDER_TIMEOUT.
+
+    Returns:
+        The provider whose endpoint answered, None when none did.
+    """
+
+    # cloud_detect pulls in aiohttp, only pay for it when there is no cached answer.
+    from cloud_detect import provider
+
+    try:
+        timeout = float(os.environ.get(__PROVIDER_TIMEOUT_ENV__, PROVIDER_TIMEOUT))
+    except ValueError:
+        timeout = PROVIDER_TIMEOUT
+    cloud_provider = provider(timeout=timeout)
     if cloud_provider == 'unknown':
-        return 'cc3'
+        return None
     return cloud_provider
 
 
+def get_cloud_provider(refresh: bool = False) -> str:
+    """Returns the cloud provider of this host.
+
+    The provider is taken from the APIMRT_CLOUD_PROVIDER override, else from the
+    per host cache file, and is only probed for when neither has it. A host
+    where no endpoint answered is taken for cc3, which is cached for
+    __FALLBACK_TTL__ seconds only, so only the first command per host and hour
+    waits for the probe.
+
+    Args:
+        refresh: ignore the cache file and probe again
+    """
+
+    global _cloud_provider, _cloud_provider_expires
+    override = os.environ.get(__PROVIDER_ENV__)
+    if override:
+        if override not in cloud_register.clouds_factory:
+            raise ValueError(f"Unsupported cloud provider {override}, "
+                             f"expected one of {', '.join(sorted(cloud_register.clouds_factory))}")
+        return override
+    expired = _cloud_provider_expires is not None and time.monotonic() >= _cloud_provider_expires
+    if _cloud_provider is None or refresh or expired:
+        cloud_provider = None if refresh else _read_cached_provider()
+        if cloud_provider is None:
+            cloud_provider = detect_cloud_provider()
+            if cloud_provider is None:
+                logger.debug(f"No metadata endpoint answered, assuming {__FALLBACK_PROVIDER__}")
+                cloud_provider = __FALLBACK_PROVIDER__
+                _write_cached_provider(cloud_provider, time.time() + __FALLBACK_TTL__)
+            else:
+                _write_cached_provider(cloud_provider)
+        expires = time.monotonic() + __FALLBACK_TTL__ if cloud_provider == __FALLBACK_PROVIDER__ else None
+        _cloud_provider, _cloud_provider_expires = cloud_provider, expires
+    return _cloud_provider
+
+
 def get_cloud_obj():
     cloud_provider = get_cloud_provider()
     return cloud_register.clouds_factory[cloud_provider]()
-
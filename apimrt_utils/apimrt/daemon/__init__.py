@@ -0,0 +1,457 @@
+"""Warm apimrt process serving commands over a Unix socket.
+
+`apimrt serve` keeps the imported modules and their caches (cloud provider,
+secrets, parsed inventories, cloud clients) alive between commands. The
+`apimrt` entry point forwards its arguments, working directory and environment
+to it when it is running, and runs the command in-process otherwise. Commands
+run one at a time, in the client's working directory and environment. Their
+stdout and stderr are streamed back to the client as they are written, in the
+order they were written. Requests are accepted on their own threads, a client
+arriving while a command runs is told the daemon is busy, and a client that
+gets no answer in time runs the command in-process as well.
+
+The cloud clients and credentials are cached for the process and depend on
+environment variables like AWS_PROFILE or AZURE_SUBSCRIPTION_ID. Clients whose
+variables differ from the daemon's run the command in-process instead.
+"""
+
+import contextlib
+import io
+import json
+import logging
+import os
+import socket
+import socketserver
+import struct
+import sys
+import tempfile
+import threading
+import time
+import traceback
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple, Union
+
+_PathLike = Union[str, Path]
+
+__SOCKET_ENV__: str = "APIMRT_DAEMON_SOCKET"
+__DISABLE_ENV__: str = "APIMRT_NO_DAEMON"
+
+# Bumped whenever the request or response format changes.
+__PROTOCOL__: int = 3
+
+__CONNECT_TIMEOUT__: float = 0.5
+# Seconds the client waits for the daemon to accept or decline a command.
+__RESPONSE_TIMEOUT__: float = 2.0
+__IDLE_TIMEOUT__: float = 900.0
+
+# Commands that always run in the calling process.
+__LOCAL_COMMANDS__: Tuple[str, ...] = ("serve",)
+
+# Commands that read stdin unless one of the options names a file. stdin stays
+# with the calling process, so they only run in the daemon with a file.
+__STDIN_COMMANDS__: Dict[str, Tuple[str, ...]] = {"batch": ("-f", "--file")}
+
+# Global options of the apimrt entry point that take a value.
+__GLOBAL_VALUE_OPTIONS__: Tuple[str, ...] = ("--cloud-provider", "--log-file")
+
+# Environment variables the process wide caches depend on: credentials, cloud
+# configuration, proxies and the home directory holding the CLI logins.
+__CACHE_ENV_PREFIXES__: Tuple[str, ...] = (
+    "AWS_", "AZURE_", "MSI_", "IDENTITY_", "GOOGLE_", "CLOUDSDK_", "ALIBABA_CLOUD_", "ALICLOUD_",
+)
+__CACHE_ENV_NAMES__: Tuple[str, ...] = (
+    "HOME", "HTTP_PROXY", "HTTPS_PROXY", "NO_PROXY", "http_proxy", "https_proxy", "no_proxy",
+)
+
+
+class DaemonException(Exception):
+    pass
+
+
+def default_socket_path() -> Path:
+    """Returns the socket path of the current user's daemon."""
+
+    if os.environ.get(__SOCKET_ENV__):
+        return Path(os.environ[__SOCKET_ENV__])
+    runtime_dir = os.environ.get("XDG_RUNTIME_DIR") or tempfile.gettempdir()
+    return Path(runtime_dir) / f"apimrt-{os.getuid()}.sock"
+
+
+def _exit_code(code: Any, stderr: io.TextIOBase) -> int:
+    """Converts a SystemExit code the way the interpreter does."""
+
+    if code is None:
+        return 0
+    if isinstance(code, int):
+        return code
+    print(code, file=stderr)
+    return 1
+
+
+def cache_env(env: Dict[str, str]) -> Dict[str, str]:
+    """Returns the variables of an environment the process wide caches depend on."""
+
+    return {
+        name: value for name, value in env.items()
+        if name in __CACHE_ENV_NAMES__ or name.startswith(__CACHE_ENV_PREFIXES__)
+    }
+
+
+def run_command(argv: Sequence[str], stdout: io.TextIOBase, stderr: io.TextIOBase) -> int:
+    """Runs an apimrt command in this process, writing its output to the given streams.
+
+    Args:
+        argv: the command-line arguments without the program name
+        stdout: receives what the command writes to stdout
+        stderr: receives what the command writes to stderr and its log records
+
+    Returns:
+        The exit code.
+    """
+
+    from apimrt.main import ApimrtApp
+
+    root_logger = logging.getLogger()
+    handlers, level = list(root_logger.handlers), root_logger.level
+    stdin, sys.stdin = sys.stdin, io.StringIO()
+    # Options like --cloud-provider set variables that must not outlive the command.
+    environ = dict(os.environ)
+    # Log records go to the console handler the app adds for this run only.
+    root_logger.handlers[:] = []
+    try:
+        with contextlib.redirect_stdout(stdout), contextlib.redirect_stderr(stderr):
+            try:
+                code = ApimrtApp(stdin=sys.stdin, stdout=stdout, stderr=stderr).run(list(argv))
+            except SystemExit as excp:
+                code = _exit_code(excp.code, stderr)
+            except Exception:
+                # What the interpreter would print for an uncaught exception.
+                traceback.print_exc(file=stderr)
+                code = 1
+    finally:
+        sys.stdin = stdin
+        os.environ.clear()
+        os.environ.update(environ)
+        root_logger.handlers[:] = handlers
+        root_logger.setLevel(level)
+    return code or 0
+
+
+def run_captured(argv: Sequence[str]) -> Tuple[int, str, str]:
+    """Runs an apimrt command in this process and captures its output.
+
+    Args:
+        argv: the command-line arguments without the program name
+
+    Returns:
+        The exit code and the text written to stdout and stderr.
+    """
+
+    stdout, stderr = io.StringIO(), io.StringIO()
+    code = run_command(argv, stdout, stderr)
+    return code, stdout.getvalue(), stderr.getvalue()
+
+
+class _StreamSender:
+    """Sends the output of a command to the client as JSON lines.
+
+    Lines are sent once complete, a partial line is sent before anything is
+    written to the other stream, so the client sees both in the original order.
+    """
+
+    def __init__(self, sock: socket.socket) -> None:
+        self.sock = sock
+        self.pending: Dict[str, str] = {}
+        self.connected = True
+
+    def send(self, message: Dict[str, Any]) -> None:
+        if not self.connected:
+            return
+        try:
+            self.sock.sendall(json.dumps(message).encode("utf-8") + b"\n")
+        except (BrokenPipeError, ConnectionResetError):
+            # The client went away, e.g. the calling script was interrupted.
+            self.connected = False
+
+    def write(self, stream: str, data: str) -> None:
+        for other in list(self.pending):
+            if other != stream:
+                self.send({"stream": other, "data": self.pending.pop(other)})
+        data = self.pending.pop(stream, "") + data
+        complete, newline, partial = data.rpartition("\n")
+        if newline:
+            self.send({"stream": stream, "data": complete + newline})
+        if partial:
+            self.pending[stream] = partial
+
+    def flush(self) -> None:
+        for stream in list(self.pending):
+            self.send({"stream": stream, "data": self.pending.pop(stream)})
+
+
+class _SentStream(io.TextIOBase):
+    """File object writing to one stream of a _StreamSender."""
+
+    def __init__(self, sender: _StreamSender, stream: str) -> None:
+        super(_SentStream, self).__init__()
+        self.sender = sender
+        self.stream = stream
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data: str) -> int:
+        self.sender.write(self.stream, data)
+        return len(data)
+
+    def flush(self) -> None:
+        self.sender.flush()
+
+
+@contextlib.contextmanager
+def _client_context(cwd: str, env: Dict[str, str]):
+    """Runs a request in the working directory and environment of its client."""
+
+    previous_cwd, previous_env = os.getcwd(), dict(os.environ)
+    os.chdir(cwd)
+    os.environ.clear()
+    os.environ.update(env)
+    try:
+        yield
+    finally:
+        os.environ.clear()
+        os.environ.update(previous_env)
+        os.chdir(previous_cwd)
+
+
+def _recv_all(sock: socket.socket) -> bytes:
+    chunks = []
+    while True:
+        chunk = sock.recv(65536)
+        if not chunk:
+            return b"".join(chunks)
+        chunks.append(chunk)
+
+
+class _RequestHandler(socketserver.BaseRequestHandler):
+
+    def handle(self) -> None:
+        if not self.server.is_trusted(self.request):
+            return
+        data = _recv_all(self.request)
+        if not data:
+            # A liveness check, see is_running.
+            return
+        request = json.loads(data)
+        sender = _StreamSender(self.request)
+        if request.get("protocol") != __PROTOCOL__:
+            sender.send({"error": f"unsupported protocol {request.get('protocol')}"})
+        elif request.get("stop"):
+            self.server.stopping = True
+            sender.send({"exit_code": 0})
+        elif cache_env(request["env"]) != self.server.cache_env:
+            # The cached clients would use the daemon's credentials and settings.
+            sender.send({"error": "the environment differs from the daemon's"})
+        elif not self.server.command_lock.acquire(blocking=False):
+            # Commands change the working directory, environment and standard
+            # streams of the whole process, so they cannot run side by side.
+            sender.send({"error": "the daemon is busy"})
+        else:
+            try:
+                sender.send({"accepted": True})
+                if not sender.connected:
+                    # The client gave up waiting and runs the command itself.
+                    return
+                with _client_context(request["cwd"], request["env"]):
+                    code = run_command(request["argv"], _SentStream(sender, "stdout"), _SentStream(sender, "stderr"))
+            finally:
+                self.server.command_lock.release()
+            sender.flush()
+            sender.send({"exit_code": code})
+
+
+class Daemon(socketserver.ThreadingUnixStreamServer):
+    """Serves apimrt commands on a Unix socket until stopped or idle.
+
+    Args:
+        socket_path: path of the socket, only the current user can connect to it
+        idle_timeout: seconds without a request after which the daemon exits
+    """
+
+    def __init__(self, socket_path: Optional[_PathLike] = None, idle_timeout: float = __IDLE_TIMEOUT__) -> None:
+        self.socket_path = Path(socket_path) if socket_path else default_socket_path()
+        self.idle_timeout = idle_timeout
+        self.stopping = False
+        self.cache_env = cache_env(os.environ)
+        self.command_lock = threading.Lock()
+        if self.socket_path.exists():
+            if is_running(self.socket_path):
+                raise DaemonException(f"apimrt is already serving on {self.socket_path}")
+            self.socket_path.unlink()
+        self.socket_path.parent.mkdir(parents=True, exist_ok=True)
+        old_umask = os.umask(0o177)
+        try:
+            super(Daemon, self).__init__(str(self.socket_path), _RequestHandler)
+        finally:
+            os.umask(old_umask)
+
+    @staticmethod
+    def is_trusted(sock: socket.socket) -> bool:
+        """Only serves processes of the user running the daemon."""
+
+        if not hasattr(socket, "SO_PEERCRED"):
+            return True
+        credentials = sock.getsockopt(socket.SOL_SOCKET, socket.SO_PEERCRED, struct.calcsize("3i"))
+        _, uid, _ = struct.unpack("3i", credentials)
+        return uid == os.getuid()
+
+    def serve(self) -> None:
+        self.timeout = 1.0
+        last_request = time.monotonic()
+        try:
+            while not self.stopping:
+                self.handled = False
+                self.handle_request()
+                if self.handled or self.command_lock.locked():
+                    last_request = time.monotonic()
+                elif self.idle_timeout and time.monotonic() - last_request > self.idle_timeout:
+                    break
+        finally:
+            self.server_close()
+            with contextlib.suppress(FileNotFoundError):
+                self.socket_path.unlink()
+
+    def process_request(self, request, client_address) -> None:
+        self.handled = True
+        super(Daemon, self).process_request(request, client_address)
+
+
+def _request(socket_path: Path, request: Dict[str, Any]) -> Optional[Iterator[Dict[str, Any]]]:
+    """Sends a request to the daemon.
+
+    Returns:
+        The messages of the response as they arrive, or None when no daemon
+        could be reached or it did not answer within __RESPONSE_TIMEOUT__.
+    """
+
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    sock.settimeout(__CONNECT_TIMEOUT__)
+    try:
+        sock.connect(str(socket_path))
+    except OSError:
+        sock.close()
+        return None
+    response = sock.makefile("rb")
+    try:
+        sock.settimeout(__RESPONSE_TIMEOUT__)
+        sock.sendall(json.dumps({"protocol": __PROTOCOL__, **request}).encode("utf-8"))
+        sock.shutdown(socket.SHUT_WR)
+        first = response.readline()
+    except socket.timeout:
+        # A hung daemon must not hang the caller. The daemon does not run a
+        # command it cannot tell the client about.
+        response.close()
+        sock.close()
+        return None
+    except OSError:
+        response.close()
+        sock.close()
+        raise
+    sock.settimeout(None)
+    return _messages(sock, response, first)
+
+
+def _messages(sock: socket.socket, response: io.BufferedReader, first: bytes) -> Iterator[Dict[str, Any]]:
+    with sock, response:
+        if first:
+            yield json.loads(first)
+        for line in response:
+            yield json.loads(line)
+
+
+def is_running(socket_path: Optional[_PathLike] = None) -> bool:
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    sock.settimeout(__CONNECT_TIMEOUT__)
+    try:
+        sock.connect(str(socket_path or default_socket_path()))
+        return True
+    except OSError:
+        return False
+    finally:
+        sock.close()
+
+
+def stop(socket_path: Optional[_PathLike] = None) -> bool:
+    """Asks a running daemon to exit, returns whether one was running."""
+
+    messages = _request(Path(socket_path or default_socket_path()), {"stop": True})
+    if messages is None:
+        return False
+    for _ in messages:
+        pass
+    return True
+
+
+def _command_name(argv: List[str]) -> Optional[str]:
+    """Returns the first word of the command, skipping the global options."""
+
+    args = iter(argv)
+    for arg in args:
+        if arg in __GLOBAL_VALUE_OPTIONS__:
+            next(args, None)
+        elif not arg.startswith("-"):
+            return arg
+    return None
+
+
+def should_forward(argv: List[str]) -> bool:
+    """Whether a command can be run by the daemon without changing its behaviour.
+
+    Interactive mode, stdin (`-` arguments or commands reading it by default)
+    and the local commands need the calling process.
+    """
+
+    if os.environ.get(__DISABLE_ENV__) or "-" in argv:
+        return False
+    command = _command_name(argv)
+    if command is None or command in __LOCAL_COMMANDS__:
+        return False
+    file_options = __STDIN_COMMANDS__.get(command)
+    if file_options:
+        return any(arg in file_options or arg.startswith(tuple(f"{option}=" for option in file_options))
+                   for arg in argv)
+    return True
+
+
+def forward(argv: List[str], socket_path: Optional[_PathLike] = None) -> Optional[int]:
+    """Runs the command in the daemon and replays its output as it arrives.
+
+    Returns:
+        The exit code of the command, or None when no daemon is running or
+        it declined the command, and the command has to run in-process.
+    """
+
+    socket_path = Path(socket_path or default_socket_path())
+    if not socket_path.exists():
+        return None
+    streams = {"stdout": sys.stdout, "stderr": sys.stderr}
+    try:
+        messages = _request(socket_path, {"argv": argv, "cwd": os.getcwd(), "env": dict(os.environ)})
+        if messages is None:
+            return None
+        for message in messages:
+            if "error" in message:
+                return None
+            if "exit_code" in message:
+                return message["exit_code"]
+            if message.get("accepted"):
+                continue
+            stream = streams[message["stream"]]
+            stream.write(message["data"])
+            stream.flush()
+    except (OSError, ValueError, KeyError) as excp:
+        # The command may have run already, running it again is not safe.
+        print(f"apimrt daemon on {socket_path} failed: {excp}", file=sys.stderr)
+        return 1
+    print(f"apimrt daemon on {socket_path} returned no result", file=sys.stderr)
+    return 1
@@ -0,0 +1,67 @@
+import sys
+from argparse import ArgumentParser, Namespace
+
+from cliff.command import Command
+
+from . import Daemon, DaemonException, __IDLE_TIMEOUT__, default_socket_path, stop
+
+
+class ServeCLI(Command):
+    """Command-line interface for the warm apimrt daemon.
+
+    Args:
+        Command (Command): Registers the ServeCLI as a cliff `Command`.
+    """
+
+    def get_parser(self, prog_name: str) -> ArgumentParser:
+        """Parses the command-line arguments supplied to the serve command.
+
+        Args:
+            prog_name (str): The name of the program.
+
+        Returns:
+            ArgumentParser: The argument parser object.
+        """
+
+        parser = super(ServeCLI, self).get_parser(prog_name)
+        parser.add_argument(
+            "--socket",
+            dest="socket",
+            help=f"Path of the Unix socket, defaults to $APIMRT_DAEMON_SOCKET or {default_socket_path()}",
+            default=None,
+        )
+        parser.add_argument(
+            "--idle_timeout",
+            dest="idle_timeout",
+            help="Seconds without a command after which the daemon exits, 0 never exits",
+            type=float,
+            default=__IDLE_TIMEOUT__,
+        )
+        parser.add_argument(
+            "--stop",
+            dest="stop",
+            help="Stop the running daemon instead of starting one",
+            action="store_true",
+            default=False,
+        )
+        return parser
+
+    def take_action(self, parsed_args: Namespace):
+        """Serves the apimrt commands forwarded by the `apimrt` entry point.
+
+        Args:
+            parsed_args (Namespace): The parsed command-line arguments.
+        """
+
+        if parsed_args.stop:
+            if not stop(parsed_args.socket):
+                print("apimrt daemon is not running", file=sys.stderr)
+                return 1
+            return 0
+
+        try:
+            daemon = Daemon(parsed_args.socket, idle_timeout=parsed_args.idle_timeout)
+        except (DaemonException, OSError) as _e:
+            print(_e, file=sys.stderr)
+            return 1
+        daemon.serve()
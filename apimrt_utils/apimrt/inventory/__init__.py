@@ -0,0 +1,289 @@
+"""Streaming parser of the INI style Ansible inventories used by the pipelines.
+"""
+
+import hashlib
+import json
+import os
+import shlex
+import tempfile
+import threading
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple, Union
+
+_PathLike = Union[str, Path]
+
+# Group of the hosts listed before the first section header.
+__UNGROUPED__: str = "ungrouped"
+
+# Directory of the parsed inventories shared by the CLI calls of one node.
+__CACHE_DIR__: Path = Path.home() / ".cache" / "apimrt" / "parsed-inventory"
+
+__CACHE_VERSION__: int = 1
+
+_SECTION_KINDS: Tuple[str, ...] = ("hosts", "vars", "children")
+
+_NEEDS_SHLEX = frozenset("'\"#")
+
+# Size of the chunks hashed when checking whether an inventory changed.
+__HASH_BLOCK_SIZE__: int = 64 * 1024
+
+
+class InventoryParseError(Exception):
+    pass
+
+
+class Inventory:
+    """Parsed form of an INI inventory.
+
+    Args:
+        groups: group name to host names, in file order
+        children: group name to child group names
+        group_vars: group name to the variables of its `[group:vars]` section
+        host_vars: host name to the inline variables of its host lines
+    """
+
+    def __init__(
+            self,
+            groups: Optional[Dict[str, List[str]]] = None,
+            children: Optional[Dict[str, List[str]]] = None,
+            group_vars: Optional[Dict[str, Dict[str, str]]] = None,
+            host_vars: Optional[Dict[str, Dict[str, str]]] = None,
+    ) -> None:
+        self.groups = groups if groups is not None else {}
+        self.children = children if children is not None else {}
+        self.group_vars = group_vars if group_vars is not None else {}
+        self.host_vars = host_vars if host_vars is not None else {}
+
+    def hosts(self, group: str) -> List[str]:
+        """Returns the hosts of the group including those of its child groups, without duplicates.
+        """
+
+        hosts: Dict[str, None] = {}
+        seen = set()
+        pending = [group]
+        while pending:
+            name = pending.pop(0)
+            if name in seen:
+                continue
+            seen.add(name)
+            hosts.update(dict.fromkeys(self.groups.get(name, [])))
+            pending.extend(self.children.get(name, []))
+        return list(hosts)
+
+    def to_dict(self) -> Dict[str, Dict]:
+        return {
+            "groups": self.groups,
+            "children": self.children,
+            "group_vars": self.group_vars,
+            "host_vars": self.host_vars,
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Dict]) -> "Inventory":
+        return cls(data["groups"], data["children"], data["group_vars"], data["host_vars"])
+
+
+def _parse_vars(tokens: Iterable[str], line_no: int) -> Dict[str, str]:
+    variables = {}
+    for token in tokens:
+        key, sep, value = token.partition("=")
+        if not sep or not key:
+            raise InventoryParseError(f"Line {line_no}: expected key=value, got {token!r}")
+        variables[key] = value
+    return variables
+
+
+def parse_lines(lines: Iterable[str]) -> Inventory:
+    """Parses inventory lines in a single pass.
+
+    Supports `[group]`, `[group:vars]` and `[group:children]` sections, hosts
+    with inline `key=value` variables, blank lines and `#`/`;` comments.
+    """
+
+    inventory = Inventory()
+    section, kind = __UNGROUPED__, "hosts"
+
+    for line_no, raw_line in enumerate(lines, start=1):
+        line = raw_line.strip()
+        if not line or line[0] in "#;":
+            continue
+
+        if line[0] == "[":
+            if line[-1] != "]":
+                raise InventoryParseError(f"Line {line_no}: unterminated section header {line!r}")
+            section, _, kind = line[1:-1].strip().partition(":")
+            kind = kind or "hosts"
+            if kind not in _SECTION_KINDS:
+                raise InventoryParseError(f"Line {line_no}: unknown section type {kind!r}")
+            if kind == "hosts":
+                inventory.groups.setdefault(section, [])
+            elif kind == "children":
+                inventory.children.setdefault(section, [])
+            continue
+
+        if kind == "vars":
+            key, sep, value = line.partition("=")
+            if not sep:
+                raise InventoryParseError(f"Line {line_no}: expected key=value, got {line!r}")
+            inventory.group_vars.setdefault(section, {})[key.strip()] = value.strip()
+        elif kind == "children":
+            inventory.children[section].append(line)
+        else:
+            # shlex is only needed for quoted values and trailing comments.
+            host, *tokens = shlex.split(line, comments=True) if _NEEDS_SHLEX.intersection(line) \
+                else line.split()
+            inventory.groups.setdefault(section, []).append(host)
+            if tokens:
+                inventory.host_vars.setdefault(host, {}).update(_parse_vars(tokens, line_no))
+
+    return inventory
+
+
+def parse_inventory(inv_path: _PathLike) -> Inventory:
+    """Parses an inventory file line by line without reading it whole."""
+
+    with open(inv_path, "r") as inv_file:
+        return parse_lines(inv_file)
+
+
+def _file_digest(inv_path: _PathLike) -> str:
+    digest = hashlib.sha256()
+    with open(inv_path, "rb") as inv_file:
+        for block in iter(lambda: inv_file.read(__HASH_BLOCK_SIZE__), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class InventoryCache:
+    """Parsed inventories kept in memory and on disk.
+
+    An entry is reused while the file keeps its modification time and size.
+    When only the modification time changed, the content hash decides, so a
+    rewrite with identical content is not parsed again either.
+
+    Args:
+        cache_dir: directory of the on-disk entries, None keeps them in memory only
+    """
+
+    def __init__(self, cache_dir: Optional[_PathLike] = __CACHE_DIR__) -> None:
+        self._cache_dir = Path(cache_dir) if cache_dir is not None else None
+        self._memory: Dict[str, Dict] = {}
+        self._lock = threading.Lock()
+
+    def _entry_path(self, inv_path: str) -> Path:
+        digest = hashlib.sha1(inv_path.encode("utf-8")).hexdigest()[:16]
+        return self._cache_dir / f"{digest}.json"
+
+    def _read_entry(self, inv_path: str) -> Optional[Dict]:
+        entry = self._memory.get(inv_path)
+        if entry is not None or self._cache_dir is None:
+            return entry
+        try:
+            with open(self._entry_path(inv_path), "r") as entry_file:
+                entry = json.load(entry_file)
+        except (OSError, ValueError):
+            return None
+        if entry.get("version") != __CACHE_VERSION__ or entry.get("path") != inv_path:
+            return None
+        return entry
+
+    def _write_entry(self, inv_path: str, entry: Dict) -> None:
+        self._memory[inv_path] = entry
+        if self._cache_dir is None:
+            return
+        try:
+            self._cache_dir.mkdir(parents=True, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=self._cache_dir, prefix=".inventory-")
+            try:
+                with os.fdopen(fd, "w") as tmp_file:
+                    json.dump(entry, tmp_file)
+                os.replace(tmp_path, self._entry_path(inv_path))
+            except BaseException:
+                os.unlink(tmp_path)
+                raise
+        except OSError:
+            # A read-only or full cache directory only costs a re-parse later.
+            pass
+
+    def load(self, inv_path: _PathLike) -> Inventory:
+        """Returns the parsed inventory, parsing the file only when it changed.
+
+        The returned inventory shares its data with the cache and must not be modified.
+        """
+
+        inv_path = os.path.abspath(inv_path)
+        stat = os.stat(inv_path)
+        with self._lock:
+            entry = self._read_entry(inv_path)
+            if entry and (entry["mtime_ns"], entry["size"]) == (stat.st_mtime_ns, stat.st_size):
+                self._memory[inv_path] = entry
+                return Inventory.from_dict(entry["inventory"])
+
+            digest = _file_digest(inv_path)
+            if entry and entry["sha256"] == digest:
+                inventory = Inventory.from_dict(entry["inventory"])
+            else:
+                inventory = parse_inventory(inv_path)
+            self._write_entry(inv_path, {
+                "version": __CACHE_VERSION__,
+                "path": inv_path,
+                "mtime_ns": stat.st_mtime_ns,
+                "size": stat.st_size,
+                "sha256": digest,
+                "inventory": inventory.to_dict(),
+            })
+            return inventory
+
+
+_default_cache = InventoryCache(os.environ.get("APIMRT_INVENTORY_CACHE_DIR", __CACHE_DIR__))
+
+
+def load_inventory(inv_path: _PathLike, use_cache: bool = True) -> Inventory:
+    """Parses the inventory, reusing the cached parsed form when the file is unchanged."""
+
+    if not use_cache:
+        return parse_inventory(inv_path)
+    return _default_cache.load(inv_path)
+
+
+def inv_to_dict(inv_path: _PathLike, use_cache: bool = True) -> Dict[str, List[str]]:
+    """Returns the group to hosts map of the inventory.
+
+    Hosts of child groups are included in their parent groups, variables are
+    left out.
+    """
+
+    inventory = load_inventory(inv_path, use_cache)
+    names = list(inventory.groups) + [g for g in inventory.children if g not in inventory.groups]
+    return {group: inventory.hosts(group) for group in names}
+
+
+def inv_sections(inv_path: _PathLike) -> Dict[str, List[str]]:
+    """Returns the non-blank lines of every section as written, keyed by the header without brackets.
+
+    Unlike inv_to_dict, inline host variables, comments and the `[group:vars]`
+    and `[group:children]` sections are kept verbatim. This is the format of
+    the `<comp>_inventory` files written by utils/fetch_inventory.py, lines
+    before the first header belong to the first section.
+
+    Raises:
+        InventoryParseError: The inventory has no section header.
+    """
+
+    sections: Dict[str, List[str]] = {}
+    section: Optional[str] = None
+    lines: List[str] = []
+    with open(inv_path, "r") as inv_file:
+        for line in inv_file:
+            line = line.rstrip("\n")
+            if "[" in line:
+                if section is not None:
+                    sections[section] = lines
+                    lines = []
+                section = line.replace("[", "").replace("]", "")
+            elif line:
+                lines.append(line)
+    if section is None:
+        raise InventoryParseError(f"{inv_path} has no section header")
+    sections[section] = lines
+    return sections
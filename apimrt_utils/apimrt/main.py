@@ -1,24 +1,43 @@
+import os
 import sys
 import logging
 from cliff.app import App
 from cliff.commandmanager import CommandManager
 import warnings
 
+from apimrt import daemon
+
 warnings.filterwarnings(action='ignore')
 
 
 class ApimrtApp(App):
 
-    def __init__(self):
+    def __init__(self, stdin=None, stdout=None, stderr=None):
         super(ApimrtApp, self).__init__(
             description='apimrt utils app',
             version='1.0.0',
             command_manager=CommandManager('apimrt'),
+            stdin=stdin,
+            stdout=stdout,
+            stderr=stderr,
             deferred_help=True,
         )
 
+    def build_option_parser(self, description, version, argparse_kwargs=None):
+        parser = super(ApimrtApp, self).build_option_parser(description, version, argparse_kwargs)
+        parser.add_argument(
+            '--cloud-provider',
+            dest='cloud_provider',
+            default=None,
+            help='Cloud provider of this host, skips the detection. Defaults to $APIMRT_CLOUD_PROVIDER',
+        )
+        return parser
+
     def initialize_app(self, argv):
         self.LOG.debug('initialize_app')
+        if self.options.cloud_provider:
+            # Read by get_cloud_provider, and inherited by the commands this one spawns.
+            os.environ['APIMRT_CLOUD_PROVIDER'] = self.options.cloud_provider
 
     def prepare_to_run_command(self, cmd):
         self.LOG.debug('prepare_to_run_command %s', cmd.__class__.__name__)
@@ -37,6 +56,10 @@ class ApimrtApp(App):
 
 
 def main(argv=sys.argv[1:]):
+    if daemon.should_forward(argv):
+        result = daemon.forward(argv)
+        if result is not None:
+            return result
     myapp = ApimrtApp()
     return myapp.run(argv)
 
@@ -1,6 +1,3 @@
-import requests
-
-
 class Section:
     def __init__(self, activity_title, activity_subtitle):
         self.activity_title = activity_title
@@ -58,6 +55,8 @@ class TeamsNotifier:
             "sections": self.sections,
             "potentialAction": self.potential_actions,
         }
+        import requests
+
         resp = requests.post(self.webhook_url, json=payload_dict, verify=False)
         return resp
 
@@ -0,0 +1,119 @@
+"""Materializes the landscape secrets into the files consumed by the pipeline steps."""
+
+import json
+import os
+import re
+import shlex
+import tempfile
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, Iterable, Optional, Union
+
+import yaml
+
+_PathLike = Union[str, Path]
+
+__KEY_MAPPING_FILE__: Path = Path(__file__).parent / "config/secrets_key_mapping.yml"
+
+# Mapped secret keys written to the per-component files.
+__COMPONENT_KEYS__: Dict[str, tuple] = {
+    "ms": ("msusername", "mspassword"),
+    "ldap": ("ldappassword",),
+    "pg": ("pgpassword",),
+    "silentconfig": ("msusername", "mspassword", "ldappassword", "pgpassword"),
+}
+
+__FILE_MODE__: int = 0o600
+
+_ENV_NAME_INVALID = re.compile(r"[^A-Za-z0-9_]")
+
+
+@lru_cache(maxsize=None)
+def load_key_mapping(mapping_file: _PathLike = __KEY_MAPPING_FILE__) -> Dict[str, str]:
+    """Loads the key mapping once and inverts it to cloud secret key -> mapped key.
+
+    The mapping file lists every mapped key with the cloud secret keys it
+    replaces.
+    """
+
+    with open(mapping_file, "r") as yaml_file:
+        mapping = yaml.safe_load(yaml_file) or {}
+    return {
+        source_key: mapped_key
+        for mapped_key, source_keys in mapping.items()
+        for source_key in source_keys
+    }
+
+
+def map_secrets(secrets: Dict[str, str], key_mapping: Optional[Dict[str, str]] = None) -> Dict[str, str]:
+    """Renames the cloud secret keys in a single pass, unmapped keys are kept."""
+
+    if key_mapping is None:
+        key_mapping = load_key_mapping()
+    return {key_mapping.get(key, key): value for key, value in secrets.items()}
+
+
+def _write_private(path: _PathLike, content: str) -> None:
+    """Atomically writes a file that only its owner can read."""
+
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    # mkstemp creates the file with mode 0600, the secret is never readable by others.
+    fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}-")
+    try:
+        with os.fdopen(fd, "w") as tmp_file:
+            tmp_file.write(content)
+        os.chmod(tmp_path, __FILE_MODE__)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+def to_env_file(secrets: Dict[str, str], prefix: str = "") -> str:
+    """Renders the secrets as shell-sourceable KEY='value' lines."""
+
+    lines = []
+    for key, value in secrets.items():
+        name = _ENV_NAME_INVALID.sub("_", f"{prefix}{key}")
+        lines.append(f"{name}={shlex.quote(str(value))}")
+    return "\n".join(lines) + "\n"
+
+
+def materialize(
+        secrets: Dict[str, str],
+        output_file: Optional[_PathLike] = None,
+        env_file: Optional[_PathLike] = None,
+        env_prefix: str = "",
+        component_dir: Optional[_PathLike] = None,
+        components: Optional[Iterable[str]] = None,
+) -> Dict[str, str]:
+    """Maps the fetched secrets once and writes every requested output format.
+
+    Args:
+        secrets: secrets as returned by the cloud object
+        output_file: JSON file with all mapped secrets
+        env_file: shell env file with all mapped secrets
+        env_prefix: prefix of the variable names in the env file
+        component_dir: directory of the `<component>_secrets.json` files
+        components: components to write files for, all known ones by default
+
+    Returns:
+        The mapped secrets.
+    """
+
+    mapped = map_secrets(secrets)
+    if output_file:
+        _write_private(output_file, json.dumps(mapped))
+    if env_file:
+        _write_private(env_file, to_env_file(mapped, env_prefix))
+    if component_dir:
+        for component in components or __COMPONENT_KEYS__:
+            component_secrets = {
+                key: mapped[key] for key in __COMPONENT_KEYS__[component] if key in mapped
+            }
+            _write_private(
+                Path(component_dir) / f"{component}_secrets.json",
+                json.dumps(component_secrets),
+            )
+    return mapped
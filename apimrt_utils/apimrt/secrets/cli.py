@@ -0,0 +1,88 @@
+from argparse import ArgumentParser, Namespace
+
+from cliff.command import Command
+
+from apimrt.common_cloud.utils.commcloud_utils import get_cloud_obj
+from . import materialize, __COMPONENT_KEYS__
+
+
+class MaterializeSecretsCLI(Command):
+    """Command-line interface for writing the landscape secrets to files.
+
+    Args:
+        Command (Command): Registers the MaterializeSecretsCLI as a cliff `Command`.
+    """
+
+    def get_parser(self, prog_name: str) -> ArgumentParser:
+        """Parses the command-line arguments supplied to the secrets materialize command.
+
+        Args:
+            prog_name (str): The name of the program.
+
+        Returns:
+            ArgumentParser: The argument parser object.
+        """
+
+        parser = super(MaterializeSecretsCLI, self).get_parser(prog_name)
+        parser.add_argument(
+            "-o",
+            "--output_file",
+            dest="output_file",
+            help="Path of the JSON file with the mapped secrets",
+            default=None,
+        )
+        parser.add_argument(
+            "-e",
+            "--env_file",
+            dest="env_file",
+            help="Path of the shell env file with the mapped secrets",
+            default=None,
+        )
+        parser.add_argument(
+            "--env_prefix",
+            dest="env_prefix",
+            help="Prefix of the variable names in the env file",
+            default="",
+        )
+        parser.add_argument(
+            "-d",
+            "--component_dir",
+            dest="component_dir",
+            help="Directory to write the <component>_secrets.json files to",
+            default=None,
+        )
+        parser.add_argument(
+            "-c",
+            "--component",
+            dest="components",
+            help="Component to write a secrets file for, can be repeated, defaults to all",
+            action="append",
+            choices=sorted(__COMPONENT_KEYS__),
+            default=None,
+        )
+        return parser
+
+    def take_action(self, parsed_args: Namespace):
+        """Fetches the secrets once and writes all requested files with mode 0600.
+
+        Args:
+            parsed_args (Namespace): The parsed command-line arguments.
+        """
+
+        if not (parsed_args.output_file or parsed_args.env_file or parsed_args.component_dir):
+            print("Nothing to write, specify at least one of --output_file, --env_file or --component_dir")
+            return 1
+
+        try:
+            cloud = get_cloud_obj()
+            materialize(
+                cloud.get_secrets(),
+                output_file=parsed_args.output_file,
+                env_file=parsed_args.env_file,
+                env_prefix=parsed_args.env_prefix,
+                component_dir=parsed_args.component_dir,
+                components=parsed_args.components,
+            )
+        except Exception as _e:
+            print(_e)
+            return 1
@@ -1,11 +1,11 @@
 import json
+import os
 from argparse import ArgumentParser, Namespace
 from typing import Dict
 
 from cliff.command import Command
 
 from apimrt.common_cloud.utils.commcloud_utils import get_cloud_obj
-from . import SilentConfig
 
 
 class SilentConfigCLI(Command):
@@ -37,8 +37,9 @@ class SilentConfigCLI(Command):
             "-s",
             "--secrets_file",
             dest="secrets_file",
-            help="Path to the file containing secrets",
-            default=None,
+            help="Path to the file containing secrets, e.g. written by `apimrt secrets materialize`. "
+                 "Defaults to $APIMRT_SECRETS_FILE, the secrets are fetched from the cloud when neither is set",
+            default=os.environ.get("APIMRT_SECRETS_FILE"),
         )
         parser.add_argument(
             "-e",
@@ -107,6 +108,8 @@ class SilentConfigCLI(Command):
             extra_vars["ldap_password"] = secrets["ldappassword"]
             extra_vars["pg_password"] = secrets["pgpassword"]
 
+            from .generator import SilentConfig
+
             silent_config = SilentConfig(
                 parsed_args.inventory,
                 extra_vars=extra_vars,
@@ -0,0 +1,87 @@
+import contextlib
+import io
+import json
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from apimrt import daemon
+from apimrt.batch import BatchException, parse_commands, run_batch
+from apimrt.main import main
+from apimrt.tests.common_utils import SetupCommandManager, running_daemon
+
+COMMANDS = """
+# the cloud of this host
+apimrt cloud type
+cloud type --no_such_option
+"""
+
+
+def served_commands(run_command):
+    """Returns the commands the daemon ran, leaving out the commands of the batches themselves."""
+
+    return [call.args[0] for call in run_command.call_args_list if call.args[0][0] == 'batch']
+
+
+def run_main(argv, stdin=''):
+    stdout = io.StringIO()
+    with mock.patch('sys.stdin', io.StringIO(stdin)), contextlib.redirect_stdout(stdout):
+        exit_code = main(argv)
+    return exit_code, [json.loads(line) for line in stdout.getvalue().splitlines()]
+
+
+@mock.patch.dict(os.environ, {'APIMRT_CLOUD_PROVIDER': 'cc3'})
+@mock.patch('apimrt.main.CommandManager', SetupCommandManager)
+class BatchTestCase(unittest.TestCase):
+
+    def test_parse_commands(self):
+        self.assertEqual(
+            parse_commands(COMMANDS.splitlines()),
+            [['cloud', 'type'], ['cloud', 'type', '--no_such_option']],
+        )
+        self.assertEqual(parse_commands(["secrets materialize -o 'a dir'"]),
+                         [['secrets', 'materialize', '-o', 'a dir']])
+
+    def test_parse_commands_rejects_bad_lines(self):
+        for line in ('apimrt batch -f other', 'serve', 'cloud type "unterminated'):
+            with self.subTest(line=line):
+                with self.assertRaises(BatchException):
+                    parse_commands(['cloud type', line])
+
+    def test_run_batch(self):
+        results = list(run_batch(parse_commands(COMMANDS.splitlines())))
+        self.assertEqual([result['exit_code'] for result in results], [0, 2])
+        self.assertEqual(results[0]['stdout'].strip(), 'cc3')
+        self.assertIn('--no_such_option', results[1]['stderr'])
+
+    def test_run_batch_stop_on_error(self):
+        commands = [['cloud', 'type', '--no_such_option'], ['cloud', 'type']]
+        results = list(run_batch(commands, stop_on_error=True))
+        self.assertEqual([result['command'] for result in results], [commands[0]])
+
+    def test_batch_from_stdin(self):
+        exit_code, results = run_main(['batch'], stdin=COMMANDS)
+        self.assertEqual(exit_code, 1)
+        self.assertEqual([result['exit_code'] for result in results], [0, 2])
+
+    def test_batch_from_stdin_with_daemon(self):
+        with running_daemon(), mock.patch('apimrt.daemon.run_command', wraps=daemon.run_command) as served:
+            exit_code, results = run_main(['batch'], stdin='cloud type\n')
+            self.assertEqual(served_commands(served), [])
+        self.assertEqual(exit_code, 0)
+        self.assertEqual([result['stdout'].strip() for result in results], ['cc3'])
+
+    def test_batch_from_file_with_daemon(self):
+        with tempfile.NamedTemporaryFile('w', suffix='.txt') as commands_file:
+            commands_file.write('cloud type\n')
+            commands_file.flush()
+            with running_daemon(), mock.patch('apimrt.daemon.run_command', wraps=daemon.run_command) as served:
+                exit_code, results = run_main(['batch', '-f', commands_file.name])
+                self.assertEqual(served_commands(served), [['batch', '-f', commands_file.name]])
+        self.assertEqual(exit_code, 0)
+        self.assertEqual([result['stdout'].strip() for result in results], ['cc3'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,67 @@
+import json
+import os
+import subprocess
+import sys
+import unittest
+
+# Top level modules of the cloud SDKs.
+SDK_MODULES = {
+    'aws': ('boto3', 'botocore'),
+    'azure': ('azure',),
+    'gcp': ('google.cloud', 'google.api_core'),
+    'alibaba': ('aliyunsdkcore', 'alibabacloud_credentials', 'oss2'),
+}
+
+# Runs `apimrt cloud type` in a fresh interpreter, optionally loads one cloud,
+# and reports the SDK modules that got imported.
+SCRIPT = """
+import json, sys
+from apimrt.common_cloud.common_cloud_cli import GetCloudType
+from apimrt.cloud_meta import clouds_factory
+command = GetCloudType(None, None)
+command.run(command.get_parser('apimrt cloud type').parse_args([]))
+if len(sys.argv) > 1:
+    clouds_factory[sys.argv[1]]
+print(json.dumps(sorted(sys.modules)))
+"""
+
+
+def imported_modules(provider, load=None):
+    env = dict(os.environ, APIMRT_CLOUD_PROVIDER=provider)
+    output = subprocess.run(
+        [sys.executable, '-c', SCRIPT, *([load] if load else [])],
+        env=env, check=True, capture_output=True, text=True,
+    ).stdout.splitlines()
+    return output[0], set(json.loads(output[-1]))
+
+
+def imported_sdks(modules):
+    return {
+        cloud for cloud, sdk_modules in SDK_MODULES.items()
+        if any(module == sdk or module.startswith(sdk + '.') for module in modules for sdk in sdk_modules)
+    }
+
+
+class LazyCloudsTestCase(unittest.TestCase):
+
+    def test_cloud_type_imports_no_sdk(self):
+        cloud_type, modules = imported_modules('cc3')
+        self.assertEqual(cloud_type, 'cc3')
+        self.assertEqual(imported_sdks(modules), set())
+        self.assertNotIn('cloud_detect', modules)
+
+    def test_only_chosen_cloud_is_imported(self):
+        for cloud in SDK_MODULES:
+            with self.subTest(cloud=cloud):
+                try:
+                    cloud_type, modules = imported_modules(cloud, load=cloud)
+                except subprocess.CalledProcessError as excp:
+                    # The SDK of this cloud is not installed.
+                    self.assertIn('KeyError', excp.stderr)
+                    continue
+                self.assertEqual(cloud_type, cloud)
+                self.assertEqual(imported_sdks(modules) - {cloud}, set())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,103 @@
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from cryptography.fernet import Fernet
+
+from apimrt.cloud_meta import secrets_cache
+from apimrt.clouds.aws.aws_meta import AwsMeta
+
+
+class SecretsCacheTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.cache_dir = tempfile.TemporaryDirectory()
+        self.env = patch.dict(os.environ, {
+            'APIMRT_SECRETS_CACHE_TTL': '60',
+            'APIMRT_SECRETS_CACHE_DIR': self.cache_dir.name,
+            'APIMRT_SECRETS_CACHE_KEY': Fernet.generate_key().decode(),
+        })
+        self.env.start()
+        secrets_cache.reset_secrets_cache()
+
+    def tearDown(self):
+        self.env.stop()
+        secrets_cache.reset_secrets_cache()
+        self.cache_dir.cleanup()
+
+    @patch('apimrt.clouds.aws.aws_meta.AwsUtil')
+    @patch('apimrt.clouds.aws.aws_meta.AwsMeta.get_region')
+    @patch('apimrt.clouds.aws.aws_meta.AwsMeta.get_project_name')
+    def test_get_secrets_is_cached(self, mock_project, mock_region, mock_util):
+        mock_project.return_value = 'myproject'
+        mock_util.return_value.get_secrets.return_value = {'ms_password': 'secret'}
+        self.assertEqual(AwsMeta().get_secrets(), {'ms_password': 'secret'})
+        self.assertEqual(AwsMeta().get_secrets(), {'ms_password': 'secret'})
+        mock_util.return_value.get_secrets.assert_called_once()
+
+    @patch('apimrt.clouds.aws.aws_meta.AwsUtil')
+    @patch('apimrt.clouds.aws.aws_meta.AwsMeta.get_region')
+    @patch('apimrt.clouds.aws.aws_meta.AwsMeta.get_project_name')
+    def test_disk_cache_is_encrypted_and_shared(self, mock_project, mock_region, mock_util):
+        mock_project.return_value = 'myproject'
+        mock_util.return_value.get_secrets.return_value = {'ms_password': 'secret'}
+        AwsMeta().get_secrets()
+        with open(os.path.join(self.cache_dir.name, 'aws-myproject-secret.secrets'), 'rb') as entry:
+            self.assertNotIn(b'secret', entry.read())
+
+        # A new process only sees the on-disk entry.
+        secrets_cache.reset_secrets_cache()
+        self.assertEqual(AwsMeta().get_secrets(), {'ms_password': 'secret'})
+        mock_util.return_value.get_secrets.assert_called_once()
+
+    @patch('apimrt.clouds.aws.aws_meta.AwsUtil')
+    @patch('apimrt.clouds.aws.aws_meta.AwsMeta.get_region')
+    @patch('apimrt.clouds.aws.aws_meta.AwsMeta.get_project_name')
+    def test_update_secrets_invalidates(self, mock_project, mock_region, mock_util):
+        mock_project.return_value = 'myproject'
+        mock_util.return_value.get_secrets.return_value = {'ms_password': 'old'}
+        AwsMeta().get_secrets()
+        AwsMeta().update_secrets('ms_password', 'new')
+        mock_util.return_value.get_secrets.return_value = {'ms_password': 'new'}
+        self.assertEqual(AwsMeta().get_secrets(), {'ms_password': 'new'})
+        self.assertEqual(mock_util.return_value.get_secrets.call_count, 2)
+
+    @patch('apimrt.clouds.aws.aws_meta.AwsUtil')
+    @patch('apimrt.clouds.aws.aws_meta.AwsMeta.get_region')
+    @patch('apimrt.clouds.aws.aws_meta.AwsMeta.get_project_name')
+    def test_cache_disabled_without_ttl(self, mock_project, mock_region, mock_util):
+        with patch.dict(os.environ, {'APIMRT_SECRETS_CACHE_TTL': '0'}):
+            AwsMeta().get_secrets()
+            AwsMeta().get_secrets()
+        self.assertEqual(mock_util.return_value.get_secrets.call_count, 2)
+
+    @patch('apimrt.clouds.aws.aws_meta.AwsUtil')
+    @patch('apimrt.clouds.aws.aws_meta.AwsMeta.get_region')
+    @patch('apimrt.clouds.aws.aws_meta.AwsMeta.get_project_name')
+    def test_secrets_are_cached_per_project(self, mock_project, mock_region, mock_util):
+        mock_util.return_value.get_secrets.side_effect = lambda secret_name: {'secret_name': secret_name}
+        for project in ('first', 'second', 'first'):
+            mock_project.return_value = project
+            self.assertEqual(AwsMeta().get_secrets(), {'secret_name': f'{project}-secret'})
+        self.assertEqual(mock_util.return_value.get_secrets.call_count, 2)
+
+    @patch('apimrt.clouds.aws.aws_meta.AwsUtil')
+    @patch('apimrt.clouds.aws.aws_meta.AwsMeta.get_region')
+    @patch('apimrt.clouds.aws.aws_meta.AwsMeta.get_project_name')
+    def test_environment_is_read_on_every_call(self, mock_project, mock_region, mock_util):
+        mock_project.return_value = 'myproject'
+        mock_util.return_value.get_secrets.return_value = {'ms_password': 'secret'}
+        AwsMeta().get_secrets()
+        other_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(other_dir.cleanup)
+        with patch.dict(os.environ, {'APIMRT_SECRETS_CACHE_DIR': other_dir.name}):
+            AwsMeta().get_secrets()
+            self.assertEqual(os.listdir(other_dir.name), ['aws-myproject-secret.secrets'])
+        with patch.dict(os.environ, {'APIMRT_SECRETS_CACHE_TTL': '0'}):
+            AwsMeta().get_secrets()
+        self.assertEqual(mock_util.return_value.get_secrets.call_count, 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -3,24 +3,28 @@ import unittest
 from unittest.mock import patch, MagicMock
 from apimrt.clouds.alibaba.alibaba_utils import AliBabaUtil
 from apimrt.tests.clouds.alibaba.common_utils import get_mock_json
+from apimrt.cloud_meta.metadata import clear_metadata_cache
 
 class TestAlibabaMeta(unittest.TestCase):
 
-    @patch('apimrt.clouds.alibaba.alibaba_meta.requests.get')
+    def setUp(self):
+        clear_metadata_cache()
+
+    @patch('apimrt.cloud_meta.metadata.MetadataClient._get')
     def test_init(self, mock_get):
         mock_get.return_value.json.return_value = {"example_key": "example_value"}
         mock_get.return_value.status_code = 200
         alibaba_meta = AlibabaMeta()
         self.assertEqual(alibaba_meta._METADATA, {"example_key": "example_value"})
 
-    @patch('apimrt.clouds.alibaba.alibaba_meta.requests.get')
+    @patch('apimrt.cloud_meta.metadata.MetadataClient._get')
     def test_get_region_id(self, mock_get):
         mock_get.return_value.json.return_value = {"region-id": "example_region_id"}
         alibaba_meta = AlibabaMeta()
         region_id = alibaba_meta.get_region_id()
         self.assertEqual(region_id, "example_region_id")
 
-    @patch('apimrt.clouds.alibaba.alibaba_meta.requests.get')
+    @patch('apimrt.cloud_meta.metadata.MetadataClient._get')
     def test_get_sts_creds(self, mock_get):
         mock_resp = MagicMock()
         mock_resp.json.return_value = {"AccessKeyId": "access_key","AccessKeySecret": "access_secret",
@@ -32,7 +36,7 @@ class TestAlibabaMeta(unittest.TestCase):
         self.assertEqual(access_key_secret, "access_secret")
         self.assertEqual(security_token, "security_token")
 
-    @patch('apimrt.clouds.alibaba.alibaba_meta.requests.get')
+    @patch('apimrt.cloud_meta.metadata.MetadataClient._get')
     @patch('apimrt.clouds.alibaba.alibaba_utils.AliBabaUtil')
     def test_get_ali_util(self, mock_get, mock_util):
         alibaba_meta = AlibabaMeta()
@@ -40,7 +44,7 @@ class TestAlibabaMeta(unittest.TestCase):
         alibaba_meta.get_region_id = MagicMock(return_value="us-west-1")
         ali_util = alibaba_meta.get_ali_util()
 
-    @patch('apimrt.clouds.alibaba.alibaba_meta.requests.get')
+    @patch('apimrt.cloud_meta.metadata.MetadataClient._get')
     @patch('apimrt.clouds.alibaba.alibaba_utils.AliBabaUtil.get_instance_tags')
     def test_get_project_name(self, mock_get_instance_tags, mock_get):
         mock_get.return_value = MagicMock(json=lambda: {'region-id': 'us-west-1', 'instance-id': '12345'})
@@ -52,7 +56,7 @@ class TestAlibabaMeta(unittest.TestCase):
             project_name = alibaba_meta.get_project_name()
         self.assertEqual(project_name, 'MyProject')
     
-    @patch('apimrt.clouds.alibaba.alibaba_meta.requests.get')
+    @patch('apimrt.cloud_meta.metadata.MetadataClient._get')
     @patch('apimrt.clouds.alibaba.alibaba_utils.AliBabaUtil.get_secrets')
     def test_get_secrets(self, mock_get, mock_get_secrets):
         mock_get.return_value = MagicMock(json=lambda: {'region-id': 'us-west-1', 'instance-id': '12345'})
@@ -64,7 +68,7 @@ class TestAlibabaMeta(unittest.TestCase):
             secrets = alibaba_meta.get_secrets()
         self.assertEqual(secrets, {'SecretKey': 'abc123'})
     
-    @patch('apimrt.clouds.alibaba.alibaba_meta.requests.get')
+    @patch('apimrt.cloud_meta.metadata.MetadataClient._get')
     def test_get_scaling_groups(self, mock_get):
         mock_get.return_value = MagicMock(json=lambda: {'region-id': 'us-west-1', 'instance-id': '12345'})
         alibaba_meta = AlibabaMeta()
@@ -75,7 +79,7 @@ class TestAlibabaMeta(unittest.TestCase):
             scaling_groups = alibaba_meta.get_scaling_groups()
         self.assertEqual(scaling_groups, ['ASG-asg_id_1', 'ASG-asg_id_2'])
 
-    @patch('apimrt.clouds.alibaba.alibaba_meta.requests.get')
+    @patch('apimrt.cloud_meta.metadata.MetadataClient._get')
     def test_update_image(self, mock_get):
         mock_get.return_value = MagicMock(json=lambda: {'region-id': 'us-west-1', 'instance-id': '12345'})
         alibaba_meta = AlibabaMeta()
@@ -85,7 +89,7 @@ class TestAlibabaMeta(unittest.TestCase):
             result = alibaba_meta.update_image('image123')
         self.assertEqual(result, 'Image updated')
 
-    @patch('apimrt.clouds.alibaba.alibaba_meta.requests.get')
+    @patch('apimrt.cloud_meta.metadata.MetadataClient._get')
     def test_take_volume_snapshot(self, mock_get):
         mock_get.return_value = MagicMock(json=lambda: {'region-id': 'us-west-1', 'instance-id': '12345'})
         alibaba_meta = AlibabaMeta()
@@ -95,7 +99,7 @@ class TestAlibabaMeta(unittest.TestCase):
             result = alibaba_meta.take_volume_snapshot('192.168.0.1')
         self.assertEqual(result, 'Snapshot taken')
 
-    @patch('apimrt.clouds.alibaba.alibaba_meta.requests.get')
+    @patch('apimrt.cloud_meta.metadata.MetadataClient._get')
     def test_get_instance_name(self, mock_get):
         mock_get.return_value = MagicMock(json=lambda: {'region-id': 'us-west-1', 'instance-id': '12345'})
         alibaba_meta = AlibabaMeta()
@@ -106,7 +110,7 @@ class TestAlibabaMeta(unittest.TestCase):
             result = alibaba_meta.get_instance_name('192.168.0.1', 'project_name')
         self.assertEqual(result, 'instance_name')
     
-    @patch('apimrt.clouds.alibaba.alibaba_meta.requests.get')
+    @patch('apimrt.cloud_meta.metadata.MetadataClient._get')
     def test_get_project_instance_name(self, mock_get):
         mock_get.return_value = MagicMock(json=lambda: {'region-id': 'us-west-1', 'instance-id': '12345'})
         alibaba_meta = AlibabaMeta()
@@ -117,7 +121,7 @@ class TestAlibabaMeta(unittest.TestCase):
             result = alibaba_meta.get_project_instance_name('192.168.0.1')
         self.assertEqual(result, 'instance_name')
 
-    @patch('apimrt.clouds.alibaba.alibaba_meta.requests.get')
+    @patch('apimrt.cloud_meta.metadata.MetadataClient._get')
     def test_get_instance_tags(self, mock_get):
         mock_get.return_value = MagicMock(json=lambda: {'region-id': 'us-west-1', 'instance-id': '12345'})
         alibaba_meta = AlibabaMeta()
@@ -128,7 +132,7 @@ class TestAlibabaMeta(unittest.TestCase):
             result = alibaba_meta.get_instance_tags('192.168.0.1')
         self.assertEqual(result, {'Project': 'project_name'})
 
-    @patch('apimrt.clouds.alibaba.alibaba_meta.requests.get')
+    @patch('apimrt.cloud_meta.metadata.MetadataClient._get')
     def test_get_role_name(self, mock_get):
         mock_response = mock_get.return_value
         mock_response.text = 'role_name'
@@ -136,7 +140,7 @@ class TestAlibabaMeta(unittest.TestCase):
         result = alibaba_meta.get_role_name()
         self.assertEqual(result, 'role_name')
 
-    @patch('apimrt.clouds.alibaba.alibaba_meta.requests.get')
+    @patch('apimrt.cloud_meta.metadata.MetadataClient._get')
     def test_get_available_permissions(self, mock_get):
         alibaba_meta = AlibabaMeta()
         ali_util_mock = MagicMock(spec=AliBabaUtil)
@@ -146,7 +150,7 @@ class TestAlibabaMeta(unittest.TestCase):
             result = alibaba_meta.get_available_permissions()
         self.assertEqual(result, ["action1", "action2", "action4"])
 
-    @patch('apimrt.clouds.alibaba.alibaba_meta.requests.get')
+    @patch('apimrt.cloud_meta.metadata.MetadataClient._get')
     def test_get_project_secret_name(self, mock_get):
         alibaba_meta = AlibabaMeta()
         project_name = "project_name"
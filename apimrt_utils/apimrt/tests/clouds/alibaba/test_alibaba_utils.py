@@ -4,6 +4,7 @@ import unittest
 from unittest import mock
 from unittest.mock import patch
 from apimrt.clouds.alibaba.alibaba_utils import AliBabaUtil
+from apimrt.cloud_meta.cloud_register import SecretConflictError
 from apimrt.tests.clouds.alibaba.common_utils import get_mock_json 
 
 class TestAliBabaUtil(unittest.TestCase):
@@ -29,6 +30,24 @@ class TestAliBabaUtil(unittest.TestCase):
         mock_secrets.return_value = get_mock_json('metadata')['SecretData']
         resp = ali_util.get_secrets(secret_name='secret_name')
 
+    @mock.patch('apimrt.clouds.alibaba.alibaba_utils.AliBabaUtil._send_request')
+    def test_update_secrets_batch(self, mock_send_request):
+        mock_send_request.return_value = {'VersionId': 'v1', 'SecretData': '{"user": "admin", "password": "old"}'}
+        ali_util = AliBabaUtil(self.region_id, self.access_key_id, self.access_key_secret, self.security_token)
+        result = ali_util.update_secrets_batch({'password': 'new'}, 'secret_name', expected_version='v1')
+        self.assertEqual(result['updated'], ['password'])
+        put_request = mock_send_request.call_args.args[0]
+        self.assertEqual(json.loads(put_request.get_SecretData()), {'user': 'admin', 'password': 'new'})
+        self.assertEqual(put_request.get_VersionId(), result['version'])
+
+    @mock.patch('apimrt.clouds.alibaba.alibaba_utils.AliBabaUtil._send_request')
+    def test_update_secrets_batch_conflict(self, mock_send_request):
+        mock_send_request.return_value = {'VersionId': 'v2', 'SecretData': '{"password": "old"}'}
+        ali_util = AliBabaUtil(self.region_id, self.access_key_id, self.access_key_secret, self.security_token)
+        with self.assertRaises(SecretConflictError):
+            ali_util.update_secrets_batch({'password': 'new'}, 'secret_name', expected_version='v1')
+        mock_send_request.assert_called_once()
+
     @mock.patch('apimrt.clouds.alibaba.alibaba_utils.AliBabaUtil._send_request')
     def test_get_instance_private_ip(self, mock_ip):
         mock_ip.return_value = get_mock_json('instance')
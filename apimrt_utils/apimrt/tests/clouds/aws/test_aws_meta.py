@@ -1,17 +1,23 @@
 import unittest
 from unittest.mock import patch
 from apimrt.clouds.aws.aws_meta import AwsMeta
+from apimrt.cloud_meta.metadata import clear_metadata_cache
+from apimrt.clouds.aws.aws_utils import clear_client_cache
 
 class AwsMetaTestCase(unittest.TestCase):
-    
-    @patch('apimrt.clouds.aws.aws_meta.requests.get')
+
+    def setUp(self):
+        clear_metadata_cache()
+        clear_client_cache()
+
+    @patch('apimrt.cloud_meta.metadata.MetadataClient._get')
     def test_get_region(self, mock_get):
         mock_get.return_value.text = 'us-east-1'
         aws_meta = AwsMeta()
         result = aws_meta.get_region()        
         self.assertEqual(result, 'us-east-1')
 
-    @patch('apimrt.clouds.aws.aws_meta.requests.get')
+    @patch('apimrt.cloud_meta.metadata.MetadataClient._get')
     def test_get_project_name(self, mock_get):
         mock_get.return_value.text = 'my-project'        
         aws_meta = AwsMeta()        
@@ -29,7 +35,7 @@ class AwsMetaTestCase(unittest.TestCase):
         result = aws_meta.get_secrets()
         # self.assertEqual(result, 'my-secret')
 
-    @patch('apimrt.clouds.aws.aws_meta.requests.get')
+    @patch('apimrt.cloud_meta.metadata.MetadataClient._get')
     def test_get_instance_profile_name(self, mock_get):
         mock_response = mock_get.return_value
         mock_response.json.return_value = {'InstanceProfileArn': 'arn:aws:iam::1234567890:instance-profile/my-instance-profile'}        
@@ -40,7 +46,7 @@ class AwsMetaTestCase(unittest.TestCase):
     @patch('apimrt.clouds.aws.aws_meta.AwsUtil.get_instance_profile')
     @patch('apimrt.clouds.aws.aws_meta.AwsMeta.get_region')
     @patch('apimrt.clouds.aws.aws_meta.AwsMeta.get_instance_profile_name')
-    @patch('apimrt.clouds.aws.aws_meta.requests.get')
+    @patch('apimrt.cloud_meta.metadata.MetadataClient._get')
     def test_get_role_name(self, mock_instance_profile, mock_region, mock_instance_profile_name, mock_get):
         mock_region.return_value.text = 'us-east-1'
         mock_instance_profile_name.return_value = 'my-instance-profile'
@@ -1,7 +1,8 @@
 import unittest
 from unittest import mock
 from unittest.mock import patch, MagicMock
-from apimrt.clouds.aws.aws_utils import AwsUtil,Arn
+from apimrt.clouds.aws.aws_utils import AwsUtil,Arn,clear_client_cache
+from apimrt.cloud_meta.cloud_register import SecretConflictError
 from apimrt.tests.clouds.aws.common_utils import get_mock_json
 import boto3
 from botocore.exceptions import ClientError
@@ -53,6 +54,7 @@ class ArnTestCase(unittest.TestCase):
 class AwsUtilTestCase(unittest.TestCase):
 
     def setUp(self):
+        clear_client_cache()
         self.region = 'us-west-2'
         self.aws_util = AwsUtil(region=self.region)
 
@@ -63,6 +65,15 @@ class AwsUtilTestCase(unittest.TestCase):
         result = self.aws_util.get_client('ec2')
         self.assertEqual(result,mock_test_client)
 
+    @mock.patch('boto3.client')
+    def test_get_client_is_cached_per_service_and_region(self, mock_client):
+        mock_client.side_effect = lambda *args, **kwargs: mock.MagicMock()
+        client = self.aws_util.get_client('ec2')
+        self.assertIs(AwsUtil(region=self.region).get_client('ec2'), client)
+        self.assertIsNot(self.aws_util.get_client('autoscaling'), client)
+        self.assertIsNot(AwsUtil(region='eu-west-1').get_client('ec2'), client)
+        self.assertEqual(mock_client.call_count, 3)
+
     @mock.patch('boto3.resource')
     def test_get_resource(self, mock_resource):
         mock_test_resource = mock.MagicMock()
@@ -463,6 +474,36 @@ class AwsUtilTestCase(unittest.TestCase):
         mock_client.update_secret = MagicMock()
         updated_secrets = self.aws_util.update_secrets("new_key", "new_value", "test_secret")
 
+    @patch('apimrt.clouds.aws.aws_utils.AwsUtil.get_client')
+    def test_update_secrets_batch(self, mock_get_client):
+        mock_client = mock_get_client.return_value
+        mock_client.get_secret_value.return_value = {
+            'VersionId': 'v1', 'SecretString': '{"a": "1", "b": "2", "c": "3"}'}
+        mock_client.put_secret_value.return_value = {'VersionId': 'v2'}
+        result = self.aws_util.update_secrets_batch({'a': '1', 'b': 'x', 'd': '4'}, 'test_secret', 'v1')
+        self.assertEqual(result, {'added': ['d'], 'updated': ['b'], 'unchanged': ['a'], 'version': 'v2'})
+        mock_client.put_secret_value.assert_called_once()
+        mock_client.update_secret_version_stage.assert_called_once_with(
+            SecretId='test_secret', VersionStage='AWSCURRENT', MoveToVersionId='v2', RemoveFromVersionId='v1')
+
+    @patch('apimrt.clouds.aws.aws_utils.AwsUtil.get_client')
+    def test_update_secrets_batch_conflict(self, mock_get_client):
+        mock_client = mock_get_client.return_value
+        mock_client.get_secret_value.return_value = {'VersionId': 'v3', 'SecretString': '{"a": "1"}'}
+        with self.assertRaises(SecretConflictError):
+            self.aws_util.update_secrets_batch({'a': '2'}, 'test_secret', 'v1')
+        mock_client.put_secret_value.assert_not_called()
+
+        mock_client.get_secret_value.return_value = {'VersionId': 'v1', 'SecretString': '{"a": "1"}'}
+        mock_client.put_secret_value.return_value = {'VersionId': 'v2'}
+        mock_client.update_secret_version_stage.side_effect = [ClientError(
+            {'Error': {'Code': 'InvalidParameterException'}}, 'UpdateSecretVersionStage'), {}]
+        with self.assertRaises(SecretConflictError):
+            self.aws_util.update_secrets_batch({'a': '2'}, 'test_secret')
+        # The version that was not made current does not keep AWSPENDING.
+        mock_client.update_secret_version_stage.assert_called_with(
+            SecretId='test_secret', VersionStage='AWSPENDING', RemoveFromVersionId='v2')
+
     @patch('apimrt.clouds.aws.aws_utils.AwsUtil.get_client')
     def test_check_for_scalein_not_scale_in(self, mock_client):
         mock_response = get_mock_json('not_scale_in')
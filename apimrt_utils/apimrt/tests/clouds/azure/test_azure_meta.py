@@ -1,13 +1,15 @@
 import unittest
 from apimrt.clouds.azure.azure_meta import AzureMeta
+from apimrt.cloud_meta.metadata import clear_metadata_cache
 from unittest.mock import patch
 
 class TestAzureMeta(unittest.TestCase):
     def setUp(self):
+        clear_metadata_cache()
         self.name = "azure"
         self.azure_meta = AzureMeta()
     
-    @patch('apimrt.clouds.azure.azure_meta.requests.get')
+    @patch('apimrt.cloud_meta.metadata.MetadataClient._get')
     def test_get_rg_name(self, mock_get):
         mock_data = {
             "compute": {
@@ -1,12 +1,20 @@
 import unittest
 from unittest.mock import patch, MagicMock
-from apimrt.clouds.azure.azure_utils import AzureUtil
+from apimrt.clouds.azure.azure_utils import AzureUtil, clear_client_cache
+from apimrt.cloud_meta.cloud_register import SecretConflictError
 from datetime import timezone
 from subprocess import CalledProcessError
+import tempfile
+import threading
+
+from azure.core.exceptions import HttpResponseError, ResourceNotFoundError
 
 
 class TestAzureUtil(unittest.TestCase):
 
+    def setUp(self):
+        clear_client_cache()
+
     @patch('apimrt.clouds.azure.azure_utils.os.environ.get')
     @patch('apimrt.clouds.azure.azure_utils.subprocess.check_output')
     def test_init(self, mock_check_output, mock_environ_get):
@@ -47,6 +55,79 @@ class TestAzureUtil(unittest.TestCase):
         compute_client = util.compute_client
         self.assertFalse(isinstance(compute_client, type(mock_compute_client.return_value)))
 
+    @patch('apimrt.clouds.azure.azure_utils.NetworkManagementClient')
+    @patch('apimrt.clouds.azure.azure_utils.ComputeManagementClient')
+    @patch('apimrt.clouds.azure.azure_utils.AzureUtil.get_credential_chain')
+    def test_clients_are_cached_per_subscription(self, mock_get_credential_chain, mock_compute_client,
+                                                 mock_network_client):
+        mock_compute_client.side_effect = lambda **kwargs: MagicMock()
+        util = AzureUtil('rg_name', 'sub1')
+        compute_client = util.compute_client
+        self.assertIs(AzureUtil('other_rg', 'sub1').compute_client, compute_client)
+        self.assertIsNot(AzureUtil('rg_name', 'sub2').compute_client, compute_client)
+        util.network_client
+        self.assertEqual(mock_compute_client.call_count, 2)
+        mock_get_credential_chain.assert_called_once()
+        self.assertIs(mock_network_client.call_args.kwargs['credential'],
+                      mock_compute_client.call_args.kwargs['credential'])
+
+    @patch('apimrt.clouds.azure.azure_utils.time.time')
+    @patch('apimrt.clouds.azure.azure_utils.AzureUtil.get_credential_chain')
+    def test_credential_reuses_token(self, mock_get_credential_chain, mock_time):
+        chain = mock_get_credential_chain.return_value
+        chain.get_token.side_effect = [MagicMock(expires_on=4000), MagicMock(expires_on=8000)]
+        credential = AzureUtil('rg_name', 'sub1').credential
+        mock_time.return_value = 1000
+        token = credential.get_token('https://management.azure.com/.default')
+        self.assertIs(credential.get_token('https://management.azure.com/.default'), token)
+        mock_time.return_value = 3800
+        self.assertIsNot(credential.get_token('https://management.azure.com/.default'), token)
+        self.assertEqual(chain.get_token.call_count, 2)
+
+    @patch('apimrt.clouds.azure.azure_utils.os.environ.get')
+    @patch('apimrt.clouds.azure.azure_utils.subprocess.check_output')
+    def test_az_subscription_lookup_runs_once(self, mock_check_output, mock_environ_get):
+        mock_environ_get.return_value = None
+        mock_check_output.return_value = b'{"id": "test_subscription_id"}'
+        self.assertEqual(AzureUtil('rg_name').subscription_id, 'test_subscription_id')
+        self.assertEqual(AzureUtil('other_rg').subscription_id, 'test_subscription_id')
+        mock_check_output.assert_called_once_with('az account show', shell=True)
+
+    @patch('apimrt.clouds.azure.azure_utils.os.environ.get')
+    @patch('apimrt.clouds.azure.azure_utils.subprocess.check_output')
+    def test_failed_az_subscription_lookup_is_retried(self, mock_check_output, mock_environ_get):
+        mock_environ_get.return_value = None
+        mock_check_output.side_effect = [CalledProcessError(1, 'az account show'),
+                                         CalledProcessError(1, 'az login --identity'),
+                                         b'{"id": "test_subscription_id"}']
+        self.assertIsNone(AzureUtil('rg_name').subscription_id)
+        self.assertEqual(AzureUtil('rg_name').subscription_id, 'test_subscription_id')
+        self.assertEqual(mock_check_output.call_count, 3)
+
+    @patch('apimrt.clouds.azure.azure_utils.os.environ.get')
+    @patch('apimrt.clouds.azure.azure_utils.subprocess.check_output')
+    def test_az_subscription_lookup_runs_without_the_lock(self, mock_check_output, mock_environ_get):
+        from apimrt.clouds.azure import azure_utils
+
+        def check_output(command, shell):
+            # Another thread must be able to take the lock while az runs.
+            acquired = []
+
+            def take_lock():
+                if azure_utils._lock.acquire(timeout=1):
+                    acquired.append(True)
+                    azure_utils._lock.release()
+
+            thread = threading.Thread(target=take_lock)
+            thread.start()
+            thread.join()
+            self.assertEqual(acquired, [True])
+            return b'{"id": "test_subscription_id"}'
+
+        mock_environ_get.return_value = None
+        mock_check_output.side_effect = check_output
+        self.assertEqual(AzureUtil('rg_name').subscription_id, 'test_subscription_id')
+
     @patch('azure.mgmt.network.NetworkManagementClient')
     @patch('apimrt.clouds.azure.azure_utils.AzureUtil.get_credential_chain')
     def test_network_client(self, mock_get_credential_chain, mock_network_client):
@@ -162,24 +243,38 @@ class TestAzureUtil(unittest.TestCase):
     @patch('apimrt.clouds.azure.azure_utils.AzureUtil.get_scale_set_vm_data')
     @patch('apimrt.clouds.azure.azure_utils.AzureUtil.network_client')
     def test_get_scale_set_instance_ip_list(self, mock_network_client, mock_get_scale_set_vm_data):
-        mock_scale_set_vm_1 = MagicMock()
-        mock_scale_set_vm_1.network_profile_configuration.network_interface_configurations[0].name = 'nic1'
-        mock_scale_set_vm_1.network_profile_configuration.network_interface_configurations[0].ip_configurations[0].name = 'ip_config1'
-        mock_scale_set_vm_1.instance_id = 'instance_id1'
-
-        mock_scale_set_vm_2 = MagicMock()
-        mock_scale_set_vm_2.network_profile_configuration.network_interface_configurations[0].name = 'nic2'
-        mock_scale_set_vm_2.network_profile_configuration.network_interface_configurations[0].ip_configurations[0].name = 'ip_config2'
-        mock_scale_set_vm_2.instance_id = 'instance_id2'
-
-        mock_get_scale_set_vm_data.return_value = [mock_scale_set_vm_1, mock_scale_set_vm_2]
-
-        mock_network_interface = MagicMock()
-        mock_network_interface.private_ip_address = '10.0.0.1'
-        mock_network_client.network_interfaces.get_virtual_machine_scale_set_ip_configuration.return_value = mock_network_interface
+        vm_ids = [f'/subscriptions/sub/resourceGroups/rg_name/providers/Microsoft.Compute/'
+                  f'virtualMachineScaleSets/scale_set_name/virtualMachines/{instance}' for instance in range(3)]
+        instances, nics = [], []
+        for instance, vm_id in enumerate(vm_ids):
+            mock_scale_set_vm = MagicMock(id=vm_id.upper(), instance_id=str(instance))
+            mock_scale_set_vm.network_profile_configuration.network_interface_configurations[0].name = 'nic'
+            mock_scale_set_vm.network_profile_configuration.network_interface_configurations[0].ip_configurations[0].name = 'ip_config'
+            instances.append(mock_scale_set_vm)
+            ip_configuration = MagicMock(private_ip_address=f'10.0.0.{instance}')
+            ip_configuration.name = 'ip_config'
+            nic = MagicMock(virtual_machine=MagicMock(id=vm_id), ip_configurations=[ip_configuration])
+            nic.name = 'nic'
+            nics.append(nic)
+
+        mock_get_scale_set_vm_data.return_value = instances
+        # The instance created last has no NIC yet.
+        mock_network_client.network_interfaces.list_virtual_machine_scale_set_network_interfaces.return_value = nics[:2]
 
         util = AzureUtil('rg_name')
         ip_list = util.get_scale_set_instance_ip_list('scale_set_name')
+        self.assertEqual(ip_list, ['10.0.0.0', '10.0.0.1'])
+        mock_network_client.network_interfaces.list_virtual_machine_scale_set_network_interfaces.assert_called_once_with(
+            'rg_name', 'scale_set_name')
+        mock_network_client.network_interfaces.get_virtual_machine_scale_set_ip_configuration.assert_not_called()
+
+    @patch('apimrt.clouds.azure.azure_utils.AzureUtil.get_scale_set_name_list')
+    @patch('apimrt.clouds.azure.azure_utils.AzureUtil.get_scale_set_instance_ip_list')
+    def test_get_scale_sets_instance_ip_lists(self, mock_get_scale_set_instance_ip_list, mock_get_scale_set_name_list):
+        mock_get_scale_set_name_list.return_value = ['mp', 'router']
+        mock_get_scale_set_instance_ip_list.side_effect = lambda name: [f'{name}-ip']
+        util = AzureUtil('rg_name')
+        self.assertEqual(util.get_scale_sets_instance_ip_lists(), {'mp': ['mp-ip'], 'router': ['router-ip']})
 
     @patch('apimrt.clouds.azure.azure_utils.AzureUtil.get_scale_set_data')
     def test_get_scale_set_tags(self, mock_get_scale_set_data):
@@ -303,6 +398,89 @@ class TestAzureUtil(unittest.TestCase):
         util = AzureUtil('rg_name')
         result = util.get_instance_name_from_ip('10.0.0.2', 'rg_name')
 
+    @patch('apimrt.clouds.azure.azure_utils.AzureUtil.network_client')
+    @patch('apimrt.clouds.azure.azure_utils.AzureUtil.compute_client')
+    def test_get_instance_from_ip_uses_cached_index(self, mock_compute_client, mock_network_client):
+        vm_id = '/subscriptions/sub1/resourceGroups/rg_name/providers/Microsoft.Compute/virtualMachines/vm1'
+        vmss_vm_id = '/subscriptions/sub1/resourceGroups/rg_name/providers/Microsoft.Compute/virtualMachineScaleSets/mp/virtualMachines/3'
+        mock_vm = MagicMock(id=vm_id, tags={'Subtype': 'router'}, instance_id=None)
+        mock_vm.name = 'vm1'
+        mock_vm.storage_profile.data_disks = [MagicMock()]
+        mock_vm.storage_profile.data_disks[0].name = 'vm1-data'
+        mock_vmss_vm = MagicMock(id=vmss_vm_id.upper(), tags=None, instance_id='3')
+        mock_vmss_vm.name = 'mp_3'
+        mock_scale_set = MagicMock()
+        mock_scale_set.name = 'mp'
+        mock_compute_client.virtual_machines.list.return_value = [mock_vm]
+        mock_compute_client.virtual_machine_scale_sets.list.return_value = [mock_scale_set]
+        mock_compute_client.virtual_machine_scale_set_vms.list.return_value = [mock_vmss_vm]
+        network_interfaces = mock_network_client.network_interfaces
+        nic = MagicMock(id='/subscriptions/sub1/nics/vm1-nic', virtual_machine=MagicMock(id=vm_id),
+                        ip_configurations=[MagicMock(private_ip_address='10.0.0.1')])
+        network_interfaces.list.return_value = [nic]
+        network_interfaces.list_virtual_machine_scale_set_network_interfaces.return_value = [
+            MagicMock(id='/subscriptions/sub1/nics/mp-nic', virtual_machine=MagicMock(id=vmss_vm_id),
+                      ip_configurations=[MagicMock(private_ip_address='10.0.0.2')])]
+
+        now = [1000.0]
+        monotonic = patch('apimrt.clouds.azure.azure_utils.time.monotonic', side_effect=lambda: now[0])
+        monotonic.start()
+        self.addCleanup(monotonic.stop)
+        util = AzureUtil('rg_name', 'sub1')
+        self.assertEqual(util.get_instance_from_ip('10.0.0.1'), {
+            'name': 'vm1', 'id': vm_id, 'nic': '/subscriptions/sub1/nics/vm1-nic', 'scale_set': None, 'instance_id': None,
+            'tags': {'Subtype': 'router'}, 'disks': ['vm1-data']})
+        self.assertEqual(util.get_instance_name_from_ip('10.0.0.2', 'rg_name'), 'mp_3')
+        self.assertEqual(util.get_vmss_instance_name_from_ip('10.0.0.2', 'rg_name'), 'mp_3')
+        self.assertIsNone(util.get_vmss_instance_name_from_ip('10.0.0.1', 'rg_name'))
+        network_interfaces.list.assert_called_once_with('rg_name')
+
+        # Unknown IPs list the resource group once more, e.g. for a VM created since,
+        # unless the index is recent.
+        self.assertIsNone(util.get_instance_name_from_ip('10.0.0.9', 'rg_name'))
+        self.assertIsNone(util.get_instance_name_from_ip('10.0.0.8', 'rg_name'))
+        self.assertEqual(network_interfaces.list.call_count, 1)
+        now[0] += 30
+        self.assertIsNone(util.get_instance_name_from_ip('10.0.0.9', 'rg_name'))
+        self.assertIsNone(util.get_instance_name_from_ip('10.0.0.8', 'rg_name'))
+        self.assertEqual(network_interfaces.list.call_count, 2)
+
+        # Known IPs are checked against their NIC once the index is not recent.
+        network_interfaces.get.return_value = nic
+        now[0] += 30
+        self.assertEqual(util.get_instance_name_from_ip('10.0.0.1', 'rg_name'), 'vm1')
+        network_interfaces.get.assert_called_once_with('rg_name', 'vm1-nic')
+        self.assertEqual(network_interfaces.list.call_count, 2)
+
+        # The IP moved to another VM.
+        vm2_id = vm_id.replace('vm1', 'vm2')
+        mock_vm2 = MagicMock(id=vm2_id, tags={}, instance_id=None)
+        mock_vm2.name = 'vm2'
+        mock_compute_client.virtual_machines.list.return_value = [mock_vm2]
+        network_interfaces.list.return_value = [
+            MagicMock(id='/subscriptions/sub1/nics/vm2-nic', virtual_machine=MagicMock(id=vm2_id),
+                      ip_configurations=[MagicMock(private_ip_address='10.0.0.1')])]
+        network_interfaces.get.side_effect = ResourceNotFoundError('vm1-nic')
+        self.assertEqual(util.get_instance_name_from_ip('10.0.0.1', 'rg_name'), 'vm2')
+        self.assertEqual(network_interfaces.list.call_count, 3)
+
+    @patch('apimrt.clouds.azure.azure_utils.AzureUtil.network_client')
+    @patch('apimrt.clouds.azure.azure_utils.AzureUtil.compute_client')
+    def test_ip_index_expires(self, mock_compute_client, mock_network_client):
+        mock_compute_client.virtual_machines.list.return_value = []
+        mock_compute_client.virtual_machine_scale_sets.list.return_value = []
+        mock_network_client.network_interfaces.list.return_value = []
+        with patch('apimrt.clouds.azure.azure_utils.time.monotonic') as mock_monotonic:
+            mock_monotonic.return_value = 1000.0
+            util = AzureUtil('rg_name', 'sub1')
+            util.get_ip_index()
+            mock_monotonic.return_value = 1299.0
+            util.get_ip_index()
+            self.assertEqual(mock_network_client.network_interfaces.list.call_count, 1)
+            mock_monotonic.return_value = 1300.0
+            util.get_ip_index()
+            self.assertEqual(mock_network_client.network_interfaces.list.call_count, 2)
+
     @patch('apimrt.clouds.azure.azure_utils.AzureUtil.authorization_client')
     def test_get_instance_roles(self, mock_authorization_client):
         mock_role_assignment1 = MagicMock(role_definition_id='role1')
@@ -384,34 +562,116 @@ class TestAzureUtil(unittest.TestCase):
         mock_get_secret_value.side_effect = mock_get_secret_value
         result = util.get_secrets("key_vault_url")
 
-    @patch('azure.storage.blob.BlobServiceClient.from_connection_string')
-    @patch('azure.storage.blob.BlobServiceClient.get_container_client')
-    @patch('azure.storage.blob.BlobServiceClient.get_blob_client')
-    @patch('apimrt.clouds.azure.azure_utils.AzureUtil.storage_connection_string')
-    @patch('apimrt.clouds.azure.azure_utils.AzureUtil.download_from_blob')
-    @patch('apimrt.clouds.azure.azure_utils.AzureUtil.storage_client')
-    def test_upload_to_blob_with_connection_string(self, mock_from_connection_string, mock_storage_connection_string, mock_download_from_blob, mock_container_client, mock_get_blob_client, mock_storage_client):
-        container_name = 'test_container'
-        blob_name = '/Users/I551770/Documents/GIT/new-upgrade/concourse_utils_apimrt/apimrt_utils/apimrt/clouds/azure/azure_utils.py'
-        upload_file_path = '/Users/I551770/Documents/GIT/new-upgrade/concourse_utils_apimrt/apimrt_utils/apimrt/clouds/azure/azure_utils.py'
-        mock_storage_connection_string.return_value = "default_connection_string"
-        mock_from_connection_string.return_value = "from_connection_string"
-        azure_util = AzureUtil('rg_name')
-        azure_util.upload_to_blob(container_name, blob_name, upload_file_path)
-
-
-    @patch('azure.storage.blob.BlobServiceClient.from_connection_string')
-    @patch('azure.storage.blob.BlobServiceClient.get_container_client')
-    @patch('azure.storage.blob.BlobServiceClient.get_blob_client')
+    @patch('apimrt.clouds.azure.azure_utils.SecretClient')
+    @patch('apimrt.clouds.azure.azure_utils.AzureUtil.get_credential_chain')
+    def test_get_secrets_shares_client(self, mock_get_credential_chain, mock_secret_client):
+        client = mock_secret_client.return_value
+        client.list_properties_of_secrets.return_value = [MagicMock(), MagicMock()]
+        client.list_properties_of_secrets.return_value[0].name = 'user'
+        client.list_properties_of_secrets.return_value[1].name = 'password'
+        client.get_secret.side_effect = lambda name: MagicMock(value=f'value of {name}')
+        util = AzureUtil('rg_name', 'sub1')
+        self.assertEqual(util.get_secrets('key_vault_url'),
+                         {'user': 'value of user', 'password': 'value of password'})
+        self.assertEqual(util.get_secrets('key_vault_url', names=['password']),
+                         {'password': 'value of password'})
+        client.list_properties_of_secrets.assert_called_once()
+        mock_secret_client.assert_called_once()
+
+    def mock_vault(self, mock_secret_client, secrets):
+        """Serves secrets, a dict of name to a list of (value, version) read one after the other."""
+        reads = {name: iter(values) for name, values in secrets.items()}
+
+        def get_secret(name):
+            if name not in reads:
+                raise ResourceNotFoundError(f'{name} not found')
+            value, version = next(reads[name])
+            return MagicMock(value=value, properties=MagicMock(version=version))
+
+        client = mock_secret_client.return_value
+        client.get_secret.side_effect = get_secret
+        client.set_secret.side_effect = lambda name, value: MagicMock(properties=MagicMock(version=f'{name}-new'))
+        return client
+
+    @patch('apimrt.clouds.azure.azure_utils.SecretClient')
+    @patch('apimrt.clouds.azure.azure_utils.AzureUtil.get_credential_chain')
+    def test_update_secrets_batch(self, mock_get_credential_chain, mock_secret_client):
+        client = self.mock_vault(mock_secret_client, {
+            'user': [('admin', 'v1')] * 2, 'password': [('old', 'v1')] * 2})
+        result = AzureUtil('rg_name', 'sub1').update_secrets_batch(
+            {'user': 'admin', 'password': 'new', 'port': '5432'}, 'key_vault_url', {'password': 'v1'})
+        self.assertEqual(result['version'], {'port': 'port-new', 'password': 'password-new'})
+        self.assertEqual(sorted(call.args for call in client.set_secret.call_args_list),
+                         [('password', 'new'), ('port', '5432')])
+
+    @patch('apimrt.clouds.azure.azure_utils.SecretClient')
+    @patch('apimrt.clouds.azure.azure_utils.AzureUtil.get_credential_chain')
+    def test_update_secrets_batch_conflicts(self, mock_get_credential_chain, mock_secret_client):
+        cases = {
+            'expected version differs': ({'password': [('old', 'v2')]}, {'password': 'v1'}),
+            'expected secret is missing': ({}, {'password': 'v1'}),
+            'modified concurrently': ({'password': [('old', 'v1'), ('other', 'v2')]}, None),
+            'created concurrently': ({}, None),
+        }
+        for case, (secrets, expected_version) in cases.items():
+            with self.subTest(case=case):
+                clear_client_cache()
+                mock_secret_client.reset_mock()
+                client = self.mock_vault(mock_secret_client, secrets)
+                if case == 'created concurrently':
+                    client.get_secret.side_effect = [
+                        ResourceNotFoundError('not found'), MagicMock(value='other', properties=MagicMock(version='v1'))]
+                with self.assertRaises(SecretConflictError):
+                    AzureUtil('rg_name', 'sub1').update_secrets_batch(
+                        {'password': 'new'}, 'key_vault_url', expected_version)
+                client.set_secret.assert_not_called()
+
+    @patch('apimrt.clouds.azure.azure_utils.BlobServiceClient')
     @patch('apimrt.clouds.azure.azure_utils.AzureUtil.storage_connection_string')
-    @patch('apimrt.clouds.azure.azure_utils.AzureUtil.storage_client')
-    def test_download_from_blob(self, mock_from_connection_string, mock_storage_connection_string, mock_container_client, mock_blob_client, mock_storage_client):
-        blob_name = 'folder_name/file_name'
-        download_file_path = '/path/to/your/file'
-        mock_storage_connection_string.return_value = "default_connection_string"
-
-        azure_util = AzureUtil('rg_name')
-        azure_util.download_from_blob('test_container', blob_name, download_file_path)
+    def test_upload_to_blob_with_connection_string(self, mock_storage_connection_string, mock_blob_service_client):
+        container_client = mock_blob_service_client.from_connection_string.return_value.get_container_client.return_value
+        container_client.exists.return_value = False
+        blob_client, backup_client = MagicMock(url='https://account/container/blob'), MagicMock()
+        blob_client.exists.return_value = True
+        backup_client.start_copy_from_url.return_value = {'copy_status': 'success'}
+        container_client.get_blob_client.side_effect = [blob_client, backup_client]
+        azure_util = AzureUtil('rg_name', 'sub1')
+        with tempfile.NamedTemporaryFile() as upload_file:
+            azure_util.upload_to_blob('test_container', 'folder/blob', upload_file.name, 'connection_string')
+
+        mock_storage_connection_string.assert_not_called()
+        container_client.create_container.assert_called_once()
+        backup_client.start_copy_from_url.assert_called_once_with('https://account/container/blob')
+        self.assertTrue(container_client.get_blob_client.call_args.args[0].startswith('folder/blob_backup_'))
+        blob_client.upload_blob.assert_called_once()
+        blob_client.download_blob.assert_not_called()
+
+    @patch('apimrt.clouds.azure.azure_utils.time.sleep')
+    def test_wait_for_copy(self, mock_sleep):
+        backup_client = MagicMock()
+        backup_client.get_blob_properties.return_value.copy.status = 'success'
+        AzureUtil._wait_for_copy(backup_client, {'copy_status': 'pending'})
+        mock_sleep.assert_called_once()
+        backup_client.get_blob_properties.return_value.copy.status = 'failed'
+        with self.assertRaises(HttpResponseError):
+            AzureUtil._wait_for_copy(backup_client, {'copy_status': 'pending'})
+
+    @patch('apimrt.clouds.azure.azure_utils.BlobServiceClient')
+    @patch('apimrt.clouds.azure.azure_utils.AzureUtil.get_storage_account_key')
+    def test_download_from_blob(self, mock_get_storage_account_key, mock_blob_service_client):
+        mock_get_storage_account_key.return_value = {"storage_account_name": "account", "key_value": "key"}
+        container_client = mock_blob_service_client.from_connection_string.return_value.get_container_client.return_value
+        blob_client = container_client.get_blob_client.return_value
+        blob_client.download_blob.return_value.readall.return_value = b'contents'
+        azure_util = AzureUtil('rg_name', 'sub1')
+
+        self.assertEqual(azure_util.download_from_blob('test_container', 'folder_name/file_name'), b'contents')
+        blob_client.exists.return_value = False
+        self.assertIsNone(azure_util.download_from_blob('test_container', 'folder_name/file_name'))
+        container_client.list_blobs.assert_not_called()
+        # The connection string and the client are reused.
+        mock_get_storage_account_key.assert_called_once()
+        mock_blob_service_client.from_connection_string.assert_called_once()
     
 
     @patch('apimrt.clouds.azure.azure_utils.AzureUtil.secret_client')
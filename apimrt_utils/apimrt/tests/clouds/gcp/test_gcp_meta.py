@@ -1,12 +1,14 @@
 import unittest
 from unittest import mock
 from apimrt.clouds.gcp.gcp_meta import Gcp
+from apimrt.cloud_meta.metadata import clear_metadata_cache
 
 class GcpMetaTestCase(unittest.TestCase):
     def setUp(self):
+        clear_metadata_cache()
         self.gcp_meta = Gcp()
         
-    @mock.patch('requests.get')
+    @mock.patch('apimrt.cloud_meta.metadata.MetadataClient._get')
     def test_get_project_name(self, mock_get):
         my_mock_response = mock.Mock(status_code=200)
         my_mock_response.text = 'example'
@@ -15,7 +17,7 @@ class GcpMetaTestCase(unittest.TestCase):
         self.assertEqual(
             'example', resp)
         
-    @mock.patch('requests.get')
+    @mock.patch('apimrt.cloud_meta.metadata.MetadataClient._get')
     def test_get_service_account(self, mock_get):
         my_mock_response = mock.Mock(status_code=200)
         my_mock_response.text = 'example1'
@@ -24,7 +26,7 @@ class GcpMetaTestCase(unittest.TestCase):
         self.assertEqual(
             ['example1'], resp)
         
-    @mock.patch('requests.get')
+    @mock.patch('apimrt.cloud_meta.metadata.MetadataClient._get')
     def test_get_access_token(self, mock_get):
         with mock.patch('apimrt.clouds.gcp.gcp_meta.Gcp.get_service_account') as mock_srv_acc:
             mock_srv_acc.return_value = ['example']
@@ -35,7 +37,7 @@ class GcpMetaTestCase(unittest.TestCase):
             self.assertEqual(
                 'example1', resp)
             
-    @mock.patch('requests.get')
+    @mock.patch('apimrt.cloud_meta.metadata.MetadataClient._get')
     def test_get_global_project_id(self, mock_get):
         my_mock_response = mock.Mock(status_code=200)
         my_mock_response.text = 'example1'
@@ -1,8 +1,42 @@
+import json
 import unittest
 from unittest import mock
 from unittest.mock import MagicMock, patch
 
+from google.api_core.exceptions import FailedPrecondition
+
 from apimrt.clouds.gcp.gcp_utils import GcpUtil
+from apimrt.cloud_meta.cloud_register import SecretConflictError
+
+
+def secret_version(number, data=None):
+    version = MagicMock(payload=MagicMock(data=data))
+    version.name = f'projects/test-project/secrets/s/versions/{number}'
+    return version
+
+
+class FakeSecretManager:
+    """Secret Manager keeping the versions of one secret, `latest` is the newest version."""
+
+    def __init__(self, payload):
+        self.payloads, self.states = {}, {}
+        self.add_version({'payload': {'data': json.dumps(payload).encode('UTF-8')}})
+
+    def add_version(self, request):
+        number = str(len(self.payloads) + 1)
+        self.payloads[number], self.states[number] = request['payload']['data'], 'ENABLED'
+        return secret_version(number)
+
+    def access_secret_version(self, request):
+        number = request['name'].split('/')[-1]
+        if number == 'latest':
+            number = max(self.payloads, key=int)
+        if self.states[number] != 'ENABLED':
+            raise FailedPrecondition(f'version {number} is {self.states[number]}')
+        return secret_version(number, self.payloads[number])
+
+    def disable_secret_version(self, request):
+        self.states[request['name'].split('/')[-1]] = 'DISABLED'
 
 
 class GcpUtilTestCase(unittest.TestCase):
@@ -85,6 +119,48 @@ class GcpUtilTestCase(unittest.TestCase):
         result = self.gcp_util.get_secrets("your_secret_id")
         self.assertEqual(result, {"key": "value"})
         
+    def mock_secret_versions(self, mock_client, latest, added):
+        client = mock_client.return_value
+        client.access_secret_version.return_value = MagicMock(
+            name='latest', payload=MagicMock(data=b'{"user": "admin", "password": "old"}'))
+        client.access_secret_version.return_value.name = f'projects/test-project/secrets/s/versions/{latest}'
+        client.add_secret_version.return_value.name = f'projects/test-project/secrets/s/versions/{added}'
+        return client
+
+    @patch('apimrt.clouds.gcp.gcp_utils.secretmanager.SecretManagerServiceClient')
+    def test_update_secrets_batch(self, mock_client):
+        client = self.mock_secret_versions(mock_client, latest=4, added=5)
+        result = self.gcp_util.update_secrets_batch({'password': 'new'}, 's', expected_version='4')
+        self.assertEqual(result['version'], '5')
+        self.assertEqual(result['updated'], ['password'])
+        payload = client.add_secret_version.call_args.kwargs['request']['payload']['data']
+        self.assertEqual(payload, b'{"user": "admin", "password": "new"}')
+        client.disable_secret_version.assert_not_called()
+
+    @patch('apimrt.clouds.gcp.gcp_utils.secretmanager.SecretManagerServiceClient')
+    def test_update_secrets_batch_expected_version_conflict(self, mock_client):
+        client = self.mock_secret_versions(mock_client, latest=4, added=5)
+        with self.assertRaises(SecretConflictError):
+            self.gcp_util.update_secrets_batch({'password': 'new'}, 's', expected_version='3')
+        client.add_secret_version.assert_not_called()
+
+    @patch('apimrt.clouds.gcp.gcp_utils.secretmanager.SecretManagerServiceClient')
+    def test_update_secrets_batch_concurrent_version_is_reverted(self, mock_client):
+        secrets = FakeSecretManager({'user': 'admin', 'password': 'old'})
+        mock_client.return_value = secrets
+
+        def concurrent_write(request):
+            # Another writer adds version 2 between the read and the write.
+            secrets.add_secret_version = secrets.add_version
+            secrets.add_version({'payload': {'data': b'{"user": "other", "password": "old"}'}})
+            return secrets.add_version(request)
+
+        secrets.add_secret_version = concurrent_write
+        with self.assertRaises(SecretConflictError):
+            self.gcp_util.update_secrets_batch({'password': 'new'}, 's')
+        self.assertEqual(secrets.states, {'1': 'ENABLED', '2': 'ENABLED', '3': 'DISABLED', '4': 'ENABLED'})
+        self.assertEqual(self.gcp_util.get_secrets('s'), {'user': 'other', 'password': 'old'})
+
     @patch('apimrt.clouds.gcp.gcp_utils.compute_v1.InstancesClient')
     def test_list_attached_volumes(self, mock_instances_client):
         mock_instances_client.return_value.get.return_value = MagicMock(
@@ -0,0 +1,87 @@
+import json
+import os
+import socket
+import tempfile
+import unittest
+from unittest import mock
+
+from apimrt.common_cloud.utils import commcloud_utils
+from apimrt.common_cloud.utils.commcloud_utils import get_cloud_provider
+
+
+class GetCloudProviderTestCase(unittest.TestCase):
+
+    def setUp(self):
+        tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp_dir.cleanup)
+        self.cache_file = os.path.join(tmp_dir.name, 'cloud-provider')
+        env = mock.patch.dict(os.environ, {'APIMRT_CLOUD_PROVIDER_CACHE': self.cache_file})
+        env.start()
+        self.addCleanup(env.stop)
+        os.environ.pop('APIMRT_CLOUD_PROVIDER', None)
+        commcloud_utils._cloud_provider = commcloud_utils._cloud_provider_expires = None
+        self.addCleanup(setattr, commcloud_utils, '_cloud_provider', None)
+
+    def cached_provider(self):
+        if not os.path.exists(self.cache_file):
+            return None
+        with open(self.cache_file) as cache_file:
+            return json.load(cache_file)['provider']
+
+    @mock.patch('apimrt.common_cloud.utils.commcloud_utils.detect_cloud_provider')
+    def test_detection_is_cached(self, mock_detect):
+        mock_detect.return_value = 'aws'
+        self.assertEqual(get_cloud_provider(), 'aws')
+        self.assertEqual(self.cached_provider(), 'aws')
+        commcloud_utils._cloud_provider = None
+        self.assertEqual(get_cloud_provider(), 'aws')
+        mock_detect.assert_called_once()
+
+    @mock.patch('apimrt.common_cloud.utils.commcloud_utils.time.time')
+    @mock.patch('apimrt.common_cloud.utils.commcloud_utils.time.monotonic')
+    @mock.patch('apimrt.common_cloud.utils.commcloud_utils.detect_cloud_provider')
+    def test_fallback_is_cached_for_a_while(self, mock_detect, mock_monotonic, mock_time):
+        mock_detect.return_value = None
+        mock_monotonic.return_value = mock_time.return_value = 1000
+        self.assertEqual(get_cloud_provider(), 'cc3')
+        self.assertEqual(self.cached_provider(), 'cc3')
+        self.assertEqual(get_cloud_provider(), 'cc3')
+        # Another process of the host reads the fallback from the cache file.
+        commcloud_utils._cloud_provider = None
+        self.assertEqual(get_cloud_provider(), 'cc3')
+        mock_detect.assert_called_once()
+
+        # A slow endpoint answers the next time the fallback expired.
+        mock_detect.return_value = 'azure'
+        mock_monotonic.return_value = mock_time.return_value = 1000 + commcloud_utils.__FALLBACK_TTL__
+        self.assertEqual(get_cloud_provider(), 'azure')
+        self.assertEqual(self.cached_provider(), 'azure')
+
+    @mock.patch('apimrt.common_cloud.utils.commcloud_utils.detect_cloud_provider')
+    def test_cached_fallback_without_expiry_is_ignored(self, mock_detect):
+        with open(self.cache_file, 'w') as cache_file:
+            json.dump({'host': socket.gethostname(), 'provider': 'cc3'}, cache_file)
+        mock_detect.return_value = 'gcp'
+        self.assertEqual(get_cloud_provider(), 'gcp')
+
+    @mock.patch('cloud_detect.provider')
+    def test_detection_timeout(self, mock_provider):
+        mock_provider.return_value = 'unknown'
+        self.assertIsNone(commcloud_utils.detect_cloud_provider())
+        mock_provider.assert_called_once_with(timeout=2)
+        with mock.patch.dict(os.environ, {'APIMRT_CLOUD_PROVIDER_TIMEOUT': '0.5'}):
+            commcloud_utils.detect_cloud_provider()
+        mock_provider.assert_called_with(timeout=0.5)
+
+    @mock.patch('apimrt.common_cloud.utils.commcloud_utils.detect_cloud_provider')
+    def test_override(self, mock_detect):
+        with mock.patch.dict(os.environ, {'APIMRT_CLOUD_PROVIDER': 'alibaba'}):
+            self.assertEqual(get_cloud_provider(), 'alibaba')
+        with mock.patch.dict(os.environ, {'APIMRT_CLOUD_PROVIDER': 'nimbus'}):
+            with self.assertRaises(ValueError):
+                get_cloud_provider()
+        mock_detect.assert_not_called()
+
+
+if __name__ == '__main__':
+    unittest.main()
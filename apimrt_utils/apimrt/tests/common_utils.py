@@ -0,0 +1,56 @@
+import contextlib
+import os
+import re
+import tempfile
+import threading
+from importlib.metadata import EntryPoint
+from pathlib import Path
+from unittest import mock
+
+from cliff.commandmanager import CommandManager
+
+SETUP_FILE = Path(__file__).resolve().parents[2] / 'setup.py'
+
+
+def command_entry_points():
+    """Returns the apimrt commands declared in setup.py, by entry point name."""
+
+    setup = SETUP_FILE.read_text()
+    entry_points = setup[setup.index("entry_points="):]
+    commands = entry_points[entry_points.index("'apimrt': ["):]
+    commands = commands[:commands.index("]")]
+    return dict(re.findall(r"'(\w+)\s*=\s*(apimrt[\w.]+:\w+)'", commands))
+
+
+class SetupCommandManager(CommandManager):
+    """Loads the commands from setup.py, so the tests run without installing the package.
+
+    Patch it over apimrt.main.CommandManager.
+    """
+
+    def load_commands(self, namespace):
+        self.group_list.append(namespace)
+        for name, value in command_entry_points().items():
+            self.commands[name.replace('_', ' ')] = EntryPoint(name, value, namespace)
+
+
+@contextlib.contextmanager
+def running_daemon(**kwargs):
+    """Serves apimrt commands from a thread of this process on a temporary socket.
+
+    Yields the daemon, whose socket is also set as $APIMRT_DAEMON_SOCKET.
+    """
+
+    from apimrt.daemon import Daemon, stop
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        socket_path = os.path.join(tmp_dir, 'apimrt.sock')
+        daemon = Daemon(socket_path, **kwargs)
+        thread = threading.Thread(target=daemon.serve, daemon=True)
+        thread.start()
+        try:
+            with mock.patch.dict(os.environ, {'APIMRT_DAEMON_SOCKET': socket_path}):
+                yield daemon
+        finally:
+            stop(socket_path)
+            thread.join(timeout=5)
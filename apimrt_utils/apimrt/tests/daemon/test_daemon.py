@@ -0,0 +1,151 @@
+import contextlib
+import io
+import json
+import os
+import socket
+import tempfile
+import threading
+import time
+import unittest
+from unittest import mock
+
+from apimrt import daemon
+from apimrt.tests.common_utils import SetupCommandManager, running_daemon
+
+
+class FakeSocket:
+
+    def __init__(self):
+        self.sent = b''
+
+    def sendall(self, data):
+        self.sent += data
+
+    def messages(self):
+        return [json.loads(line) for line in self.sent.splitlines()]
+
+
+def forward(argv):
+    stdout, stderr = io.StringIO(), io.StringIO()
+    with contextlib.redirect_stdout(stdout), contextlib.redirect_stderr(stderr):
+        exit_code = daemon.forward(argv)
+    return exit_code, stdout.getvalue(), stderr.getvalue()
+
+
+class ShouldForwardTestCase(unittest.TestCase):
+
+    def test_should_forward(self):
+        cases = {
+            ('cloud', 'type'): True,
+            ('--cloud-provider', 'aws', 'cloud', 'type'): True,
+            ('batch', '-f', 'commands.txt'): True,
+            ('batch', '--file=commands.txt'): True,
+            (): False,
+            ('--cloud-provider', 'aws'): False,
+            ('serve',): False,
+            ('batch',): False,
+            ('batch', '-f', '-'): False,
+        }
+        for argv, expected in cases.items():
+            with self.subTest(argv=argv), mock.patch.dict(os.environ):
+                os.environ.pop('APIMRT_NO_DAEMON', None)
+                self.assertEqual(daemon.should_forward(list(argv)), expected)
+
+    @mock.patch.dict(os.environ, {'APIMRT_NO_DAEMON': '1'})
+    def test_should_forward_disabled(self):
+        self.assertFalse(daemon.should_forward(['cloud', 'type']))
+
+
+class StreamSenderTestCase(unittest.TestCase):
+
+    def test_keeps_the_order_of_the_streams(self):
+        sock = FakeSocket()
+        sender = daemon._StreamSender(sock)
+        stdout, stderr = daemon._SentStream(sender, 'stdout'), daemon._SentStream(sender, 'stderr')
+        stdout.write('one')
+        stdout.write(' line\nhalf')
+        stderr.write('warning\n')
+        stdout.write(' done\n')
+        stderr.write('no newline')
+        sender.flush()
+        self.assertEqual(sock.messages(), [
+            {'stream': 'stdout', 'data': 'one line\n'},
+            {'stream': 'stdout', 'data': 'half'},
+            {'stream': 'stderr', 'data': 'warning\n'},
+            {'stream': 'stdout', 'data': ' done\n'},
+            {'stream': 'stderr', 'data': 'no newline'},
+        ])
+
+
+@mock.patch.dict(os.environ, {'APIMRT_CLOUD_PROVIDER': 'cc3'})
+@mock.patch('apimrt.main.CommandManager', SetupCommandManager)
+class ForwardTestCase(unittest.TestCase):
+
+    def test_forward(self):
+        with running_daemon():
+            self.assertEqual(forward(['cloud', 'type']), (0, 'cc3\n', ''))
+
+    def test_forward_failing_command(self):
+        with running_daemon():
+            exit_code, stdout, stderr = forward(['cloud', 'type', '--no_such_option'])
+        self.assertEqual((exit_code, stdout), (2, ''))
+        self.assertIn('--no_such_option', stderr)
+
+    def test_forward_streams_output(self):
+        def run_command(argv, stdout, stderr):
+            stdout.write('first\n')
+            stderr.write('second\n')
+            stdout.write('third\n')
+            return 3
+
+        with running_daemon(), mock.patch('apimrt.daemon.run_command', run_command):
+            output = io.StringIO()
+            with contextlib.redirect_stdout(output), contextlib.redirect_stderr(output):
+                exit_code = daemon.forward(['cloud', 'type'])
+        self.assertEqual((exit_code, output.getvalue()), (3, 'first\nsecond\nthird\n'))
+
+    def test_forward_with_other_credentials(self):
+        with running_daemon(), mock.patch('apimrt.daemon.run_command') as run_command:
+            with mock.patch.dict(os.environ, {'AWS_PROFILE': 'other', 'AZURE_SUBSCRIPTION_ID': 'other'}):
+                self.assertIsNone(daemon.forward(['cloud', 'type']))
+            run_command.assert_not_called()
+
+    def test_forward_while_busy(self):
+        started, release = threading.Event(), threading.Event()
+
+        def run_command(argv, stdout, stderr):
+            started.set()
+            release.wait(5)
+            return 0
+
+        with running_daemon(), mock.patch('apimrt.daemon.run_command', run_command):
+            first = threading.Thread(target=forward, args=(['cloud', 'type'],))
+            first.start()
+            self.assertTrue(started.wait(5))
+            try:
+                # Answered right away while the first command is still running.
+                self.assertIsNone(daemon.forward(['cloud', 'type']))
+            finally:
+                release.set()
+                first.join(5)
+            self.assertEqual(forward(['cloud', 'type']), (0, '', ''))
+
+    @mock.patch('apimrt.daemon.__RESPONSE_TIMEOUT__', 0.2)
+    def test_forward_to_hung_daemon(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            socket_path = os.path.join(tmp_dir, 'apimrt.sock')
+            with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+                # Connections are queued but never answered.
+                sock.bind(socket_path)
+                sock.listen(1)
+                started = time.monotonic()
+                self.assertIsNone(daemon.forward(['cloud', 'type'], socket_path))
+                self.assertLess(time.monotonic() - started, 2)
+
+    def test_forward_without_daemon(self):
+        with mock.patch.dict(os.environ, {'APIMRT_DAEMON_SOCKET': '/nonexistent/apimrt.sock'}):
+            self.assertIsNone(daemon.forward(['cloud', 'type']))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,127 @@
+import os
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+from apimrt import inventory
+from apimrt.inventory import InventoryCache, InventoryParseError, inv_sections, inv_to_dict, parse_lines
+
+INVENTORY = """
+ungrouped-host
+
+[ms]
+10.0.0.1 ansible_user=admin region=dc-1
+; a comment
+10.0.0.2 label="first node" note='it''s' # trailing comment
+
+[router]
+10.0.0.3
+
+[ms:vars]
+ansible_port = 2222
+banner=a = b
+
+[gateway:children]
+router
+ms
+
+[all:children]
+gateway
+"""
+
+
+class ParseTestCase(unittest.TestCase):
+
+    def test_parse_lines(self):
+        parsed = parse_lines(INVENTORY.splitlines())
+        self.assertEqual(parsed.groups, {
+            'ungrouped': ['ungrouped-host'], 'ms': ['10.0.0.1', '10.0.0.2'], 'router': ['10.0.0.3']})
+        self.assertEqual(parsed.children, {'gateway': ['router', 'ms'], 'all': ['gateway']})
+        self.assertEqual(parsed.group_vars, {'ms': {'ansible_port': '2222', 'banner': 'a = b'}})
+        self.assertEqual(parsed.host_vars, {
+            '10.0.0.1': {'ansible_user': 'admin', 'region': 'dc-1'},
+            '10.0.0.2': {'label': 'first node', 'note': 'its'},
+        })
+
+    def test_hosts_of_nested_groups(self):
+        # ms is reached twice, its hosts are listed once, breadth first.
+        parsed = parse_lines(INVENTORY.splitlines() + ['[all:children]', 'ms'])
+        self.assertEqual(parsed.hosts('all'), ['10.0.0.1', '10.0.0.2', '10.0.0.3'])
+        self.assertEqual(parsed.hosts('unknown'), [])
+
+    def test_parse_errors(self):
+        for lines in (['[ms'], ['[ms:other]'], ['[ms:vars]', 'no_value'], ['[ms]', '10.0.0.1 no_value']):
+            with self.subTest(lines=lines):
+                with self.assertRaises(InventoryParseError):
+                    parse_lines(lines)
+
+
+class InventoryCacheTestCase(unittest.TestCase):
+
+    def setUp(self):
+        tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp_dir.cleanup)
+        self.tmp_dir = Path(tmp_dir.name)
+        self.inv_path = self.tmp_dir / 'inventory.ini'
+        self.inv_path.write_text(INVENTORY)
+        self.cache_dir = self.tmp_dir / 'cache'
+
+    def load(self, cache):
+        with mock.patch('apimrt.inventory.parse_inventory', wraps=inventory.parse_inventory) as parse:
+            parsed = cache.load(self.inv_path)
+        return parsed, parse.call_count
+
+    def test_unchanged_file_is_parsed_once(self):
+        cache = InventoryCache(self.cache_dir)
+        self.assertEqual(self.load(cache)[1], 1)
+        self.assertEqual(self.load(cache)[1], 0)
+        # Another process only sees the on-disk entry.
+        parsed, parse_count = self.load(InventoryCache(self.cache_dir))
+        self.assertEqual(parse_count, 0)
+        self.assertEqual(parsed.hosts('gateway'), ['10.0.0.3', '10.0.0.1', '10.0.0.2'])
+
+    def test_changed_file_is_parsed_again(self):
+        cache = InventoryCache(self.cache_dir)
+        self.load(cache)
+        stat = os.stat(self.inv_path)
+        self.inv_path.write_text(INVENTORY.replace('10.0.0.3', '10.0.0.4'))
+        os.utime(self.inv_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1))
+        parsed, parse_count = self.load(cache)
+        self.assertEqual(parse_count, 1)
+        self.assertEqual(parsed.groups['router'], ['10.0.0.4'])
+
+    def test_touched_file_is_not_parsed_again(self):
+        cache = InventoryCache(self.cache_dir)
+        self.load(cache)
+        stat = os.stat(self.inv_path)
+        os.utime(self.inv_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1))
+        self.assertEqual(self.load(InventoryCache(self.cache_dir))[1], 0)
+
+    def test_inv_to_dict(self):
+        with mock.patch('apimrt.inventory._default_cache', InventoryCache(None)):
+            groups = inv_to_dict(self.inv_path)
+        self.assertEqual(groups['gateway'], ['10.0.0.3', '10.0.0.1', '10.0.0.2'])
+        self.assertEqual(groups['all'], groups['gateway'])
+        self.assertEqual(groups['ms'], ['10.0.0.1', '10.0.0.2'])
+
+    def test_inv_sections(self):
+        sections = inv_sections(self.inv_path)
+        self.assertEqual(list(sections), ['ms', 'router', 'ms:vars', 'gateway:children', 'all:children'])
+        self.assertEqual(sections['ms'], [
+            'ungrouped-host',
+            '10.0.0.1 ansible_user=admin region=dc-1',
+            '; a comment',
+            "10.0.0.2 label=\"first node\" note='it''s' # trailing comment",
+        ])
+        self.assertEqual(sections['ms:vars'], ['ansible_port = 2222', 'banner=a = b'])
+        self.assertEqual(sections['gateway:children'], ['router', 'ms'])
+
+    def test_inv_sections_without_header(self):
+        Path(self.inv_path).write_text('10.0.0.1\n')
+        with self.assertRaises(InventoryParseError):
+            inv_sections(self.inv_path)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,71 @@
+import json
+import os
+import stat
+import subprocess
+import tempfile
+import unittest
+from pathlib import Path
+
+from apimrt.secrets import map_secrets, materialize, to_env_file
+
+SECRETS = {'ms_username': 'admin', 'ms_password': "it's $ecret", 'ldap_password': 'ldap', 'other-key': 'kept'}
+
+
+class SecretsTestCase(unittest.TestCase):
+
+    def setUp(self):
+        tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp_dir.cleanup)
+        self.tmp_dir = Path(tmp_dir.name)
+
+    def test_map_secrets(self):
+        self.assertEqual(
+            map_secrets(SECRETS),
+            {'msusername': 'admin', 'mspassword': "it's $ecret", 'ldappassword': 'ldap', 'other-key': 'kept'},
+        )
+
+    def test_materialize(self):
+        umask = os.umask(0o022)
+        try:
+            mapped = materialize(
+                SECRETS,
+                output_file=self.tmp_dir / 'secrets.json',
+                env_file=self.tmp_dir / 'secrets.env',
+                env_prefix='APIGEE_',
+                component_dir=self.tmp_dir / 'secrets',
+                components=['ms', 'pg'],
+            )
+        finally:
+            os.umask(umask)
+
+        files = ['secrets.json', 'secrets.env', 'secrets/ms_secrets.json', 'secrets/pg_secrets.json']
+        for name in files:
+            with self.subTest(name=name):
+                self.assertEqual(stat.S_IMODE(os.stat(self.tmp_dir / name).st_mode), 0o600)
+        self.assertEqual(sorted(str(path.relative_to(self.tmp_dir)) for path in self.tmp_dir.rglob('*')),
+                         sorted(files + ['secrets']))
+        self.assertEqual(json.loads((self.tmp_dir / 'secrets.json').read_text()), mapped)
+        self.assertEqual(json.loads((self.tmp_dir / 'secrets/ms_secrets.json').read_text()),
+                         {'msusername': 'admin', 'mspassword': "it's $ecret"})
+        self.assertEqual(json.loads((self.tmp_dir / 'secrets/pg_secrets.json').read_text()), {})
+
+    def test_env_file_is_sourceable(self):
+        env_file = self.tmp_dir / 'secrets.env'
+        env_file.write_text(to_env_file(map_secrets(SECRETS), 'APIGEE_'))
+        output = subprocess.run(
+            ['bash', '-c', f'set -a && . {env_file} && echo "$APIGEE_mspassword" && echo "$APIGEE_other_key"'],
+            check=True, stdout=subprocess.PIPE, universal_newlines=True,
+        ).stdout
+        self.assertEqual(output, "it's $ecret\nkept\n")
+
+    def test_materialize_replaces_files(self):
+        output_file = self.tmp_dir / 'secrets.json'
+        output_file.write_text('old')
+        os.chmod(output_file, 0o644)
+        materialize({'ms_password': 'new'}, output_file=output_file)
+        self.assertEqual(json.loads(output_file.read_text()), {'mspassword': 'new'})
+        self.assertEqual(stat.S_IMODE(os.stat(output_file).st_mode), 0o600)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,58 @@
+import json
+import subprocess
+import sys
+import unittest
+
+from apimrt.tests.common_utils import command_entry_points
+
+# `apimrt --help` loads every command, and `apimrt <command>` at least one.
+STARTUP_BUDGET = 0.3
+
+# Libraries a command may only import once it runs.
+HEAVY_MODULES = (
+    'paramiko', 'ansible', 'cassandra', 'ldap3', 'jinja2', 'urllib3', 'requests', 'aiohttp',
+    'cloud_detect', 'boto3', 'azure', 'google.cloud', 'aliyunsdkcore', 'oss2',
+)
+
+# Loads the commands the way cliff does for `apimrt --help` and reports the
+# time spent and the modules imported.
+SCRIPT = """
+import json, sys, time
+from importlib import import_module
+start = time.perf_counter()
+import apimrt.main
+for entry_point in json.loads(sys.argv[1]):
+    module, _, attr = entry_point.partition(':')
+    command = getattr(import_module(module), attr)(None, None)
+    command.get_description()
+elapsed = time.perf_counter() - start
+print(json.dumps({'elapsed': elapsed, 'modules': sorted(sys.modules)}))
+"""
+
+
+def load_commands():
+    output = subprocess.run(
+        [sys.executable, '-c', SCRIPT, json.dumps(list(command_entry_points().values()))],
+        check=True, capture_output=True, text=True,
+    ).stdout
+    return json.loads(output.splitlines()[-1])
+
+
+class StartupTestCase(unittest.TestCase):
+
+    def test_commands_do_not_import_heavy_modules(self):
+        modules = load_commands()['modules']
+        loaded = sorted(
+            heavy for heavy in HEAVY_MODULES
+            if any(module == heavy or module.startswith(heavy + '.') for module in modules)
+        )
+        self.assertEqual(loaded, [])
+
+    def test_startup_budget(self):
+        # The best of a few runs, the first one also pays for cold caches.
+        elapsed = min(load_commands()['elapsed'] for _ in range(3))
+        self.assertLess(elapsed, STARTUP_BUDGET)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,149 @@
+import io
+import os
+import subprocess
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+from apimrt.transfer import Transfer, TransferException, parse_mapping
+
+
+def run_locally(client, command, stdin=None):
+    """Runs the remote commands of a transfer on this host."""
+
+    data = None
+    if stdin is not None:
+        buffer = io.BytesIO()
+        buffer.close = lambda: None
+        stdin(buffer)
+        data = buffer.getvalue()
+    result = subprocess.run(['bash', '-c', command], input=data, stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
+    return result.returncode, result.stdout.decode('utf-8')
+
+
+def tree(root):
+    """The files, directories and symlinks below root with the file contents."""
+
+    entries = {}
+    for path in sorted(Path(root).rglob('*')):
+        name = str(path.relative_to(root))
+        if path.is_symlink():
+            entries[name] = ('link', os.readlink(path))
+        elif path.is_dir():
+            entries[name] = ('dir',)
+        else:
+            entries[name] = ('file', path.read_text())
+    return entries
+
+
+@mock.patch('paramiko.RSAKey.from_private_key_file')
+@mock.patch.object(Transfer, '_connect', mock.MagicMock())
+@mock.patch.object(Transfer, '_run', staticmethod(run_locally))
+class TransferTestCase(unittest.TestCase):
+
+    def setUp(self):
+        tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp_dir.cleanup)
+        self.source = Path(tmp_dir.name) / 'source'
+        (self.source / 'conf' / 'nested').mkdir(parents=True)
+        (self.source / 'conf' / 'app.yml').write_text('app')
+        (self.source / 'conf' / 'nested' / 'deep.yml').write_text('deep')
+        (self.source / 'a.sh').write_text('a')
+        (self.source / 'b.sh').write_text('b')
+        (self.source / 'link.sh').symlink_to(self.source / 'a.sh')
+        self.transferred = Path(tmp_dir.name) / 'transferred'
+        self.copied = Path(tmp_dir.name) / 'copied'
+
+    def assert_same_as_cp(self, sources, destination, existing_dir=False):
+        """Transfers the sources and copies them with cp -rL, which follows scp -r."""
+
+        for root in (self.transferred, self.copied):
+            root.mkdir()
+            if existing_dir:
+                (root / destination).mkdir()
+        expanded = sorted(str(path) for pattern in sources for path in self.source.glob(pattern))
+        subprocess.run(['cp', '-rL', *expanded, str(self.copied / destination)], check=True)
+        exit_status, output = Transfer('host').send(
+            [(str(self.source / pattern), str(self.transferred / destination)) for pattern in sources])
+        self.assertEqual((exit_status, output), (0, ''))
+        self.assertEqual(tree(self.transferred), tree(self.copied))
+
+    def test_file_to_new_path(self, _):
+        self.assert_same_as_cp(['a.sh'], 'renamed.sh')
+
+    def test_file_into_existing_dir(self, _):
+        self.assert_same_as_cp(['a.sh'], 'scripts', existing_dir=True)
+
+    def test_dir_to_new_path(self, _):
+        self.assert_same_as_cp(['conf'], 'config')
+
+    def test_dir_into_existing_dir(self, _):
+        self.assert_same_as_cp(['conf'], 'config', existing_dir=True)
+
+    def test_glob_into_existing_dir(self, _):
+        self.assert_same_as_cp(['*.sh'], 'scripts', existing_dir=True)
+
+    def test_symlinks_are_followed(self, _):
+        self.assert_same_as_cp(['link.sh'], 'scripts', existing_dir=True)
+        self.assertEqual(tree(self.transferred)['scripts/link.sh'], ('file', 'a'))
+
+    def test_pre_and_post_commands(self, _):
+        destination = self.transferred / 'scripts'
+        exit_status, output = Transfer('host').send(
+            [(str(self.source / '*.sh'), str(destination))],
+            pre_commands=[f'mkdir -p {destination}'],
+            post_commands=[f'ls {destination}'],
+        )
+        self.assertEqual((exit_status, output), (0, 'a.sh\nb.sh\nlink.sh\n'))
+
+    def test_missing_sources(self, _):
+        mappings = [(str(self.source / 'missing*'), str(self.transferred))]
+        with self.assertRaises(TransferException):
+            Transfer('host').send(mappings)
+        self.assertEqual(Transfer('host').send(mappings, allow_missing=True), (0, ''))
+        self.assertFalse(self.transferred.exists())
+
+
+class RunTestCase(unittest.TestCase):
+    """Transfer._run against a mocked paramiko channel."""
+
+    def setUp(self):
+        self.channel = mock.MagicMock()
+        self.remote_stdin = mock.MagicMock()
+        self.channel.makefile.side_effect = lambda mode: \
+            self.remote_stdin if mode == 'wb' else io.BytesIO(b'output')
+        self.channel.recv_exit_status.return_value = 2
+        self.client = mock.MagicMock()
+        self.client.get_transport.return_value.open_session.return_value = self.channel
+
+    def test_remote_exited_early(self):
+        # paramiko reports writes to a closed channel as a plain OSError
+        self.remote_stdin.write.side_effect = OSError('Socket is closed')
+        exit_status, output = Transfer._run(self.client, 'tar', stdin=lambda f: f.write(b'data'))
+        self.assertEqual((exit_status, output), (2, 'output'))
+        self.channel.shutdown_write.assert_called_once_with()
+
+    def test_local_read_error(self):
+        def write_archive(remote_stdin):
+            remote_stdin.write(b'part')
+            raise PermissionError(13, 'Permission denied', '/tmp/secret')
+
+        with self.assertRaises(TransferException):
+            Transfer._run(self.client, 'tar', stdin=write_archive)
+        self.channel.shutdown_write.assert_not_called()
+        self.channel.close.assert_called()
+
+
+class ParseMappingTestCase(unittest.TestCase):
+
+    def test_parse_mapping(self):
+        self.assertEqual(parse_mapping('/tmp/a,b/*,/home/dest'), ('/tmp/a,b/*', '/home/dest'))
+        for mapping in ('/tmp/a', ',/home/dest', '/tmp/a,'):
+            with self.subTest(mapping=mapping):
+                with self.assertRaises(TransferException):
+                    parse_mapping(mapping)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,230 @@
+"""Bulk file transfer to a remote node as one compressed tar stream over SSH."""
+
+import glob
+import os
+import shlex
+import tarfile
+import threading
+from pathlib import Path
+from typing import TYPE_CHECKING, List, Optional, Sequence, Tuple, Union
+
+if TYPE_CHECKING:
+    from paramiko import SSHClient
+
+_PathLike = Union[str, Path]
+
+# Remote command extracting the stream. Paths in the archive are relative to /,
+# -p keeps the file modes and existing directories keep their permissions.
+__EXTRACT_COMMAND__: str = "tar --no-overwrite-dir -xzpf - -C /"
+
+
+class TransferException(Exception):
+    pass
+
+
+class _RemoteStdin:
+    """Writes to the stdin of a remote command.
+
+    paramiko reports a closed channel as a plain OSError, which is turned into
+    BrokenPipeError here, so it is told apart from errors reading local files.
+    """
+
+    def __init__(self, channel_file) -> None:
+        self._file = channel_file
+
+    def _call(self, method, *args):
+        try:
+            return method(*args)
+        except OSError as excp:
+            raise BrokenPipeError(f"Remote command stopped reading: {excp}") from excp
+
+    def write(self, data: bytes) -> int:
+        return self._call(self._file.write, data)
+
+    def flush(self) -> None:
+        self._call(self._file.flush)
+
+    def close(self) -> None:
+        self._call(self._file.close)
+
+
+def parse_mapping(mapping: str) -> Tuple[str, str]:
+    """Splits a `SOURCE,DESTINATION` argument as used by script_block.sh.
+
+    Raises:
+        TransferException: The mapping has no destination.
+    """
+
+    source, sep, destination = mapping.rpartition(",")
+    if not sep or not source or not destination:
+        raise TransferException(f"Expected SOURCE,DESTINATION but got {mapping!r}")
+    return source, destination
+
+
+class Transfer:
+    """Copies local paths to a remote node over a single SSH connection.
+
+    The sources are packed into a gzip compressed tar stream that is extracted
+    remotely while it is being written, so no archive is staged on either side.
+    Destinations follow `scp -r` semantics: a source lands inside a destination
+    that is an existing directory, otherwise the destination names the copy.
+    Like scp, symlinks are followed and the files they point to are copied.
+    """
+
+    def __init__(
+            self,
+            host: str,
+            ssh_user: str = "concourseci",
+            ssh_private_key: _PathLike = "/tmp/ssh-private-key",
+            ssh_port: int = 22,
+            timeout: float = 30.0,
+    ) -> None:
+        """Initializes the transfer object.
+
+        Args:
+            host (str): The remote node address.
+            ssh_user (str): The SSH username.
+            ssh_private_key (str): The path to the SSH private key.
+            ssh_port (int): The SSH port.
+            timeout (float): Timeout in seconds for establishing the connection.
+        """
+
+        import paramiko
+
+        self._host = host
+        self._ssh_user = ssh_user
+        self._ssh_private_key = paramiko.RSAKey.from_private_key_file(str(ssh_private_key))
+        self._ssh_port = ssh_port
+        self._timeout = timeout
+
+    def _connect(self) -> "SSHClient":
+        import paramiko
+
+        client = paramiko.SSHClient()
+        client.set_missing_host_key_policy(paramiko.AutoAddPolicy())
+        client.connect(
+            self._host,
+            port=self._ssh_port,
+            username=self._ssh_user,
+            pkey=self._ssh_private_key,
+            timeout=self._timeout,
+            look_for_keys=False,
+            allow_agent=False,
+        )
+        return client
+
+    @staticmethod
+    def _run(client: "SSHClient", command: str, stdin: Optional[callable] = None) -> Tuple[int, str]:
+        """Runs a command on a new channel of the connection.
+
+        The combined output is drained in the background, so a chatty command
+        cannot stall the data written to its stdin.
+        """
+
+        channel = client.get_transport().open_session()
+        channel.set_combine_stderr(True)
+        channel.exec_command(command)
+
+        output: List[bytes] = []
+        reader = threading.Thread(target=lambda: output.append(channel.makefile("rb").read()))
+        reader.start()
+        try:
+            if stdin is not None:
+                remote_stdin = _RemoteStdin(channel.makefile("wb"))
+                try:
+                    stdin(remote_stdin)
+                    remote_stdin.close()
+                except (BrokenPipeError, ConnectionResetError):
+                    # The remote command exited early, its exit status and
+                    # output tell why.
+                    pass
+                except OSError as excp:
+                    # A local file could not be read, the remote side only got part of the archive.
+                    raise TransferException(f"Reading the files to transfer failed: {excp}") from excp
+            channel.shutdown_write()
+            exit_status = channel.recv_exit_status()
+        except BaseException:
+            # Unblocks the reader, which waits for the remote command to exit.
+            channel.close()
+            raise
+        finally:
+            reader.join()
+            channel.close()
+        return exit_status, b"".join(output).decode("utf-8", errors="replace")
+
+    @staticmethod
+    def _expand_sources(source: str, allow_missing: bool) -> List[str]:
+        sources = sorted(glob.glob(os.path.expanduser(source)))
+        if not sources and not allow_missing:
+            raise TransferException(f"No files found for {source}")
+        return sources
+
+    def send(
+            self,
+            mappings: Sequence[Tuple[str, str]],
+            pre_commands: Sequence[str] = (),
+            post_commands: Sequence[str] = (),
+            allow_missing: bool = False,
+    ) -> Tuple[int, str]:
+        """Sends the sources to their destinations and runs the commands around the copy.
+
+        Args:
+            mappings: (source, destination) pairs, sources may be glob patterns
+            pre_commands: commands run before extracting, e.g. mkdir -p
+            post_commands: commands run after extracting, e.g. chmod
+            allow_missing: skip sources without matching files instead of failing
+
+        Returns:
+            The exit status and the combined output of the remote commands.
+
+        Raises:
+            TransferException: A source has no matching files or could not be read.
+        """
+
+        expanded = [
+            (self._expand_sources(source, allow_missing), destination)
+            for source, destination in mappings
+        ]
+        destinations = sorted({
+            destination for sources, destination in expanded if sources
+        })
+
+        client = self._connect()
+        try:
+            # Pre commands run first, then the same command reports which
+            # destinations are existing directories, as scp would find out.
+            probe = " && ".join([*pre_commands, *(
+                f"if [ -d {shlex.quote(d)} ]; then echo {shlex.quote(d)}; fi" for d in destinations
+            )])
+            exit_status, output = self._run(client, probe) if probe else (0, "")
+            if exit_status != 0:
+                return exit_status, output
+            lines = output.splitlines(keepends=True)
+            existing_dirs = {line.rstrip("\n") for line in lines} & set(destinations)
+            output = "".join(line for line in lines if line.rstrip("\n") not in existing_dirs)
+
+            members: List[Tuple[str, str]] = []
+            for sources, destination in expanded:
+                into_dir = destination in existing_dirs or len(sources) > 1
+                for source in sources:
+                    target = os.path.join(destination, os.path.basename(source.rstrip("/"))) \
+                        if into_dir else destination
+                    members.append((source, os.path.normpath(target).lstrip("/")))
+
+            def write_archive(remote_stdin) -> None:
+                with tarfile.open(fileobj=remote_stdin, mode="w|gz", dereference=True) as archive:
+                    for source, arcname in members:
+                        archive.add(source, arcname=arcname, recursive=True)
+
+            command = " && ".join([
+                *([__EXTRACT_COMMAND__] if members else []),
+                *post_commands,
+            ])
+            if not command:
+                return 0, output
+            exit_status, copy_output = self._run(
+                client, command, stdin=write_archive if members else None,
+            )
+            return exit_status, output + copy_output
+        finally:
+            client.close()
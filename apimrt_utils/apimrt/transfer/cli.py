@@ -0,0 +1,114 @@
+import sys
+from argparse import ArgumentParser, Namespace
+
+from cliff.command import Command
+
+from . import Transfer, parse_mapping
+
+
+class TransferCLI(Command):
+    """Command-line interface for the bulk file transfer.
+
+    Args:
+        Command (Command): Registers the TransferCLI as a cliff `Command`.
+    """
+
+    def get_parser(self, prog_name: str) -> ArgumentParser:
+        """Parses the command-line arguments supplied to the transfer command.
+
+        Args:
+            prog_name (str): The name of the program.
+
+        Returns:
+            ArgumentParser: The argument parser object.
+        """
+
+        parser = super(TransferCLI, self).get_parser(prog_name)
+        parser.add_argument(
+            "mappings",
+            metavar="SOURCE,DESTINATION",
+            nargs="*",
+            type=parse_mapping,
+            help="Local path or glob pattern and the remote destination, with scp -r semantics",
+        )
+        parser.add_argument(
+            "-H",
+            "--host",
+            dest="host",
+            help="Remote node address",
+            required=True,
+        )
+        parser.add_argument(
+            "-u",
+            "--ssh_user",
+            dest="ssh_user",
+            help="SSH username",
+            default="concourseci",
+        )
+        parser.add_argument(
+            "-k",
+            "--ssh_private_key",
+            dest="ssh_private_key",
+            help="SSH private key file path",
+            default="/tmp/ssh-private-key",
+        )
+        parser.add_argument(
+            "-p",
+            "--ssh_port",
+            dest="ssh_port",
+            help="SSH port",
+            type=int,
+            default=22,
+        )
+        parser.add_argument(
+            "--pre",
+            dest="pre_commands",
+            help="Remote command to run before copying, can be repeated",
+            action="append",
+            default=[],
+        )
+        parser.add_argument(
+            "--post",
+            dest="post_commands",
+            help="Remote command to run after copying, can be repeated",
+            action="append",
+            default=[],
+        )
+        parser.add_argument(
+            "--allow_missing",
+            dest="allow_missing",
+            help="Skip sources without matching files instead of failing",
+            action="store_true",
+        )
+        return parser
+
+    def take_action(self, parsed_args: Namespace):
+        """Copies the sources and runs the remote commands over one SSH connection.
+
+        Args:
+            parsed_args (Namespace): The parsed command-line arguments.
+
+        Returns:
+            int: The exit status of the remote commands, 1 if the transfer could not start.
+        """
+
+        try:
+            transfer = Transfer(
+                parsed_args.host,
+                ssh_user=parsed_args.ssh_user,
+                ssh_private_key=parsed_args.ssh_private_key,
+                ssh_port=parsed_args.ssh_port,
+            )
+            exit_status, output = transfer.send(
+                parsed_args.mappings,
+                pre_commands=parsed_args.pre_commands,
+                post_commands=parsed_args.post_commands,
+                allow_missing=parsed_args.allow_missing,
+            )
+        except Exception as _e:
+            print(_e, file=sys.stderr)
+            return 1
+
+        if output:
+            print(output, end="")
+        return exit_status
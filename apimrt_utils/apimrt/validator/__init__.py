@@ -8,12 +8,9 @@ from typing import Any, Dict, Optional, List, Callable, Tuple
 
 import yaml
 import schema
-import jinja2
-import tzlocal
 from prettytable import PrettyTable, SINGLE_BORDER, ALL
 
 from .consts import __SERVER_GROUPS_SCHEMA__, __TASKS_SCHEMA__
-from .modules import remoteshell, localshell, apicall
 from .types import ValidatorModuleException, Manifest, ReportFile, RunList
 from .types import Stats, Status
 
@@ -44,6 +41,10 @@ class Validator:
                 the manifest file.
         """
 
+        # Deferred so the CLI only pays for them when validating.
+        import jinja2
+        import tzlocal
+
         # We validate the manifest's schema preemptively so that we don't need guard clauses later on,
         # and we can just operate on the manifest data directly.
         self._manifest: Optional[Manifest] = None
@@ -104,6 +105,9 @@ class Validator:
     def validate(self) -> Tuple[Stats, str]:
         """TODO: docstring"""
 
+        # The modules pull in paramiko and urllib3.
+        from .modules import remoteshell, localshell, apicall
+
         total = 0
         passed = 0
         failed = 0
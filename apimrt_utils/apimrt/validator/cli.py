@@ -8,9 +8,6 @@ from typing import Optional
 from cliff.command import Command
 
 from .types import ReportFile, RunList
-from . import Validator
-from .validation_lister import ValidationLister
-from .validation.validate import ValidationClass
 from os import path
 
 
@@ -90,6 +87,8 @@ class ValidatorCLI(Command):
             if run != "all":
                 run = run.split(",")
 
+        from . import Validator
+
         validator = Validator(
             parsed_args.manifest,
             extra_vars=parsed_args.extra_vars,
@@ -168,6 +167,8 @@ class ValidationListerCLI(Command):
         report_file = parsed_args.report_file
         report_format = parsed_args.report_format
 
+        from .validation_lister import ValidationLister
+
         validation_lister = ValidationLister(validation_folder=folder, validation_files=files)
         validation_lister.report(file_path=report_file, formatter=report_format)
 
@@ -312,6 +313,8 @@ class ValidationCLI(Command):
             "private_key" : parsed_args.ssh_key
         }
 
+        from .validation.validate import ValidationClass
+
         validation = ValidationClass()
 
         validation.validate(extra_var=extra_var, validations_folder=validations_folder, inv_path=inv,optional_components=optional_components)
@@ -1,5 +1,3 @@
-import copy
-
 COMPONENT_LIST = ['ms', 'pg', 'qpid', 'ldap', 'zkcs', 'localhost']
 
 COMPONENT_TASKS = {
@@ -54,28 +52,5 @@ APIMRT_MODULES = [
 ]
 
 
-def inv_to_dict(inv_path):
-    # inv to dict code block
-    value = []
-    flag = 0
-    inv = {}
-
-    with open(inv_path, 'r') as file:
-        data = file.read()
-
-    for d in data.split("\n"):
-        if "[" in d:
-            if flag != 0:
-                inv[key] = copy.deepcopy(value)
-                value.clear()
-            key = d.replace("[", "").replace("]", "")
-            flag = 1
-        else:
-            if d is not '':
-                value.append(d)
-    inv[key] = value
-    return inv
-
-
 def print_color(text, color_code):
     print(f"{color_code}{text}\033[0m")
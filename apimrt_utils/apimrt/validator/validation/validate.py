@@ -1,5 +1,6 @@
+from apimrt.inventory import inv_to_dict
 from apimrt.validator import Validator
-from apimrt.validator.validation.extra import inv_to_dict, print_color, COMPONENT_LIST, COMPONENT_TASKS, \
+from apimrt.validator.validation.extra import print_color, COMPONENT_LIST, COMPONENT_TASKS, \
     DEFAULT_INVENTORY_PATH, DEFAULT_VALIDATIONS_FOLDER, APIMRT_MODULES
 
 
@@ -71,7 +71,7 @@ setup(
     install_requires=get_install_requires(''),
     package_data={'apimrt': ['apigee/cassandra/config/*.yml', 'clouds/aws/data/*.yml', 'clouds/azure/data/*.yml',
                              'clouds/alibaba/data/*.yml', 'clouds/gcp/data/*.yml', 'clouds/cc3/data/*.yml',
-                             'validator/validations/*', 'custom_props/config/*.yml',
+                             'validator/validations/*', 'custom_props/config/*.yml', 'secrets/config/*.yml',
                              ]},
     namespace_packages=[],
     packages=find_namespace_packages(),
@@ -93,6 +93,7 @@ setup(
             'cloud_instance_tags_get = apimrt.common_cloud.common_cloud_cli:GetInstanceTags',
             'cloud_secrets_get = apimrt.common_cloud.common_cloud_cli:GetSecret',
             'cloud_secrets_update = apimrt.common_cloud.common_cloud_cli:UpdateSecrets',
+            'cloud_secrets_batch_update = apimrt.common_cloud.common_cloud_cli:UpdateSecretsBatch',
             'cloud_project_secret = apimrt.common_cloud.common_cloud_cli:GetProjectSecretName',
             'cloud_scalinggroups_get = apimrt.common_cloud.common_cloud_cli:GetScalingGroups',
             'cloud_permission_available_get = apimrt.common_cloud.common_cloud_cli:GetAvailablePermissions',
@@ -105,7 +106,11 @@ setup(
             'validation = apimrt.validator.cli:ValidationCLI',
             'silentconfig_generate = apimrt.silent_config.cli:SilentConfigCLI',
             'notify_teams = apimrt.notifier.notify_cli.notify:TeamsNotificationCli',
-            'custom_props_modify = apimrt.custom_props.cli:CustomPropsCLI'
+            'custom_props_modify = apimrt.custom_props.cli:CustomPropsCLI',
+            'transfer = apimrt.transfer.cli:TransferCLI',
+            'serve = apimrt.daemon.cli:ServeCLI',
+            'batch = apimrt.batch.cli:BatchCLI',
+            'secrets_materialize = apimrt.secrets.cli:MaterializeSecretsCLI'
         ],
     },
 )
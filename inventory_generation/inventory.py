@@ -1,87 +1,228 @@
 import re
 import argparse
 import itertools
-import inspect
+import json
 import logging
-from typing import List, Dict, Union, Optional
+import os
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, List, Dict, Tuple, Union, Optional
 from pathlib import Path
 from ssl import SSLError
 import sys
+import threading
 
 import requests
+import yaml
+from requests.adapters import HTTPAdapter
 from requests.auth import HTTPBasicAuth
-from paramiko import SSHClient, RSAKey, AutoAddPolicy
-
 from utils import network
+from utils.ssh import SSHPool
+from utils.cache import InventoryCache, default_cache_path, diff_server_groups, server_key, \
+    __CACHE_TTL__
 
 __ZOOKEEPER_PORT__: int = 2181
 
+# Upper bound on concurrent management API requests, also used as the
+# connection pool size of the shared session.
+__MAX_WORKERS__: int = 16
+
+# Server listing modes: one request per (region, pod, type), one request per
+# region or a single request for the whole landscape.
+__LISTING_MODES__: Tuple[str, ...] = ("type", "region", "landscape")
+
+# Settings every landscape of a batch file has to provide.
+__BATCH_REQUIRED__: Tuple[str, ...] = (
+    "name", "ms_url", "username", "password", "ssh_user", "ssh_priv_key", "ldap", "inventory",
+)
+
+# Roles that move between nodes, on a postgres failover or when SSO is set up on
+# another management server, they are probed on every run instead of being
+# taken from the topology cache.
+__MOVING_ROLES__: Tuple[str, ...] = ("sso", "pg_replica")
+
+# Server fields exposed as ansible host vars by the dynamic inventory mode.
+__HOST_VARS__: Tuple[str, ...] = ("region", "pod", "isUp")
+
 _PathLike = Union[str, Path]
 
+
+class InventoryException(Exception):
+    """Raised when the management API cannot be reached, main exits on it."""
+    pass
+
+
+class BudgetedAdapter(HTTPAdapter):
+    """HTTP adapter bounding the in-flight requests by a semaphore
+
+    Args:
+        budget: semaphore shared by the adapters of all landscapes of a batch,
+            None leaves the requests unbounded
+        verify: TLS verification forced for every request sent through the
+            adapter, None keeps the session setting
+    """
+
+    def __init__(
+            self,
+            budget: Optional[threading.Semaphore] = None,
+            verify: Optional[bool] = None,
+            **kwargs: Any,
+    ) -> None:
+        self._budget = budget
+        self._verify = verify
+        super().__init__(**kwargs)
+
+    def send(self, request, **kwargs):
+        if self._verify is not None:
+            kwargs["verify"] = self._verify
+        if self._budget is None:
+            return super().send(request, **kwargs)
+        with self._budget:
+            return super().send(request, **kwargs)
+
+
 session = requests.Session()
+session.mount("http://", HTTPAdapter(pool_maxsize=__MAX_WORKERS__))
+session.mount("https://", HTTPAdapter(pool_maxsize=__MAX_WORKERS__))
 
 logging.basicConfig(
-    level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+    level=logging.INFO,
+    format="%(asctime)s - %(name)s - %(levelname)s - %(funcName)s: %(message)s",
 )
 logger = logging.getLogger("inventory")
 
 
-def is_sso_installed(
-        ms_ip: str,
-        ssh_user: str,
-        ssh_priv_key: _PathLike,
-        ssh_port: int = 22,
-) -> bool:
-    """TODO: docstring"""
+def is_sso_installed(ms_ip: str, ssh_pool: SSHPool) -> bool:
+    """Checks whether apigee-sso is installed on the management server.
 
-    check_file = "/opt/apigee/token/application/sso.properties"
+    Args:
+        ms_ip: management server ip
+        ssh_pool: pooled SSH connections of the current run
+
+    Returns:
+        Indicates whether the sso properties are present and the sso service is known.
+    """
 
-    client = SSHClient()
-    priv_key = RSAKey.from_private_key_file(ssh_priv_key)
-    client.set_missing_host_key_policy(AutoAddPolicy())
-    client.connect(ms_ip, ssh_port, ssh_user, pkey=priv_key)
+    check_file = "/opt/apigee/token/application/sso.properties"
 
-    _, stdout, _ = client.exec_command(f"stat {check_file}")
-    file_check_output = stdout.read().decode("utf-8")
-    _,stdout,_ = client.exec_command("apigee-service apigee-sso status")
-    exit_status = stdout.channel.recv_exit_status()
+    _, file_check_output = ssh_pool.run(ms_ip, f"stat {check_file}")
+    exit_status, _ = ssh_pool.run(ms_ip, "apigee-service apigee-sso status")
     if len(file_check_output) > 0 and exit_status != 5:
         return True
     return False
 
 
-def is_pg_replica(
-        pg_ip: str,
-        ssh_user: str,
-        ssh_priv_key: _PathLike,
-        ssh_port: int = 22,
-) -> bool:
+def is_pg_replica(pg_ip: str, ssh_pool: SSHPool) -> bool:
     """Checks whether the current node is a postgres replica node.
     :return: Indicates whether the current node is a postgres replica node.
     :rtype: bool
     """
 
-    client = SSHClient()
-    priv_key = RSAKey.from_private_key_file(ssh_priv_key)
-    client.set_missing_host_key_policy(AutoAddPolicy())
-    client.connect(pg_ip, ssh_port, ssh_user, pkey=priv_key)
-
-    _, stdout, _ = client.exec_command("{} {} {}".format(
+    _, output = ssh_pool.run(pg_ip, "{} {} {}".format(
         "/opt/apigee/apigee-service/bin/apigee-service",
         "apigee-postgresql",
         "postgres-check-standby",
     ))
-    if not stdout:
+    if not output:
         # If there was no output, we assume that the current node is not the replica node.
         return False
 
     matches: List[str] = re.findall(
-        ".*slave/standby$", stdout.read().decode("utf-8"),
+        ".*slave/standby$", output,
     )
 
     return bool(matches)
 
 
+def probe_roles(
+        servers: Dict[str, List[Dict[str, str]]],
+        ssh_pool: SSHPool,
+        max_workers: int = __MAX_WORKERS__,
+        known_roles: Optional[Dict[str, Dict[str, bool]]] = None,
+) -> Dict[str, Dict[str, bool]]:
+    """Runs the SSO and PG replica probes concurrently
+
+    Args:
+        servers: server groups containing at least the ms and pg groups
+        ssh_pool: pooled SSH connections of the current run
+        max_workers: maximum number of hosts probed at the same time
+        known_roles: earlier probe results in the returned format, nodes found
+            there are not probed again for roles outside __MOVING_ROLES__
+
+    Returns:
+        {
+            'sso': {server_key: is_sso_installed result for each ms node},
+            'pg_replica': {server_key: is_pg_replica result for each pg node},
+        }
+    """
+    probes = {
+        "sso": (is_sso_installed, servers["ms"]),
+        "pg_replica": (is_pg_replica, servers["pg"]),
+    }
+    known_roles = known_roles or {}
+    roles: Dict[str, Dict[str, bool]] = {name: {} for name in probes}
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {}
+        for name, (probe, group) in probes.items():
+            for server in group:
+                key = server_key(server)
+                if name not in __MOVING_ROLES__ and key in known_roles.get(name, {}):
+                    roles[name][key] = known_roles[name][key]
+                else:
+                    futures[(name, key)] = executor.submit(
+                        probe, server["ipv4_address"], ssh_pool,
+                    )
+        if futures:
+            logger.info(f"Probing roles of {len(futures)} nodes")
+        for (name, key), future in futures.items():
+            roles[name][key] = future.result()
+    return roles
+
+
+def known_roles_from_groups(
+        groups: Dict[str, List[Dict[str, str]]]
+) -> Dict[str, Dict[str, bool]]:
+    """Recovers probe_roles results from previously generated server groups"""
+    sso = {server_key(s) for s in groups.get("sso", [])}
+    replicas = {server_key(s) for s in groups.get("pgs", [])}
+    return {
+        "sso": {server_key(s): server_key(s) in sso for s in groups.get("ms", [])},
+        "pg_replica": {server_key(s): server_key(s) in replicas for s in groups.get("pg", [])},
+    }
+
+
+def list_servers(
+        ms_url: str, username: str, password: str, params: Optional[Dict[str, str]] = None
+) -> List[Dict[str, Any]]:
+    """Retrieves the raw server listing from apigee management
+
+    Args:
+        ms_url: management server URL with protocol
+        username: management sysadmin user
+        password: management sysadmin password
+        params: optional region, pod and type filters, all servers are listed when omitted
+
+    Returns:
+        The server objects as returned by /v1/servers
+
+    Raises:
+        InventoryException, ValueError
+
+    """
+    logger.info(f"Getting server with params {params}")
+    http_auth = HTTPBasicAuth(username, password)
+    try:
+        server_req = session.get(
+            f"{ms_url}/v1/servers", params=params, auth=http_auth)
+    except SSLError as e:
+        raise InventoryException("Invalid cert on target") from e
+    except Exception as e:
+        raise InventoryException("Unhandled error %s" % e) from e
+    if server_req.status_code != 200:
+        raise ValueError("Failed to receive http 200")
+    return server_req.json()
+
+
 def get_servers_by_type(
         region: str, pod: str, server_type: str, ms_url: str, username: str, password: str
 ) -> List[Dict[str, str]]:
@@ -96,15 +237,17 @@ def get_servers_by_type(
         password: management sysadmin password
 
     Returns:
-        A list of dictionaries containing 3 items each
+        A list of dictionaries containing 5 items each
         {
             'ipv4_address': internal server ip,
             'isUp': server isUp status (bool)
             'region': dc-1, dc-2...
+            'pod': gateway, central...
+            'uuid': server UUID
         }
 
     Raises:
-        ValueError
+        InventoryException, ValueError
 
     """
     params = {
@@ -112,26 +255,47 @@ def get_servers_by_type(
         "type": server_type,
         "pod": pod,
     }
-    logger.info(
-        f"{inspect.stack()[0][3]}: Getting server with params {params}")
-    http_auth = HTTPBasicAuth(username, password)
-    try:
-        server_req = session.get(
-            f"{ms_url}/v1/servers", params=params, auth=http_auth)
-    except SSLError:
-        logger.error("Invalid cert on target")
-        sys.exit(1)
-    except Exception as e:
-        logger.error("Unhandled error %s" % e)
-        sys.exit(1)
-    if server_req.status_code != 200:
-        raise ValueError("Failed to receive http 200")
     return [
-        {"ipv4_address": s["internalIP"], "isUp": s["isUp"], "region": region}
-        for s in server_req.json()
+        {
+            "ipv4_address": s["internalIP"],
+            "isUp": s["isUp"],
+            "region": region,
+            "pod": pod,
+            "uuid": s.get("uUID"),
+        }
+        for s in list_servers(ms_url, username, password, params)
     ]
 
 
+def index_servers(
+        server_list: List[Dict[str, Any]]
+) -> Dict[Tuple[str, str, str], List[Dict[str, str]]]:
+    """Indexes a raw server listing by region, pod and server type
+
+    Args:
+        server_list: server objects as returned by list_servers
+
+    Returns:
+        A map of (region, pod, server_type) to the servers in the same format
+        as get_servers_by_type. Servers carrying several types are indexed
+        under each of them.
+    """
+    index: Dict[Tuple[str, str, str], List[Dict[str, str]]] = defaultdict(list)
+    for s in server_list:
+        types = s["type"] if isinstance(s["type"], list) else [s["type"]]
+        for server_type in types:
+            index[(s["region"], s["pod"], server_type)].append(
+                {
+                    "ipv4_address": s["internalIP"],
+                    "isUp": s["isUp"],
+                    "region": s["region"],
+                    "pod": s["pod"],
+                    "uuid": s.get("uUID"),
+                }
+            )
+    return index
+
+
 def get_server_groups(
         region_pod_map: Dict[str, str],
         ldap_ips: List[str],
@@ -141,6 +305,10 @@ def get_server_groups(
         ssh_user: str,
         ssh_priv_key: _PathLike,
         ssh_port: int = 22,
+        max_workers: int = __MAX_WORKERS__,
+        listing: str = "type",
+        ssh_pool: Optional[SSHPool] = None,
+        previous: Optional[Dict[str, List[Dict[str, str]]]] = None,
 ) -> Dict[str, List[Dict[str, str]]]:
     """Retrieves servers grouped by server type
 
@@ -149,6 +317,14 @@ def get_server_groups(
         ms_url: management server URL with protocol
         username: management sysadmin user
         password: management sysadmin password
+        max_workers: maximum number of concurrent management API requests
+        listing: "type" queries the servers of every (region, pod, type) separately,
+            "region" lists each region once and "landscape" lists all servers in
+            a single request, the groups are then derived from a local index
+        ssh_pool: pooled SSH connections to reuse for the role probes, a pool is
+            created from the ssh settings and closed again when omitted
+        previous: server groups of an earlier run that are still trusted, roles
+            that cannot move are only probed for nodes missing there
 
     Returns:
         A map of inventory server type to server list(get_servers_by_type)
@@ -181,6 +357,7 @@ def get_server_groups(
         "qpid": {"type": "qpid-server", "pod": "central"},
         "pg": {"type": "postgres-server", "pod": "analytics"},
     }
+    jobs: List[Tuple[str, str, str, str]] = []
     for region, (server_type, type_data) in itertools.product(
             region_pod_map.keys(), server_type_map.items()
     ):
@@ -190,53 +367,79 @@ def get_server_groups(
             else region_pod_map[region]
         )
         logger.info(
-            f"{inspect.stack()[0][3]}: Retrieving {server_type} nodes"
+            f"Retrieving {server_type} nodes"
             f" from {region} region, {pod} pod"
         )
-
-        servers[server_type].extend(
-            get_servers_by_type(
-                region,
-                pod,
-                type_data["type"],
-                ms_url,
-                username,
-                password,
+        jobs.append((server_type, region, pod, type_data["type"]))
+
+    if listing not in __LISTING_MODES__:
+        raise ValueError(f"Unknown server listing mode {listing}")
+
+    # The management API is crawled concurrently over the shared session, results are
+    # collected in submission order so the inventory layout stays deterministic.
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        if listing == "type":
+            results = executor.map(
+                lambda job: get_servers_by_type(
+                    job[1], job[2], job[3], ms_url, username, password,
+                ),
+                jobs,
             )
-        )
-    logger.info(f"{inspect.stack()[0][3]}: Gathered all servers")
-
-    for zkcs in servers["zkcs"].copy():
-        out = network.netcat(
-            zkcs["ipv4_address"],
-            b"stat",
-            __ZOOKEEPER_PORT__,
-        ).decode("utf-8")
-        # Move ZKCS leader to end of the ZKCS list.
-        if re.search("Mode: leader", out):
-            servers["zkcs"].append(
-                servers["zkcs"].pop(
-                    servers["zkcs"].index(zkcs)
+        else:
+            if listing == "region":
+                listings = executor.map(
+                    lambda region: list_servers(
+                        ms_url, username, password, {"region": region},
+                    ),
+                    region_pod_map.keys(),
                 )
+                index = index_servers(list(itertools.chain.from_iterable(listings)))
+            else:
+                index = index_servers(list_servers(ms_url, username, password))
+            results = (index.get((job[1], job[2], job[3]), []) for job in jobs)
+        for (server_type, _, _, _), server_list in zip(jobs, results):
+            servers[server_type].extend(server_list)
+    logger.info("Gathered all servers")
+
+    zk_statuses = network.probe_zookeeper(
+        [zkcs["ipv4_address"] for zkcs in servers["zkcs"]],
+        __ZOOKEEPER_PORT__,
+    )
+    for status in zk_statuses:
+        if status["error"]:
+            logger.warning(f"ZooKeeper probe of {status['host']} failed: {status['error']}")
+        else:
+            logger.info(
+                f"ZooKeeper {status['host']}: mode {status['mode']},"
+                f" latency {status['latency']}, zxid {status['zxid']}"
             )
-            break
+    # Move ZKCS leader to end of the ZKCS list.
+    leader = network.find_zookeeper_leader(zk_statuses)
+    if leader is not None:
+        servers["zkcs"].sort(key=lambda zkcs: zkcs["ipv4_address"] == leader)
 
     # Add LDAP section.
     servers["ldap"] = []
     for ip in ldap_ips:
         servers["ldap"].append({"ipv4_address": ip})
 
+    known_roles = known_roles_from_groups(previous) if previous else None
+    if ssh_pool is None:
+        with SSHPool(ssh_user, ssh_priv_key, ssh_port) as pool:
+            roles = probe_roles(servers, pool, max_workers, known_roles)
+    else:
+        roles = probe_roles(servers, ssh_pool, max_workers, known_roles)
+
     # Add SSO section.
-    servers["sso"] = []
-    for ms in servers["ms"]:
-        if is_sso_installed(ms["ipv4_address"], ssh_user, ssh_priv_key, ssh_port):
-            servers["sso"].append(ms)
+    servers["sso"] = [
+        ms for ms in servers["ms"] if roles["sso"][server_key(ms)]
+    ]
 
     # Add PGM and PGS sections.
     servers["pgm"] = []
     servers["pgs"] = []
     for pg in servers["pg"]:
-        if is_pg_replica(pg["ipv4_address"], ssh_user, ssh_priv_key, ssh_port):
+        if roles["pg_replica"][server_key(pg)]:
             servers["pgs"].append(pg)
         else:
             servers["pgm"].append(pg)
@@ -266,30 +469,26 @@ def get_regions_pods(ms_url: str, username: str, password: str) -> Dict[str, str
             region: gateway_pod
         }
     """
-    logger.info(f"{inspect.stack()[0][3]}: Retrieving regions and pods")
+    logger.info("Retrieving regions and pods")
     region_pod_map: Dict[str, str] = {}
     try:
         regions = session.get(
             f"{ms_url}/v1/regions", auth=HTTPBasicAuth(username, password)
         ).json()
-    except SSLError:
-        logger.error("Invalid cert on target")
-        sys.exit(1)
+    except SSLError as e:
+        raise InventoryException("Invalid cert on target") from e
     except Exception as e:
-        logger.error("Unhandled error %s" % e)
-        sys.exit(1)
+        raise InventoryException("Unhandled error %s" % e) from e
     for region in regions:
         try:
             pods = session.get(
                 f"{ms_url}/v1/regions/{region}/pods",
                 auth=HTTPBasicAuth(username, password),
             ).json()
-        except SSLError:
-            logger.error("Invalid cert on target")
-            sys.exit(1)
+        except SSLError as e:
+            raise InventoryException("Invalid cert on target") from e
         except Exception as e:
-            logger.error("Unhandled error %s" % e)
-            sys.exit(1)
+            raise InventoryException("Unhandled error %s" % e) from e
         else:
             pods.remove("central")
             if "analytics" in pods:
@@ -300,72 +499,373 @@ def get_regions_pods(ms_url: str, username: str, password: str) -> Dict[str, str
     return region_pod_map
 
 
+def _env(option: str, default: Any = None) -> Any:
+    """Returns the value of the APIMRT_<OPTION> environment variable"""
+    return os.environ.get(f"APIMRT_{option.upper()}", default)
+
+
+def discover(
+        args: argparse.Namespace,
+        cache: InventoryCache,
+        budget: Optional[threading.Semaphore] = None,
+) -> Dict[str, List[Dict[str, str]]]:
+    """Discovers the landscape topology, reusing and refreshing the topology cache
+
+    Args:
+        args: parsed command line arguments of main
+        cache: topology cache of the landscape
+        budget: connection budget shared with other landscapes, bounds the SSH
+            role probes
+
+    Returns:
+        The server groups returned by get_server_groups
+    """
+    cached = cache.load()
+    previous = cached["groups"] if cached and cache.is_fresh(cached) else None
+    region_pod_map = get_regions_pods(
+        args.ms_url, args.username, args.password)
+    with SSHPool(args.ssh_user, args.ssh_priv_key, args.ssh_port, budget) as ssh_pool:
+        server_groups = get_server_groups(
+            region_pod_map,
+            args.ldap.split(","),
+            args.ms_url,
+            args.username,
+            args.password,
+            args.ssh_user,
+            args.ssh_priv_key,
+            ssh_port=args.ssh_port,
+            max_workers=args.max_workers,
+            listing=args.listing,
+            ssh_pool=ssh_pool,
+            previous=previous,
+        )
+
+    if cached:
+        changes = diff_server_groups(cached["groups"], server_groups)
+        if changes:
+            logger.info(f"Topology changes since the last run: {json.dumps(changes)}")
+        else:
+            logger.info("No topology changes since the last run")
+    cache.save(server_groups)
+    return server_groups
+
+
+def to_dynamic_inventory(server_groups: Dict[str, List[Dict[str, str]]]) -> Dict[str, Any]:
+    """Converts server groups to the JSON format of an ansible dynamic inventory
+
+    Returns:
+        {
+            group: {'hosts': [ip, ...]} for every server group,
+            '_meta': {'hostvars': {ip: {'region', 'pod', 'isUp'}}},
+        }
+        Host vars only contain the fields known for the host, ldap hosts have none.
+    """
+    inventory: Dict[str, Any] = {}
+    hostvars: Dict[str, Dict[str, Any]] = {}
+    for group, servers in server_groups.items():
+        inventory[group] = {"hosts": [server["ipv4_address"] for server in servers]}
+        for server in servers:
+            host = hostvars.setdefault(server["ipv4_address"], {})
+            host.update(
+                (field, server[field]) for field in __HOST_VARS__ if field in server
+            )
+    inventory["_meta"] = {"hostvars": hostvars}
+    return inventory
+
+
+def write_inventory(server_groups: Dict[str, List[Dict[str, str]]], inventory_path: _PathLike) -> None:
+    """Writes the server groups as INI inventory unless the file already has that content"""
+    logger.info("Generating inventory from server information")
+    inventory: List[str] = []
+    for group, servers in server_groups.items():
+        inventory.append(f"[{group}]")
+        inventory.extend(f"{server['ipv4_address']}" for server in servers)
+    content = "\n".join(inventory)
+    try:
+        with open(inventory_path, "r", encoding="utf-8") as inventory_file:
+            unchanged = inventory_file.read() == content
+    except OSError:
+        unchanged = False
+    if unchanged:
+        logger.info(f"Inventory {inventory_path} is up to date, not rewriting it")
+        return
+    Path(inventory_path).parent.mkdir(parents=True, exist_ok=True)
+    with open(inventory_path, "w", encoding="utf-8") as inventory_file:
+        inventory_file.write(content)
+    logger.info("Completed generating inventory")
+
+
+def resolve_reference(value: Any) -> Any:
+    """Resolves a credential reference of a batch file
+
+    "env:NAME" reads the environment variable NAME, "file:PATH" the stripped
+    content of PATH, other values are returned as they are.
+
+    Raises:
+        ValueError: the referenced environment variable is not set
+    """
+    if not isinstance(value, str):
+        return value
+    kind, _, ref = value.partition(":")
+    if kind == "env" and ref:
+        if ref not in os.environ:
+            raise ValueError(f"Environment variable {ref} is not set")
+        return os.environ[ref]
+    if kind == "file" and ref:
+        with open(os.path.expanduser(ref), "r", encoding="utf-8") as ref_file:
+            return ref_file.read().strip()
+    return value
+
+
+def load_batch(batch_file: _PathLike, defaults: argparse.Namespace) -> List[argparse.Namespace]:
+    """Reads the landscapes of a batch file
+
+    The file holds a 'landscapes' list and optional 'defaults' merged into
+    every landscape. A landscape needs 'name', 'ms_url', 'credentials' with
+    'username' and 'password' references, 'ldap' and 'inventory', every other
+    option of main falls back to the command line value. Relative inventory
+    and ssh_priv_key paths are resolved against the batch file directory.
+
+    Raises:
+        ValueError: the file has no landscapes or a landscape misses a setting
+    """
+    with open(batch_file, "r", encoding="utf-8") as yaml_file:
+        batch = yaml.safe_load(yaml_file) or {}
+    landscapes = batch.get("landscapes")
+    if not landscapes:
+        raise ValueError(f"No landscapes found in {batch_file}")
+
+    base_dir = Path(batch_file).parent
+    names = set()
+    result = []
+    for entry in landscapes:
+        # A cache file given on the command line cannot be shared by landscapes.
+        landscape = {**vars(defaults), "cache": None, **batch.get("defaults", {}), **entry}
+        credentials = landscape.pop("credentials", None) or {}
+        landscape["username"] = credentials.get("username", landscape["username"])
+        landscape["password"] = credentials.get("password", landscape["password"])
+        # YAML reads an unquoted yes as boolean.
+        if isinstance(landscape["dev"], bool):
+            landscape["dev"] = "yes" if landscape["dev"] else "no"
+        missing = [
+            name for name in __BATCH_REQUIRED__ if landscape.get(name) is None
+        ]
+        if missing:
+            raise ValueError(
+                f"Landscape {landscape.get('name') or landscape.get('ms_url')} misses {', '.join(missing)}"
+            )
+        if landscape["name"] in names:
+            raise ValueError(f"Landscape {landscape['name']} is listed twice")
+        names.add(landscape["name"])
+        if isinstance(landscape["ldap"], list):
+            landscape["ldap"] = ",".join(landscape["ldap"])
+        for name in ("inventory", "ssh_priv_key"):
+            landscape[name] = base_dir / os.path.expanduser(landscape[name])
+        result.append(argparse.Namespace(**landscape))
+    return result
+
+
+def run_batch(
+        landscapes: List[argparse.Namespace],
+        parallel: int,
+        connections: int,
+) -> Dict[str, Optional[str]]:
+    """Generates the inventories of several landscapes concurrently
+
+    Args:
+        landscapes: landscape settings returned by load_batch
+        parallel: number of landscapes discovered at the same time
+        connections: global budget of concurrent management API requests and
+            SSH commands across all landscapes
+
+    Returns:
+        A map of landscape name to its error message, None for success
+    """
+    budget = threading.BoundedSemaphore(connections)
+    session.mount("http://", BudgetedAdapter(budget, pool_maxsize=connections))
+    session.mount("https://", BudgetedAdapter(budget, pool_maxsize=connections))
+    workers = max(1, connections // parallel)
+    for landscape in landscapes:
+        landscape.max_workers = min(landscape.max_workers, workers)
+        if landscape.dev == "yes":
+            session.mount(
+                f"{landscape.ms_url.rstrip('/')}/",
+                BudgetedAdapter(budget, verify=False, pool_maxsize=workers),
+            )
+
+    def generate(landscape: argparse.Namespace) -> None:
+        landscape.username = resolve_reference(landscape.username)
+        landscape.password = resolve_reference(landscape.password)
+        cache = InventoryCache(
+            landscape.cache or default_cache_path(landscape.ms_url), landscape.cache_ttl
+        )
+        write_inventory(discover(landscape, cache, budget), landscape.inventory)
+
+    results: Dict[str, Optional[str]] = {}
+    with ThreadPoolExecutor(max_workers=parallel) as executor:
+        futures = {
+            landscape.name: executor.submit(generate, landscape)
+            for landscape in landscapes
+        }
+        for name, future in futures.items():
+            try:
+                future.result()
+            except Exception as e:
+                # A failed landscape must not fail the whole batch.
+                logger.error(f"Inventory generation of landscape {name} failed: {e!r}")
+                results[name] = repr(e)
+            else:
+                logger.info(f"Inventory generation of landscape {name} succeeded")
+                results[name] = None
+    return results
+
+
 def main():  # pragma: no cover
-    """Main function"""
+    """Main function
+
+    Every option can also be set through an APIMRT_<OPTION> environment
+    variable, e.g. APIMRT_MS_URL, which is how the settings reach the script
+    when ansible runs it as dynamic inventory with --list or --host.
+    """
     parser = argparse.ArgumentParser(
         description="Provide required details to create inventory file"
     )
-    parser.add_argument("--ms_url", help="Management URL", required=True)
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument(
+        "--list",
+        help="Print the ansible dynamic inventory JSON instead of writing an inventory file",
+        action="store_true",
+    )
+    mode.add_argument(
+        "--host",
+        help="Print the ansible host vars JSON of a single host",
+    )
+    mode.add_argument(
+        "--batch",
+        help="YAML file listing several landscapes to generate inventories for concurrently",
+    )
     parser.add_argument(
-        "--username", help="provide sysadmin username", required=True)
+        "--parallel",
+        help="Number of landscapes discovered at the same time in batch mode",
+        default=_env("parallel", 4),
+        type=int,
+    )
     parser.add_argument(
-        "--password", help="provide sysadmin password", required=True)
+        "--connections",
+        help="Global budget of concurrent management API requests and SSH commands in batch mode",
+        default=_env("connections", __MAX_WORKERS__ * 4),
+        type=int,
+    )
+    parser.add_argument(
+        "--summary",
+        help="File to write the JSON summary of a batch run to",
+        default=_env("summary"),
+    )
+    parser.add_argument("--ms_url", help="Management URL", default=_env("ms_url"))
+    parser.add_argument(
+        "--username", help="provide sysadmin username", default=_env("username"))
+    parser.add_argument(
+        "--password", help="provide sysadmin password", default=_env("password"))
     parser.add_argument(
         "--ssh_user",
         help="The SSH username",
-        required=True,
+        default=_env("ssh_user"),
     )
     parser.add_argument(
         "--ssh_priv_key",
         help="The path to the SSH private key",
-        required=True,
+        default=_env("ssh_priv_key"),
     )
     parser.add_argument(
         "--ssh_port",
         help="The SSH port",
-        default=22,
+        default=_env("ssh_port", 22),
+        type=int,
+    )
+    parser.add_argument(
+        "--inventory", help="provide Inventory file location", default=_env("inventory")
+    )
+    parser.add_argument(
+        "--ldap", help="provide ldap ip addresses in comma(,) separated", default=_env("ldap")
+    )
+    parser.add_argument(
+        "--max_workers",
+        help="Maximum number of concurrent management API requests",
+        default=_env("max_workers", __MAX_WORKERS__),
         type=int,
     )
     parser.add_argument(
-        "--inventory", help="provide Inventory file location", required=True
+        "--listing",
+        help="Server listing mode, per server type, per region or once for the landscape",
+        default=_env("listing", "type"),
+        choices=__LISTING_MODES__,
     )
     parser.add_argument(
-        "--ldap", help="provide ldap ip addresses in comma(,) separated", required=True
+        "--cache",
+        help="Topology cache file, defaults to a per management URL file in ~/.cache/apimrt/inventory",
+        default=_env("cache"),
+    )
+    parser.add_argument(
+        "--cache_ttl",
+        help="Seconds for which the cached topology is trusted, 0 probes every node again",
+        default=_env("cache_ttl", __CACHE_TTL__),
+        type=int,
     )
     parser.add_argument(
         "--dev",
         help="Dev mode, no TLS verification",
         required=False,
-        default="no",
+        default=_env("dev", "no"),
         choices=["yes", "no"],
     )
     args = parser.parse_args()
+    if args.batch:
+        results = run_batch(load_batch(args.batch, args), args.parallel, args.connections)
+        failed = {name: error for name, error in results.items() if error}
+        logger.info(f"Generated {len(results) - len(failed)} of {len(results)} inventories")
+        for name, error in failed.items():
+            logger.error(f"Failed landscape {name}: {error}")
+        if args.summary:
+            with open(args.summary, "w", encoding="utf-8") as summary_file:
+                json.dump({"succeeded": sorted(set(results) - set(failed)), "failed": failed},
+                          summary_file, indent=2)
+        sys.exit(1 if failed else 0)
+
+    required = ["ms_url", "username", "password", "ssh_user", "ssh_priv_key", "ldap"]
+    if not (args.list or args.host):
+        required.append("inventory")
+    missing = [name for name in required if getattr(args, name) is None]
+    if missing:
+        parser.error(
+            "the following arguments are required: "
+            + ", ".join(f"--{name} (or APIMRT_{name.upper()})" for name in missing)
+        )
+
     global session
     if args.dev == "yes":
         session.verify = False
-    ldapservers = args.ldap.split(",")
-    region_pod_map = get_regions_pods(
-        args.ms_url, args.username, args.password)
-    server_groups = get_server_groups(
-        region_pod_map,
-        ldapservers,
-        args.ms_url,
-        args.username,
-        args.password,
-        args.ssh_user,
-        args.ssh_priv_key,
-        ssh_port=args.ssh_port,
-    )
-    logger.info(
-        f"{inspect.stack()[0][3]}: Generating inventory from server information"
-    )
-    inventory: List[str] = []
-    for group, servers in server_groups.items():
-        inventory.append(f"[{group}]")
-        inventory.extend(f"{server['ipv4_address']}" for server in servers)
-    with open(args.inventory, "w", encoding="utf-8") as inventory_file:
-        inventory_file.write("\n".join(inventory))
-    logger.info(f"{inspect.stack()[0][3]}: Completed generating inventory")
+    cache = InventoryCache(args.cache or default_cache_path(args.ms_url), args.cache_ttl)
+
+    try:
+        if args.list or args.host:
+            # Ansible runs the inventory for every playbook, a fresh cache answers
+            # without contacting the landscape at all.
+            cached = cache.load()
+            if cached and cache.is_fresh(cached):
+                server_groups = cached["groups"]
+            else:
+                server_groups = discover(args, cache)
+            inventory = to_dynamic_inventory(server_groups)
+            if args.list:
+                print(json.dumps(inventory))
+            else:
+                print(json.dumps(inventory["_meta"]["hostvars"].get(args.host, {})))
+            return
+
+        write_inventory(discover(args, cache), args.inventory)
+    except InventoryException as e:
+        logger.error(e)
+        sys.exit(1)
 
 
 if __name__ == "__main__":
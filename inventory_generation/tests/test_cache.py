@@ -0,0 +1,82 @@
+import json
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from utils.cache import InventoryCache, default_cache_path, diff_server_groups, server_key  # noqa: E402
+
+
+def server(ip, uuid, is_up=True):
+    return {"ipv4_address": ip, "uuid": uuid, "isUp": is_up}
+
+
+class DiffServerGroupsTestCase(unittest.TestCase):
+
+    def test_unchanged(self):
+        groups = {"ms": [server("10.0.0.1", "ms-1")], "ldap": [{"ipv4_address": "10.0.2.1"}]}
+        self.assertEqual(diff_server_groups(groups, json.loads(json.dumps(groups))), {})
+
+    def test_changes(self):
+        old = {
+            "ms": [server("10.0.0.1", "ms-1")],
+            "router": [server("10.0.0.3", "r-1"), server("10.0.1.2", "r-2")],
+            "qpid": [server("10.0.0.5", "q-1")],
+        }
+        new = {
+            # Rebuilt behind the same address, hence a new UUID.
+            "ms": [server("10.0.0.1", "ms-3")],
+            "router": [server("10.0.0.3", "r-1", is_up=False), server("10.0.1.2", "r-2")],
+            "mp": [server("10.0.0.3", "r-1")],
+        }
+        self.assertEqual(diff_server_groups(old, new), {
+            "mp": {"added": ["10.0.0.3/r-1"], "removed": [], "status_changed": []},
+            "ms": {"added": ["10.0.0.1/ms-3"], "removed": ["10.0.0.1/ms-1"], "status_changed": []},
+            "qpid": {"added": [], "removed": ["10.0.0.5/q-1"], "status_changed": []},
+            "router": {"added": [], "removed": [], "status_changed": ["10.0.0.3/r-1"]},
+        })
+
+    def test_server_key(self):
+        self.assertEqual(server_key(server("10.0.0.1", "ms-1")), "10.0.0.1/ms-1")
+        self.assertEqual(server_key({"ipv4_address": "10.0.2.1"}), "10.0.2.1/")
+
+
+class InventoryCacheTestCase(unittest.TestCase):
+
+    def setUp(self):
+        tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp_dir.cleanup)
+        self.path = Path(tmp_dir.name) / "cache" / "landscape.json"
+
+    def test_save_and_load(self):
+        groups = {"ms": [server("10.0.0.1", "ms-1")]}
+        cache = InventoryCache(self.path, ttl=60)
+        self.assertIsNone(cache.load())
+        with mock.patch("utils.cache.time.time", return_value=1000.0):
+            cache.save(groups)
+        entry = cache.load()
+        self.assertEqual(entry["groups"], groups)
+        self.assertEqual(list(self.path.parent.iterdir()), [self.path])
+        with mock.patch("utils.cache.time.time", return_value=1059.0):
+            self.assertTrue(cache.is_fresh(entry))
+        with mock.patch("utils.cache.time.time", return_value=1060.0):
+            self.assertFalse(cache.is_fresh(entry))
+
+    def test_unreadable_or_old_cache(self):
+        cache = InventoryCache(self.path)
+        self.path.parent.mkdir(parents=True)
+        self.path.write_text("{")
+        self.assertIsNone(cache.load())
+        self.path.write_text(json.dumps({"version": 1, "updated_at": 0, "groups": {}}))
+        self.assertIsNone(cache.load())
+
+    def test_default_cache_path(self):
+        self.assertEqual(default_cache_path("https://ms-1"), default_cache_path("https://ms-1"))
+        self.assertNotEqual(default_cache_path("https://ms-1"), default_cache_path("https://ms-2"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,411 @@
+import argparse
+import contextlib
+import io
+import json
+import sys
+import tempfile
+import threading
+import unittest
+from pathlib import Path
+from unittest import mock
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+import inventory  # noqa: E402
+from inventory import InventoryException, get_server_groups, index_servers, known_roles_from_groups, \
+    load_batch, probe_roles, run_batch, to_dynamic_inventory  # noqa: E402
+from utils.cache import InventoryCache  # noqa: E402
+
+REGIONS = {"dc-1": "gateway-1", "dc-2": "gateway-2"}
+
+SERVERS = [
+    {"internalIP": "10.0.0.1", "isUp": True, "region": "dc-1", "pod": "central", "uUID": "zk-1",
+     "type": ["apimodel-datastore", "management-server", "qpid-server"]},
+    {"internalIP": "10.0.0.2", "isUp": True, "region": "dc-1", "pod": "central", "uUID": "zk-2",
+     "type": ["apimodel-datastore"]},
+    {"internalIP": "10.0.0.3", "isUp": True, "region": "dc-1", "pod": "gateway-1", "uUID": "r-1",
+     "type": ["router", "message-processor"]},
+    {"internalIP": "10.0.0.4", "isUp": True, "region": "dc-1", "pod": "analytics", "uUID": "pg-1",
+     "type": "postgres-server"},
+    {"internalIP": "10.0.1.1", "isUp": True, "region": "dc-2", "pod": "central", "uUID": "ms-2",
+     "type": ["apimodel-datastore", "management-server"]},
+    {"internalIP": "10.0.1.2", "isUp": True, "region": "dc-2", "pod": "gateway-2", "uUID": "r-2",
+     "type": ["router", "message-processor"]},
+    {"internalIP": "10.0.1.3", "isUp": True, "region": "dc-2", "pod": "analytics", "uUID": "pg-2",
+     "type": "postgres-server"},
+]
+
+
+class FakeResponse:
+
+    def __init__(self, body, status_code=200):
+        self._body = body
+        self.status_code = status_code
+
+    def json(self):
+        return self._body
+
+
+class FakeManagementApi:
+    """Serves /v1/servers of a landscape from a raw server listing."""
+
+    def __init__(self, servers):
+        self.servers = servers
+        self.requests = []
+        self._lock = threading.Lock()
+
+    def get(self, url, params=None, auth=None):
+        with self._lock:
+            self.requests.append((url, params))
+        params = params or {}
+        matching = [
+            s for s in self.servers
+            if all(
+                params[field] in (s[field] if isinstance(s[field], list) else [s[field]])
+                for field in ("region", "pod", "type") if field in params
+            )
+        ]
+        return FakeResponse(matching)
+
+
+class FakeSSHPool:
+    """Answers the role probes, the SSO node and the pg standby are configurable."""
+
+    def __init__(self, sso=("10.0.0.1",), standby=("10.0.1.3",)):
+        self.sso = set(sso)
+        self.standby = set(standby)
+        self.commands = []
+        self._lock = threading.Lock()
+
+    def run(self, host, command):
+        with self._lock:
+            self.commands.append((host, command))
+        if command.startswith("stat "):
+            return (0, "  File: sso.properties") if host in self.sso else (1, "")
+        if command.endswith("status"):
+            return (0, "") if host in self.sso else (5, "")
+        if command.endswith("postgres-check-standby"):
+            return 0, "postgres is slave/standby" if host in self.standby else "postgres is master"
+        raise AssertionError(f"Unexpected command {command}")
+
+
+def ips(servers):
+    return [server["ipv4_address"] for server in servers]
+
+
+class IndexServersTestCase(unittest.TestCase):
+
+    def test_index_servers(self):
+        index = index_servers(SERVERS)
+        self.assertEqual(ips(index[("dc-1", "central", "apimodel-datastore")]), ["10.0.0.1", "10.0.0.2"])
+        self.assertEqual(ips(index[("dc-1", "gateway-1", "message-processor")]), ["10.0.0.3"])
+        self.assertEqual(
+            index[("dc-2", "analytics", "postgres-server")],
+            [{"ipv4_address": "10.0.1.3", "isUp": True, "region": "dc-2", "pod": "analytics", "uuid": "pg-2"}],
+        )
+        self.assertEqual(len(index), 11)
+        self.assertEqual(index.get(("dc-2", "central", "qpid-server"), []), [])
+
+
+class ProbeRolesTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.servers = {
+            "ms": [{"ipv4_address": "10.0.0.1", "uuid": "ms-1"}, {"ipv4_address": "10.0.1.1", "uuid": "ms-2"}],
+            "pg": [{"ipv4_address": "10.0.0.4", "uuid": "pg-1"}, {"ipv4_address": "10.0.1.3", "uuid": "pg-2"}],
+        }
+
+    def test_probe_roles(self):
+        ssh_pool = FakeSSHPool()
+        roles = probe_roles(self.servers, ssh_pool, max_workers=2)
+        self.assertEqual(roles, {
+            "sso": {"10.0.0.1/ms-1": True, "10.0.1.1/ms-2": False},
+            "pg_replica": {"10.0.0.4/pg-1": False, "10.0.1.3/pg-2": True},
+        })
+        self.assertEqual(
+            sorted({host for host, _ in ssh_pool.commands}),
+            ["10.0.0.1", "10.0.0.4", "10.0.1.1", "10.0.1.3"],
+        )
+
+    def test_moving_roles_are_probed_again(self):
+        # The cached roles predate a pg failover and SSO moving to the other management server.
+        known_roles = {
+            "sso": {"10.0.0.1/ms-1": False, "10.0.1.1/ms-2": True},
+            "pg_replica": {"10.0.0.4/pg-1": True, "10.0.1.3/pg-2": False},
+        }
+        roles = probe_roles(self.servers, FakeSSHPool(), known_roles=known_roles)
+        self.assertEqual(roles, probe_roles(self.servers, FakeSSHPool()))
+
+    @mock.patch("inventory.__MOVING_ROLES__", ("pg_replica",))
+    def test_known_roles_are_reused(self):
+        ssh_pool = FakeSSHPool()
+        roles = probe_roles(self.servers, ssh_pool, known_roles={"sso": {"10.0.0.1/ms-1": False}})
+        self.assertEqual(roles["sso"], {"10.0.0.1/ms-1": False, "10.0.1.1/ms-2": False})
+        self.assertNotIn("10.0.0.1", {host for host, _ in ssh_pool.commands})
+
+    def test_known_roles_from_groups(self):
+        groups = {
+            "ms": self.servers["ms"], "sso": self.servers["ms"][:1],
+            "pg": self.servers["pg"], "pgs": self.servers["pg"][1:],
+        }
+        self.assertEqual(known_roles_from_groups(groups), {
+            "sso": {"10.0.0.1/ms-1": True, "10.0.1.1/ms-2": False},
+            "pg_replica": {"10.0.0.4/pg-1": False, "10.0.1.3/pg-2": True},
+        })
+
+    def test_sso_status_unknown(self):
+        ssh_pool = FakeSSHPool()
+        ssh_pool.run = lambda host, command: (5, "  File: sso.properties") \
+            if host == "10.0.0.1" else FakeSSHPool.run(ssh_pool, host, command)
+        roles = probe_roles({"ms": self.servers["ms"][:1], "pg": []}, ssh_pool)
+        self.assertEqual(roles, {"sso": {"10.0.0.1/ms-1": False}, "pg_replica": {}})
+
+
+@mock.patch("inventory.network.probe_zookeeper", mock.MagicMock(return_value=[]))
+class GetServerGroupsTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.api = FakeManagementApi(SERVERS)
+        patcher = mock.patch.object(inventory.session, "get", side_effect=self.api.get)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.ssh_pool = FakeSSHPool()
+
+    def server_groups(self, **kwargs):
+        return get_server_groups(
+            REGIONS, ["10.0.2.1", "10.0.2.2"], "https://ms", "user", "password", "ssh", "key",
+            ssh_pool=self.ssh_pool, **kwargs
+        )
+
+    def test_groups(self):
+        groups = self.server_groups()
+        self.assertEqual(
+            {group: ips(servers) for group, servers in groups.items()},
+            {
+                "zkcs": ["10.0.0.1", "10.0.0.2", "10.0.1.1"],
+                "ms": ["10.0.0.1", "10.0.1.1"],
+                "router": ["10.0.0.3", "10.0.1.2"],
+                "mp": ["10.0.0.3", "10.0.1.2"],
+                "qpid": ["10.0.0.1"],
+                "pg": ["10.0.0.4", "10.0.1.3"],
+                "ldap": ["10.0.2.1", "10.0.2.2"],
+                "sso": ["10.0.0.1"],
+                "pgm": ["10.0.0.4"],
+                "pgs": ["10.0.1.3"],
+            },
+        )
+        self.assertEqual(
+            groups["router"][1],
+            {"ipv4_address": "10.0.1.2", "isUp": True, "region": "dc-2", "pod": "gateway-2", "uuid": "r-2"},
+        )
+
+    def test_one_request_per_region_and_type(self):
+        self.server_groups(max_workers=4)
+        self.assertEqual(len(self.api.requests), len(REGIONS) * 6)
+        self.assertIn(
+            ("https://ms/v1/servers", {"region": "dc-2", "type": "router", "pod": "gateway-2"}),
+            self.api.requests,
+        )
+
+    def test_listing_modes(self):
+        expected = self.server_groups(listing="type")
+        for listing, requests in (("region", len(REGIONS)), ("landscape", 1)):
+            with self.subTest(listing=listing):
+                self.api.requests.clear()
+                self.assertEqual(self.server_groups(listing=listing), expected)
+                self.assertEqual(len(self.api.requests), requests)
+        self.assertEqual(self.api.requests, [("https://ms/v1/servers", None)])
+
+    def test_zookeeper_leader_is_last(self):
+        statuses = [
+            {"host": "10.0.0.1", "mode": "leader", "latency": None, "zxid": 42, "error": None},
+            {"host": "10.0.0.2", "mode": None, "latency": None, "zxid": None, "error": "timed out"},
+            {"host": "10.0.1.1", "mode": "follower", "latency": None, "zxid": 42, "error": None},
+        ]
+        with mock.patch("inventory.network.probe_zookeeper", return_value=statuses) as probe_zookeeper:
+            groups = self.server_groups()
+        probe_zookeeper.assert_called_once_with(["10.0.0.1", "10.0.0.2", "10.0.1.1"], 2181)
+        self.assertEqual(ips(groups["zkcs"]), ["10.0.0.2", "10.0.1.1", "10.0.0.1"])
+
+    def test_pg_without_standby(self):
+        self.ssh_pool.standby.clear()
+        with self.assertRaises(ValueError):
+            self.server_groups()
+
+    def test_down_servers(self):
+        self.api.servers = [dict(s, isUp=s["uUID"] != "r-2") for s in SERVERS]
+        with self.assertRaisesRegex(ValueError, r"\['router', '10.0.1.2'\]"):
+            self.server_groups()
+
+    def test_unknown_listing_mode(self):
+        with self.assertRaises(ValueError):
+            self.server_groups(listing="pod")
+
+    def test_api_errors(self):
+        inventory.session.get.side_effect = ConnectionError("refused")
+        with self.assertRaises(InventoryException):
+            self.server_groups()
+        inventory.session.get.side_effect = lambda *args, **kwargs: FakeResponse({}, 401)
+        with self.assertRaises(ValueError):
+            self.server_groups()
+
+
+class DynamicInventoryTestCase(unittest.TestCase):
+
+    groups = {
+        "ms": [{"ipv4_address": "10.0.0.1", "isUp": True, "region": "dc-1", "pod": "central", "uuid": "ms-1"}],
+        "sso": [{"ipv4_address": "10.0.0.1", "isUp": True, "region": "dc-1", "pod": "central", "uuid": "ms-1"}],
+        "ldap": [{"ipv4_address": "10.0.2.1"}],
+    }
+
+    def setUp(self):
+        tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp_dir.cleanup)
+        self.cache_path = Path(tmp_dir.name) / "cache.json"
+        environ = {
+            "APIMRT_MS_URL": "https://ms", "APIMRT_USERNAME": "user", "APIMRT_PASSWORD": "password",
+            "APIMRT_SSH_USER": "ssh", "APIMRT_SSH_PRIV_KEY": "key", "APIMRT_LDAP": "10.0.2.1",
+        }
+        patcher = mock.patch.dict("os.environ", environ)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def main(self, *args):
+        output = io.StringIO()
+        argv = ["inventory.py", "--cache", str(self.cache_path), *args]
+        with mock.patch.object(sys, "argv", argv), contextlib.redirect_stdout(output):
+            inventory.main()
+        return json.loads(output.getvalue())
+
+    def test_to_dynamic_inventory(self):
+        self.assertEqual(to_dynamic_inventory(self.groups), {
+            "ms": {"hosts": ["10.0.0.1"]},
+            "sso": {"hosts": ["10.0.0.1"]},
+            "ldap": {"hosts": ["10.0.2.1"]},
+            "_meta": {"hostvars": {
+                "10.0.0.1": {"region": "dc-1", "pod": "central", "isUp": True},
+                "10.0.2.1": {},
+            }},
+        })
+
+    @mock.patch("inventory.discover")
+    def test_list_and_host_from_fresh_cache(self, discover):
+        InventoryCache(self.cache_path).save(self.groups)
+        self.assertEqual(self.main("--list"), to_dynamic_inventory(self.groups))
+        self.assertEqual(self.main("--host", "10.0.0.1"), {"region": "dc-1", "pod": "central", "isUp": True})
+        self.assertEqual(self.main("--host", "10.9.9.9"), {})
+        discover.assert_not_called()
+
+    @mock.patch("inventory.discover")
+    def test_list_discovers_without_fresh_cache(self, discover):
+        discover.return_value = self.groups
+        self.assertEqual(self.main("--list"), to_dynamic_inventory(self.groups))
+        discover.assert_called_once()
+        self.assertEqual(discover.call_args[0][0].ms_url, "https://ms")
+
+
+class BatchTestCase(unittest.TestCase):
+
+    defaults = argparse.Namespace(
+        ms_url=None, username=None, password=None, ssh_user="ssh", ssh_priv_key=None, ssh_port=22,
+        inventory=None, ldap=None, max_workers=16, listing="type", cache="/tmp/shared.json",
+        cache_ttl=3600, dev="no",
+    )
+
+    def setUp(self):
+        tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp_dir.cleanup)
+        self.dir = Path(tmp_dir.name)
+        self.batch_file = self.dir / "batch.yml"
+        adapters = dict(inventory.session.adapters)
+
+        def restore_adapters():
+            inventory.session.adapters.clear()
+            inventory.session.adapters.update(adapters)
+
+        self.addCleanup(restore_adapters)
+
+    def load(self, content):
+        self.batch_file.write_text(content)
+        return load_batch(self.batch_file, self.defaults)
+
+    def test_load_batch(self):
+        landscapes = self.load("""
+defaults:
+  ssh_priv_key: keys/id_rsa
+  listing: landscape
+landscapes:
+  - name: eu
+    ms_url: https://ms-eu
+    credentials: {username: env:EU_USER, password: file:/secrets/eu}
+    ldap: [10.0.2.1, 10.0.2.2]
+    inventory: eu/inventory
+    dev: yes
+  - name: us
+    ms_url: https://ms-us
+    credentials: {username: admin, password: secret}
+    ssh_priv_key: /keys/us_rsa
+    ldap: 10.1.2.1
+    inventory: /inventories/us
+""")
+        eu, us = landscapes
+        self.assertEqual(
+            (eu.name, eu.username, eu.password, eu.ldap, eu.dev, eu.listing, eu.cache, eu.ssh_user),
+            ("eu", "env:EU_USER", "file:/secrets/eu", "10.0.2.1,10.0.2.2", "yes", "landscape", None, "ssh"),
+        )
+        self.assertEqual(eu.inventory, self.dir / "eu" / "inventory")
+        self.assertEqual(eu.ssh_priv_key, self.dir / "keys" / "id_rsa")
+        self.assertEqual(us.inventory, Path("/inventories/us"))
+        self.assertEqual(us.ssh_priv_key, Path("/keys/us_rsa"))
+        self.assertEqual(us.dev, "no")
+
+    def test_invalid_batch(self):
+        landscape = "{name: eu, ms_url: https://ms, credentials: {username: u, password: p}, " \
+                    "ssh_priv_key: key, ldap: 10.0.2.1, inventory: eu}"
+        for content, message in (
+                ("{}", "No landscapes"),
+                ("landscapes: [{name: eu, ms_url: https://ms}]", "eu misses username, password, ssh_priv_key"),
+                (f"landscapes: [{landscape}, {landscape}]", "listed twice"),
+        ):
+            with self.subTest(message=message):
+                with self.assertRaisesRegex(ValueError, message):
+                    self.load(content)
+
+    @mock.patch("inventory.write_inventory")
+    @mock.patch("inventory.discover")
+    def test_run_batch(self, discover, write_inventory):
+        landscapes = self.load("""
+landscapes:
+""" + "".join(f"""
+  - name: {name}
+    ms_url: https://ms-{name}
+    credentials: {{username: env:BATCH_USER, password: secret}}
+    ssh_priv_key: key
+    ldap: 10.0.2.1
+    inventory: {name}
+""" for name in ("eu", "us", "ap")))
+        groups = {"ldap": [{"ipv4_address": "10.0.2.1"}]}
+
+        def discover_landscape(landscape, cache, budget):
+            if landscape.name == "us":
+                raise InventoryException("Invalid cert on target")
+            self.assertEqual(landscape.username, "batch-user")
+            self.assertEqual(landscape.max_workers, 2)
+            return groups
+
+        discover.side_effect = discover_landscape
+        with mock.patch.dict("os.environ", {"BATCH_USER": "batch-user"}):
+            results = run_batch(landscapes, parallel=2, connections=4)
+
+        self.assertEqual(results, {"eu": None, "us": "InventoryException('Invalid cert on target')", "ap": None})
+        self.assertEqual(
+            sorted(call[0][1] for call in write_inventory.call_args_list),
+            [self.dir / "ap", self.dir / "eu"],
+        )
+        budgets = {call[0][2] for call in discover.call_args_list}
+        self.assertEqual(len(budgets), 1)
+        self.assertIsInstance(inventory.session.get_adapter("https://ms-eu/v1/servers"), inventory.BudgetedAdapter)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,140 @@
+import socket
+import sys
+import threading
+import time
+import unittest
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from utils.network import find_zookeeper_leader, parse_zk_status, probe_zookeeper  # noqa: E402
+
+SRVR_REPLY = """Zookeeper version: 3.4.14-4c25d480e66aadd371de8bd2fd8da255ac140bcf, built on 03/06/2019 16:18 GMT
+Latency min/avg/max: 0/1.5/12
+Received: 1042
+Sent: 1041
+Connections: 3
+Outstanding: 0
+Zxid: 0x10000002a
+Mode: leader
+Node count: 54
+"""
+
+MNTR_REPLY = """zk_version\t3.4.14-4c25d480e66aadd371de8bd2fd8da255ac140bcf, built on 03/06/2019 16:18 GMT
+zk_avg_latency\t2
+zk_max_latency\t30
+zk_min_latency\t0
+zk_packets_received\t1042
+zk_server_state\tfollower
+zk_zxid\t0x10000002a
+"""
+
+
+class ZooKeeperServer:
+    """Local ZooKeeper stand-in answering every connection with reply after delay seconds."""
+
+    def __init__(self, reply, delay=0.0):
+        self._reply = reply.encode("utf-8")
+        self._delay = delay
+        self._sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self._sock.bind(("127.0.0.1", 0))
+        self._sock.listen(8)
+        self.port = self._sock.getsockname()[1]
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._serve, daemon=True)
+        self._thread.start()
+
+    def _serve(self):
+        while True:
+            try:
+                conn, _ = self._sock.accept()
+            except OSError:
+                return
+            threading.Thread(target=self._answer, args=(conn,), daemon=True).start()
+
+    def _answer(self, conn):
+        with conn:
+            conn.recv(4)
+            if not self._stopped.wait(self._delay):
+                conn.sendall(self._reply)
+
+    def close(self):
+        self._stopped.set()
+        # Closing alone does not wake up the blocked accept.
+        self._sock.shutdown(socket.SHUT_RDWR)
+        self._sock.close()
+        self._thread.join()
+
+
+class ParseZkStatusTestCase(unittest.TestCase):
+
+    def test_srvr(self):
+        self.assertEqual(parse_zk_status(SRVR_REPLY), {
+            "mode": "leader",
+            "latency": {"min": 0.0, "avg": 1.5, "max": 12.0},
+            "zxid": 0x10000002a,
+        })
+
+    def test_mntr(self):
+        self.assertEqual(parse_zk_status(MNTR_REPLY), {
+            "mode": "follower",
+            "latency": {"min": 0.0, "avg": 2.0, "max": 30.0},
+            "zxid": 0x10000002a,
+        })
+
+    def test_empty_reply(self):
+        self.assertEqual(parse_zk_status(""), {"mode": None, "latency": None, "zxid": None})
+
+    def test_find_leader(self):
+        statuses = [
+            {"host": "10.0.0.1", "mode": "follower"},
+            {"host": "10.0.0.2", "mode": None},
+            {"host": "10.0.0.3", "mode": "leader"},
+        ]
+        self.assertEqual(find_zookeeper_leader(statuses), "10.0.0.3")
+        self.assertIsNone(find_zookeeper_leader(statuses[:2]))
+
+
+class ProbeZookeeperTestCase(unittest.TestCase):
+
+    def serve(self, reply, delay=0.0):
+        server = ZooKeeperServer(reply, delay)
+        self.addCleanup(server.close)
+        return server.port
+
+    def test_replies_and_deadline(self):
+        port = self.serve(SRVR_REPLY)
+        slow_port = self.serve(SRVR_REPLY, delay=5.0)
+        closed = socket.socket()
+        closed.bind(("127.0.0.1", 0))
+        closed_port = closed.getsockname()[1]
+        closed.close()
+
+        started = time.monotonic()
+        # probe_zookeeper uses one port for the ensemble, the nodes are told apart by probing one at a time.
+        statuses = [
+            probe_zookeeper(["127.0.0.1"], p, connect_timeout=0.5, read_timeout=0.3)[0]
+            for p in (port, slow_port, closed_port)
+        ]
+        self.assertLess(time.monotonic() - started, 3.0)
+
+        self.assertEqual(statuses[0]["mode"], "leader")
+        self.assertIsNone(statuses[0]["error"])
+        self.assertEqual(statuses[1]["error"], "timed out")
+        self.assertIsNone(statuses[1]["mode"])
+        self.assertIsNotNone(statuses[2]["error"])
+        self.assertIsNone(statuses[2]["mode"])
+
+    def test_nodes_are_probed_in_parallel(self):
+        port = self.serve(MNTR_REPLY, delay=0.2)
+        started = time.monotonic()
+        statuses = probe_zookeeper(["127.0.0.1"] * 5, port, command=b"mntr")
+        self.assertLess(time.monotonic() - started, 0.9)
+        self.assertEqual([status["mode"] for status in statuses], ["follower"] * 5)
+
+    def test_no_hosts(self):
+        self.assertEqual(probe_zookeeper([]), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
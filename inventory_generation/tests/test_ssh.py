@@ -0,0 +1,42 @@
+import sys
+import unittest
+from pathlib import Path
+from unittest import mock
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from utils.ssh import SSHPool  # noqa: E402
+
+
+def exec_command(command):
+    stdout = mock.MagicMock()
+    stdout.read.return_value = f"ran {command}".encode("utf-8")
+    stdout.channel.recv_exit_status.return_value = 0
+    return None, stdout, None
+
+
+@mock.patch("utils.ssh.RSAKey.from_private_key_file", mock.MagicMock())
+@mock.patch("utils.ssh.SSHClient")
+class SSHPoolTestCase(unittest.TestCase):
+
+    def test_one_connection_per_host(self, ssh_client):
+        ssh_client.return_value.exec_command.side_effect = exec_command
+        with SSHPool("user", "key") as pool:
+            self.assertEqual(pool.run("10.0.0.1", "uptime"), (0, "ran uptime"))
+            self.assertEqual(pool.run("10.0.0.1", "uptime"), (0, "ran uptime"))
+            pool.run("10.0.0.1", "hostname")
+            pool.run("10.0.0.2", "hostname")
+        self.assertEqual(ssh_client.call_count, 2)
+        self.assertEqual(ssh_client.return_value.exec_command.call_count, 3)
+        self.assertEqual(ssh_client.return_value.close.call_count, 2)
+
+    def test_failed_connection_is_closed(self, ssh_client):
+        ssh_client.return_value.connect.side_effect = OSError("unreachable")
+        with SSHPool("user", "key") as pool:
+            with self.assertRaises(OSError):
+                pool.run("10.0.0.1", "uptime")
+        ssh_client.return_value.close.assert_called_once_with()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,116 @@
+"""Local cache of the discovered landscape topology."""
+
+import hashlib
+import json
+import os
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Union
+
+_PathLike = Union[str, Path]
+
+# Default location of the topology caches, one file per management URL.
+__CACHE_DIR__: Path = Path.home() / ".cache" / "apimrt" / "inventory"
+
+# Default number of seconds a cached topology is trusted for role probes.
+__CACHE_TTL__: int = 3600
+
+__CACHE_VERSION__: int = 2
+
+
+def default_cache_path(ms_url: str) -> Path:
+    """Returns the default cache file of the landscape behind ms_url."""
+
+    digest = hashlib.sha1(ms_url.encode("utf-8")).hexdigest()[:16]
+    return __CACHE_DIR__ / f"{digest}.json"
+
+
+def server_key(server: Dict[str, Any]) -> str:
+    """Identifies a node by address and management server UUID.
+
+    A node that was rebuilt behind the same address gets a new UUID and hence
+    a new key.
+    """
+
+    return f"{server['ipv4_address']}/{server.get('uuid') or ''}"
+
+
+def diff_server_groups(
+        old: Dict[str, List[Dict[str, Any]]],
+        new: Dict[str, List[Dict[str, Any]]],
+) -> Dict[str, Dict[str, List[str]]]:
+    """Compares two server group maps.
+
+    Returns:
+        A map of changed group to its 'added', 'removed' and 'status_changed'
+        node keys. Unchanged groups are left out, so an empty map means the
+        topology did not change.
+    """
+
+    changes: Dict[str, Dict[str, List[str]]] = {}
+    for group in sorted(set(old) | set(new)):
+        old_servers = {server_key(s): s for s in old.get(group, [])}
+        new_servers = {server_key(s): s for s in new.get(group, [])}
+        group_changes = {
+            "added": sorted(set(new_servers) - set(old_servers)),
+            "removed": sorted(set(old_servers) - set(new_servers)),
+            "status_changed": sorted(
+                key for key in set(old_servers) & set(new_servers)
+                if old_servers[key].get("isUp") != new_servers[key].get("isUp")
+            ),
+        }
+        if any(group_changes.values()):
+            changes[group] = group_changes
+    return changes
+
+
+class InventoryCache:
+    """Cached server groups of one landscape with a time to live.
+
+    Args:
+        path: cache file location
+        ttl: seconds after which the cached groups are no longer trusted
+    """
+
+    def __init__(self, path: _PathLike, ttl: int = __CACHE_TTL__) -> None:
+        self._path = Path(path)
+        self._ttl = ttl
+
+    def load(self) -> Optional[Dict[str, Any]]:
+        """Returns the cache entry, or None when missing or unreadable.
+
+        The entry holds 'updated_at' (epoch seconds) and 'groups'.
+        """
+
+        try:
+            with open(self._path, "r", encoding="utf-8") as cache_file:
+                entry = json.load(cache_file)
+        except (OSError, ValueError):
+            return None
+        if entry.get("version") != __CACHE_VERSION__:
+            return None
+        return entry
+
+    def is_fresh(self, entry: Dict[str, Any]) -> bool:
+        """Checks whether the entry is younger than the time to live."""
+
+        return time.time() - entry["updated_at"] < self._ttl
+
+    def save(self, groups: Dict[str, List[Dict[str, Any]]]) -> None:
+        """Atomically replaces the cache with the given server groups."""
+
+        self._path.parent.mkdir(parents=True, exist_ok=True)
+        entry = {
+            "version": __CACHE_VERSION__,
+            "updated_at": time.time(),
+            "groups": groups,
+        }
+        fd, tmp_path = tempfile.mkstemp(dir=self._path.parent, prefix=".inventory-")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as tmp_file:
+                json.dump(entry, tmp_file, indent=2)
+            os.replace(tmp_path, self._path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
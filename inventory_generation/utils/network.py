@@ -1,26 +1,194 @@
-"""TODO: docstring"""
+"""Plain TCP helpers used to talk to landscape services."""
 
+import asyncio
+import re
 import socket
+from typing import Any, Dict, List, Optional
 
-# TODO: docstring
+# Size of the chunks read by netcat.
 __BLOCK_SIZE__: int = 1024
 
+# ZooKeeper four letter word replies are a few hundred bytes, the probe receive
+# buffer is allocated once at this size and replies are truncated beyond it.
+__ZK_BUFFER_SIZE__: int = 16 * 1024
 
-def netcat(host: str, content: bytes, port: int = 80) -> bytes:
-    """TODO: docstring"""
+__CONNECT_TIMEOUT__: float = 3.0
+__READ_TIMEOUT__: float = 5.0
 
+_SRVR_PATTERNS = {
+    "mode": re.compile(r"^Mode:\s*(\S+)", re.MULTILINE),
+    "latency": re.compile(r"^Latency min/avg/max:\s*([\d.]+)/([\d.]+)/([\d.]+)", re.MULTILINE),
+    "zxid": re.compile(r"^Zxid:\s*(0x[0-9a-fA-F]+)", re.MULTILINE),
+}
+
+
+def netcat(host: str, content: bytes, port: int = 80, timeout: float = __READ_TIMEOUT__) -> bytes:
+    """Sends the content to host:port and returns everything read until the peer closes.
+
+    Both the connect and every read are bounded by timeout seconds.
+    """
+
+    sock = socket.create_connection((host, port), timeout=timeout)
+    try:
+        sock.sendall(content)
+        sock.shutdown(socket.SHUT_WR)
+
+        body = bytearray()
+        block = bytearray(__BLOCK_SIZE__)
+        view = memoryview(block)
+        while True:
+            size = sock.recv_into(block)
+            if size == 0:
+                break
+            body += view[:size]
+    finally:
+        sock.close()
+
+    return bytes(body)
+
+
+async def _four_letter_word(
+        host: str,
+        port: int,
+        command: bytes,
+        connect_timeout: float,
+        read_timeout: float,
+) -> bytes:
+    """Sends a ZooKeeper four letter word and reads the reply into a preallocated buffer."""
+
+    loop = asyncio.get_running_loop()
     sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-    sock.connect((host, port))
-    sock.sendall(content)
-    sock.shutdown(socket.SHUT_WR)
+    sock.setblocking(False)
+    try:
+        await asyncio.wait_for(loop.sock_connect(sock, (host, port)), connect_timeout)
+        await loop.sock_sendall(sock, command)
+        sock.shutdown(socket.SHUT_WR)
+
+        buffer = bytearray(__ZK_BUFFER_SIZE__)
+        view = memoryview(buffer)
+        received = 0
+        deadline = loop.time() + read_timeout
+        while received < len(buffer):
+            size = await asyncio.wait_for(
+                loop.sock_recv_into(sock, view[received:]),
+                deadline - loop.time(),
+            )
+            if size == 0:
+                break
+            received += size
+        return bytes(view[:received])
+    finally:
+        sock.close()
+
+
+def parse_zk_status(reply: str) -> Dict[str, Any]:
+    """Extracts mode, latency and zxid from a `srvr` or `mntr` reply.
+
+    Returns:
+        {
+            'mode': leader, follower, standalone or None,
+            'latency': {'min': float, 'avg': float, 'max': float} or None,
+            'zxid': int or None,
+        }
+    """
+
+    status: Dict[str, Any] = {"mode": None, "latency": None, "zxid": None}
+
+    if reply.startswith("zk_"):
+        # mntr replies are tab separated key/value lines.
+        values = dict(
+            line.split("\t", 1) for line in reply.splitlines() if "\t" in line
+        )
+        status["mode"] = values.get("zk_server_state")
+        if "zk_avg_latency" in values:
+            status["latency"] = {
+                "min": float(values.get("zk_min_latency", 0)),
+                "avg": float(values["zk_avg_latency"]),
+                "max": float(values.get("zk_max_latency", 0)),
+            }
+        if "zk_zxid" in values:
+            status["zxid"] = int(values["zk_zxid"], 0)
+        return status
+
+    match = _SRVR_PATTERNS["mode"].search(reply)
+    if match:
+        status["mode"] = match.group(1)
+    match = _SRVR_PATTERNS["latency"].search(reply)
+    if match:
+        status["latency"] = dict(zip(("min", "avg", "max"), map(float, match.groups())))
+    match = _SRVR_PATTERNS["zxid"].search(reply)
+    if match:
+        status["zxid"] = int(match.group(1), 16)
+    return status
+
+
+async def _probe_zookeeper_node(
+        host: str,
+        port: int,
+        command: bytes,
+        connect_timeout: float,
+        read_timeout: float,
+) -> Dict[str, Any]:
+    status: Dict[str, Any] = {"host": host, "error": None}
+    try:
+        reply = await _four_letter_word(host, port, command, connect_timeout, read_timeout)
+    except asyncio.TimeoutError:
+        status.update(parse_zk_status(""))
+        status["error"] = "timed out"
+    except OSError as e:
+        status.update(parse_zk_status(""))
+        status["error"] = str(e)
+    else:
+        status.update(parse_zk_status(reply.decode("utf-8", errors="replace")))
+    return status
+
+
+async def _probe_zookeeper(
+        hosts: List[str],
+        port: int,
+        command: bytes,
+        connect_timeout: float,
+        read_timeout: float,
+) -> List[Dict[str, Any]]:
+    return list(await asyncio.gather(*(
+        _probe_zookeeper_node(host, port, command, connect_timeout, read_timeout)
+        for host in hosts
+    )))
+
+
+def probe_zookeeper(
+        hosts: List[str],
+        port: int = 2181,
+        command: bytes = b"srvr",
+        connect_timeout: float = __CONNECT_TIMEOUT__,
+        read_timeout: float = __READ_TIMEOUT__,
+) -> List[Dict[str, Any]]:
+    """Queries every ZooKeeper node of the ensemble in parallel.
+
+    Args:
+        hosts: ZooKeeper node addresses
+        port: ZooKeeper client port
+        command: four letter word to send, b"srvr" or b"mntr"
+        connect_timeout: seconds allowed to establish each connection
+        read_timeout: seconds allowed to read each complete reply
+
+    Returns:
+        One status per host in the order of hosts, as returned by
+        parse_zk_status plus 'host' and 'error'. Unreachable or slow nodes
+        have an error message and no mode instead of blocking the probe.
+    """
+
+    if not hosts:
+        return []
+    return asyncio.run(
+        _probe_zookeeper(hosts, port, command, connect_timeout, read_timeout)
+    )
 
-    body = b""
-    while True:
-        data = sock.recv(__BLOCK_SIZE__)
-        if len(data) == 0:
-            break
-        body += data
 
-    sock.close()
+def find_zookeeper_leader(statuses: List[Dict[str, Any]]) -> Optional[str]:
+    """Returns the host of the first status reporting leader mode, if any."""
 
-    return body
+    for status in statuses:
+        if status["mode"] == "leader":
+            return status["host"]
+    return None
@@ -0,0 +1,98 @@
+"""Pooled SSH connections used to probe the roles of landscape nodes."""
+
+import threading
+from pathlib import Path
+from typing import Dict, Optional, Tuple, Union
+
+from paramiko import SSHClient, RSAKey, AutoAddPolicy
+
+_PathLike = Union[str, Path]
+
+
+class SSHPool:
+    """Keeps at most one SSH connection per host for the lifetime of a run.
+
+    The private key is parsed once when the pool is created, connections are
+    opened lazily on first use and closed by `close` or when leaving the
+    context manager. Command results are memoized per (host, command) so later
+    steps of the same run can reuse them without another round-trip.
+
+    A budget semaphore shared by several pools bounds the number of SSH
+    commands they run at the same time.
+    """
+
+    def __init__(
+            self,
+            ssh_user: str,
+            ssh_priv_key: _PathLike,
+            ssh_port: int = 22,
+            budget: Optional[threading.Semaphore] = None,
+    ) -> None:
+        self._ssh_user = ssh_user
+        self._ssh_port = ssh_port
+        self._priv_key = RSAKey.from_private_key_file(str(ssh_priv_key))
+        self._clients: Dict[str, SSHClient] = {}
+        self._host_locks: Dict[str, threading.Lock] = {}
+        self._results: Dict[Tuple[str, str], Tuple[int, str]] = {}
+        self._lock = threading.Lock()
+        self._budget = budget
+
+    def __enter__(self) -> "SSHPool":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def _host_lock(self, host: str) -> threading.Lock:
+        with self._lock:
+            return self._host_locks.setdefault(host, threading.Lock())
+
+    def _client(self, host: str) -> SSHClient:
+        # Callers hold the host lock, so a host is never connected twice.
+        client = self._clients.get(host)
+        if client is None:
+            client = SSHClient()
+            client.set_missing_host_key_policy(AutoAddPolicy())
+            try:
+                client.connect(host, self._ssh_port, self._ssh_user, pkey=self._priv_key)
+            except BaseException:
+                # Only connected clients are pooled, a failed one would leak its transport.
+                client.close()
+                raise
+            with self._lock:
+                self._clients[host] = client
+        return client
+
+    def _exec(self, host: str, command: str) -> Tuple[int, str]:
+        _, stdout, _ = self._client(host).exec_command(command)
+        output = stdout.read().decode("utf-8")
+        return stdout.channel.recv_exit_status(), output
+
+    def run(self, host: str, command: str) -> Tuple[int, str]:
+        """Runs a command on the host over its pooled connection.
+
+        Commands on the same host are serialized, different hosts can be
+        probed concurrently from several threads.
+
+        Returns:
+            The exit status and the decoded stdout of the command.
+        """
+
+        key = (host, command)
+        with self._host_lock(host):
+            if key not in self._results:
+                if self._budget is None:
+                    self._results[key] = self._exec(host, command)
+                else:
+                    with self._budget:
+                        self._results[key] = self._exec(host, command)
+            return self._results[key]
+
+    def close(self) -> None:
+        """Closes every pooled connection, memoized results are kept."""
+
+        with self._lock:
+            clients = list(self._clients.values())
+            self._clients.clear()
+        for client in clients:
+            client.close()
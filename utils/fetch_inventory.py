@@ -1,7 +1,8 @@
-import copy
 import argparse
 import json
 
+from apimrt.inventory import inv_sections
+
 def arg_parser():
     # Initialize parser
     parser = argparse.ArgumentParser()
@@ -14,28 +15,6 @@ def arg_parser():
     # Return arguments from command line
     return parser.parse_args()
 
-def inv_to_dict(args):
-    # inv to dict code block
-    value = []
-    flag = 0
-    inv = {}
-
-    with open(args.inv, 'r') as file:
-        data = file.read()
-
-    for d in data.split("\n"):
-        if "[" in d:
-            if flag != 0:
-                inv[key] = copy.deepcopy(value)
-                value.clear()
-            key = d.replace("[", "").replace("]", "")
-            flag = 1
-        else:
-            if d != '':
-                value.append(d)
-    inv[key] = value
-    return inv
-
 def write_inventory_to_context(inventory, args):
     with open(f'{args.path}/inventory.json', 'w') as file:
         file.write(json.dumps(inventory))
@@ -47,7 +26,7 @@ def write_component_inventory_to_context(args, inv):
 
 def main():
     args = arg_parser()
-    inv = inv_to_dict(args)
+    inv = inv_sections(args.inv)
     write_inventory_to_context(inv, args)
     write_component_inventory_to_context(args, inv)    
 
@@ -1,8 +1,6 @@
 from apimrt.common_cloud.utils.commcloud_utils import get_cloud_obj
+from apimrt.secrets import materialize
 import argparse
-import json
-import yaml
-from os import path
 
 
 def arg_parse():
@@ -21,28 +19,13 @@ def arg_parse():
     # Read arguments from command line
     return parser.parse_args()
 
-def alter_secrets(data):
-    input_file = path.abspath(path.join(__file__,'..', 'config/secrets_key_mapping.yml'))
-    with open(input_file, 'r') as file:
-        alter_data = yaml.safe_load(file)
-        for k,v in alter_data.items():
-            for i in v:
-                if i in data.keys():
-                    temp = data[i]
-                    del data[i]
-                    data[k] = temp
-    return data
-    
 
 def main():
+    # Kept for older pipelines, `apimrt secrets materialize` writes the same
+    # JSON plus the env and per-component files from a single fetch.
     arg = arg_parse()
     cloud_obj = get_cloud_obj()
-    data = cloud_obj.get_secrets()
-
-    data = alter_secrets(data)
-
-    with open(arg.output_file, 'w') as file:
-        json.dump(data, file)
+    materialize(cloud_obj.get_secrets(), output_file=arg.output_file)
 
 
 
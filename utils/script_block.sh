@@ -21,10 +21,10 @@ action_init(){
     iac get-config -d landscape-config -p credentials.cert_file_prop.private_key > /tmp/ssh-private-key
     cp /tmp/ssh-private-key /tmp/ssh-private-key-ansible
     sudo chmod 600 /tmp/ssh-private-key
-    create_directories_on_ansible_node /home/concourseci/scripts/${IAC_DEPLOYMENT_NAME}/${1} /home/concourseci/scripts/${IAC_DEPLOYMENT_NAME}/${1}/inputs /home/concourseci/scripts/${IAC_DEPLOYMENT_NAME}/${1}/outputs /home/concourseci/scripts/${IAC_DEPLOYMENT_NAME}/${1}/utils
-    copy_files_to_ansible_node ${IAC_PRODUCT_DIR}/components/landscape-config/scripts/*,/home/concourseci/scripts/${IAC_DEPLOYMENT_NAME}/${1}/utils ${IAC_COMPONENT_DIR}/scripts/*,/home/concourseci/scripts/${IAC_DEPLOYMENT_NAME}/${1} /tmp/ssh-private-key-ansible,/tmp/ssh-private-key
-    run_command_on_ansible_node "sudo chmod 700 /tmp/ssh-private-key"
-    run_command_on_ansible_node "sudo touch /home/concourseci/scripts/${IAC_DEPLOYMENT_NAME}/${1}/outputs/concourse_check.txt"
+    transfer_to_ansible_node \
+        "mkdir -p /home/concourseci/scripts/${IAC_DEPLOYMENT_NAME}/${1} /home/concourseci/scripts/${IAC_DEPLOYMENT_NAME}/${1}/inputs /home/concourseci/scripts/${IAC_DEPLOYMENT_NAME}/${1}/outputs /home/concourseci/scripts/${IAC_DEPLOYMENT_NAME}/${1}/utils" \
+        "sudo chmod 700 /tmp/ssh-private-key && sudo touch /home/concourseci/scripts/${IAC_DEPLOYMENT_NAME}/${1}/outputs/concourse_check.txt" \
+        ${IAC_PRODUCT_DIR}/components/landscape-config/scripts/*,/home/concourseci/scripts/${IAC_DEPLOYMENT_NAME}/${1}/utils ${IAC_COMPONENT_DIR}/scripts/*,/home/concourseci/scripts/${IAC_DEPLOYMENT_NAME}/${1} /tmp/ssh-private-key-ansible,/tmp/ssh-private-key
     check_state_dir
     install_apimrt_utils
     push_secrets
@@ -154,11 +154,12 @@ setup_python_env(){
 }
 
 push_secrets(){
-    run_command_on_ansible_node "set -o pipefail && sudo ${python_path} /home/concourseci/scripts/${IAC_DEPLOYMENT_NAME}/${uuid}/utils/utils/get_secrets.py -o /home/concourseci/scripts/${IAC_DEPLOYMENT_NAME}/${uuid}/inputs/secrets.json"
-
-    # run_command_on_ansible_node "set -o pipefail && python3 /home/concourseci/scripts/${IAC_DEPLOYMENT_NAME}/${uuid}/utils/utils/get_secrets.py -o /home/concourseci/scripts/${IAC_DEPLOYMENT_NAME}/${uuid}/inputs/secrets.json"
-
-    run_command_on_ansible_node "sudo chmod 777 /home/concourseci/scripts/${IAC_DEPLOYMENT_NAME}/${uuid}/inputs/secrets.json"
+    #Fetches the secrets once and writes secrets.json, secrets.env and inputs/secrets/<component>_secrets.json, readable only by concourseci
+    inputs_dir=/home/concourseci/scripts/${IAC_DEPLOYMENT_NAME}/${uuid}/inputs
+    run_command_on_ansible_node "set -o pipefail && sudo ${python_path} -m apimrt.main secrets materialize -o ${inputs_dir}/secrets.json -e ${inputs_dir}/secrets.env -d ${inputs_dir}/secrets && \
+        sudo chown -R concourseci: ${inputs_dir}/secrets.json ${inputs_dir}/secrets.env ${inputs_dir}/secrets"
+    #Commands run on the ansible node read the secrets from this file instead of fetching them again
+    export APIMRT_SECRETS_FILE=${inputs_dir}/secrets.json
 }
 
 get_secret_value(){
@@ -306,7 +307,7 @@ copy_files_to_ansible_node(){
         then
             scp -P ${ssh_port} -o StrictHostKeyChecking=no -o UserKnownHostsFile=/dev/null -r -i /tmp/ssh-private-key  $source concourseci@$(get_ansible_ip):$destination
         else
-            if [ ${IAC_ACTION_NAME} == "inventory_generation" ] || [ ${IAC_ACTION_NAME} == "silent-config" ] || [ ${IAC_ACTION_NAME} == "pre-validation" ] || [ ${IAC_ACTION_NAME} == "post-validation" ] || [ ${IAC_ACTION_NAME} == "validation" ] || [ ${IAC_ACTION_NAME} == "post-action" ]
+            if is_script_copy_optional
             then
                 echo "Note: Skipping script copying for ${IAC_ACTION_NAME}"
             else
@@ -317,8 +318,47 @@ copy_files_to_ansible_node(){
     done
 }
 
+is_script_copy_optional(){
+    [ ${IAC_ACTION_NAME} == "inventory_generation" ] || [ ${IAC_ACTION_NAME} == "silent-config" ] || [ ${IAC_ACTION_NAME} == "pre-validation" ] || [ ${IAC_ACTION_NAME} == "post-validation" ] || [ ${IAC_ACTION_NAME} == "validation" ] || [ ${IAC_ACTION_NAME} == "post-action" ]
+}
+
+install_apimrt_on_worker(){
+    #Installs apimrt on the concourse worker from the wheel shipped with the landscape-config scripts
+    #Only the dependencies of apimrt transfer are installed, not the cloud SDKs and the other requirements
+    python3 -c "import apimrt.transfer, paramiko, cliff" > /dev/null 2>&1 && return 0
+    echo "Installing apimrt utils package on the worker..."
+    python3 -m pip install --user --quiet --no-deps "${IAC_PRODUCT_DIR}/components/landscape-config/scripts/apimrt_utils/dist/apimrt-1.0.0-py3-none-any.whl" && \
+        python3 -m pip install --user --quiet paramiko "cliff==3.10.1" && \
+        python3 -c "import apimrt.transfer, paramiko, cliff" > /dev/null 2>&1
+}
+
+transfer_to_ansible_node(){
+    #transfer_to_ansible_node arg1=command run before copying arg2=command run after copying arg3..=source,destination pairs
+    #Uses a single SSH connection through apimrt transfer, installing it on the worker when needed
+    #Both apimrt transfer and scp -r copy the files symlinks point to, not the symlinks
+    pre_command=$1
+    post_command=$2
+    shift 2
+    if install_apimrt_on_worker
+    then
+        allow_missing=""
+        if is_script_copy_optional
+        then
+            allow_missing="--allow_missing"
+        fi
+        echo "Transferring files to ansible node : $*"
+        python3 -m apimrt.main transfer -H $(get_ansible_ip) -p ${ssh_port} -k /tmp/ssh-private-key ${allow_missing} --pre "${pre_command}" --post "${post_command}" "$@"
+        check_exit_status $? "Transferring files: $* to ansible"
+    else
+        echo "WARNING: apimrt could not be installed on the worker, copying with one ssh/scp call per step" >&2
+        run_command_on_ansible_node "${pre_command}"
+        copy_files_to_ansible_node $*
+        run_command_on_ansible_node "${post_command}"
+    fi
+}
+
 run_command_on_ansible_node(){
-    ssh -o StrictHostKeyChecking=no -o UserKnownHostsFile=/dev/null -i /tmp/ssh-private-key  concourseci@$(get_ansible_ip) -p ${ssh_port} "set -o pipefail && ${1}"
+    ssh -o StrictHostKeyChecking=no -o UserKnownHostsFile=/dev/null -i /tmp/ssh-private-key  concourseci@$(get_ansible_ip) -p ${ssh_port} "set -o pipefail && ${APIMRT_SECRETS_FILE:+export APIMRT_SECRETS_FILE=${APIMRT_SECRETS_FILE} && }${1}"
     check_exit_status $? "Command execution on ansible failed : Command: $1"
 }
 
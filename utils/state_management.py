@@ -1,17 +1,88 @@
 import os
+import sys
 import json
+import fcntl
+import argparse
+import tempfile
 import subprocess
 
 
+LANDSCAPE_TYPES = {"aws": 0, "azure": 1, "gcp": 2, "alibaba": 3}
+
+
+class StateStore:
+    """Locked read-modify-write transaction on one state.json file.
+
+    The directory of the file is locked with flock for the whole transaction,
+    so concurrent jobs serialize instead of overwriting each other, and no lock
+    file is left in the state tree. All keys set in the transaction are written
+    at once through an atomic rename when the block exits without an error.
+
+        with StateStore(path) as state:
+            state.set_many({"key": "value"})
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.data = {}
+        self._lock_fd = None
+        self._dirty = False
+
+    def __enter__(self):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        self._lock_fd = os.open(os.path.dirname(self.path) or ".", os.O_RDONLY)
+        try:
+            fcntl.flock(self._lock_fd, fcntl.LOCK_EX)
+            if os.path.isfile(self.path):
+                with open(self.path, 'r') as file:
+                    self.data = json.loads(file.read() or "{}")
+        except BaseException:
+            # __exit__ is not called when __enter__ fails.
+            fcntl.flock(self._lock_fd, fcntl.LOCK_UN)
+            os.close(self._lock_fd)
+            raise
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        try:
+            if exc_type is None and self._dirty:
+                self._write()
+        finally:
+            fcntl.flock(self._lock_fd, fcntl.LOCK_UN)
+            os.close(self._lock_fd)
+
+    def _mode(self):
+        # The mode of the existing file, else what open() would create.
+        if os.path.isfile(self.path):
+            return os.stat(self.path).st_mode & 0o7777
+        umask = os.umask(0)
+        os.umask(umask)
+        return 0o666 & ~umask
+
+    def _write(self):
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(self.path) or ".", prefix=".state-")
+        try:
+            os.chmod(tmp_path, self._mode())
+            with os.fdopen(fd, 'w') as file:
+                file.write(json.dumps(self.data, indent=4))
+                file.flush()
+                os.fsync(file.fileno())
+            os.replace(tmp_path, self.path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+    def __contains__(self, key):
+        return key in self.data
+
+    def set_many(self, values):
+        self.data.update(values)
+        self._dirty = self._dirty or bool(values)
+
+
 class landscapestate:
     def __init__(self) -> None:
-        pass
-
-    def key_exists_in_state_file(self, key, path):
-        with open(path, 'r') as file:
-            data=json.loads(file.read())
-        return key in data.keys()
-        
+        self._landscape_type = None
 
     def run_command(self, command):
         command=command.split()
@@ -21,15 +92,17 @@ class landscapestate:
         else:
             return result.stdout.decode().strip()
 
+    @property
+    def landscape_type(self):
+        # iac get-config is only spawned once per run.
+        if self._landscape_type is None:
+            landscape_type = self.run_command("iac get-config -i landscape -p landscape.type")
+            self._landscape_type = "alibaba" if landscape_type == "ali" else landscape_type
+        return self._landscape_type
+
     def fetch_key(self, key_list):
-        landscape_type=self.run_command("iac get-config -i landscape -p landscape.type")
-        landscape={"aws": 0, "azure": 1, "gcp": 2, "alibaba": 3}
-        return key_list.split(",")[landscape[landscape_type]]
-        
-
-    def check_state_file_exists(self, file_path):
-        return bool(os.path.exists(file_path) and os.path.isfile(file_path))
-    
+        return key_list.split(",")[LANDSCAPE_TYPES[self.landscape_type]]
+
     def take_user_input(self, key, path):
         flag=True
         while flag:
@@ -40,42 +113,63 @@ class landscapestate:
                 flag=False
         return value
 
-    def write_to_state_file(self, data, path):
-        with open(path, 'w') as file:
-            file.write(data)
-
-    def set_state_key(self, key, path):
-        with open(path, 'r') as file:
-            data=json.loads(file.read())
-        value = self.take_user_input(key, path)
-        data[key]=value
-        self.write_to_state_file(json.dumps(data, indent=4), path)
-
-    def set_state_file_and_key(self, key, path):
-        value = self.take_user_input(key, path)
-        data={key: value}
-        os.makedirs(os.path.dirname(path), exist_ok=True)
-        self.write_to_state_file(json.dumps(data, indent=4), path)
+    def set_missing_keys(self, entries, root_path, interactive=True):
+        """Sets every state key of the input entries that is not present yet.
+
+        Entries map a comma separated key list (aws,azure,gcp,alibaba) to either
+        the state file path or {"path": ..., "value": ...}. Values missing from
+        the input are prompted for in interactive mode. Each state file is read
+        once and written once, under its lock.
+
+        Returns the keys that are missing and have no value in non-interactive mode.
+        """
+        pending = {}
+        for key_list, entry in entries.items():
+            if isinstance(entry, str):
+                entry = {"path": entry}
+            path = os.path.join(root_path, entry["path"])
+            pending.setdefault(path, {})[self.fetch_key(key_list)] = entry.get("value")
+
+        unresolved = []
+        for path, values in pending.items():
+            with StateStore(path) as state:
+                missing = {key: value for key, value in values.items() if key not in state}
+            for key, value in missing.items():
+                if value is None and interactive:
+                    missing[key] = self.take_user_input(key, path)
+                elif value is None:
+                    unresolved.append(f"{key} in {path}")
+            missing = {key: value for key, value in missing.items() if value is not None}
+            if not missing:
+                continue
+            with StateStore(path) as state:
+                # Keys written by a concurrent job while prompting are kept.
+                state.set_many({key: value for key, value in missing.items() if key not in state})
+        return unresolved
+
+
+def arg_parser():
+    parser = argparse.ArgumentParser(description="Sets missing keys in the landscape state files")
+    parser.add_argument("-i", "--input", default="./inputs/state_management_data.json",
+                        help="State management input file")
+    parser.add_argument("-r", "--root", default=os.path.abspath("./../../../../../../"),
+                        help="Landscape root the state file paths are relative to")
+    parser.add_argument("-n", "--non-interactive", action="store_true",
+                        help="Take values only from the input file and fail on missing ones instead of prompting")
+    return parser.parse_args()
 
 
 def main():
-    LANDSCAPE_ROOT_PATH = os.path.abspath("./../../../../../../")
+    args = arg_parser()
     ls=landscapestate()
-    #change the file location here 
-    with open("./inputs/state_management_data.json", 'r') as file:
+    with open(args.input, 'r') as file:
         input_data = json.loads(file.read())
 
-    for k,path in input_data.items():
-        key=ls.fetch_key(k)
-        if ls.check_state_file_exists(f"{LANDSCAPE_ROOT_PATH}/{path}"):
-            if not ls.key_exists_in_state_file(key, f"{LANDSCAPE_ROOT_PATH}/{path}"):
-                ls.set_state_key(key,f"{LANDSCAPE_ROOT_PATH}/{path}")
-        else:
-            ls.set_state_file_and_key(key,f"{LANDSCAPE_ROOT_PATH}/{path}")
-            
-
-
+    unresolved = ls.set_missing_keys(input_data, args.root, interactive=not args.non_interactive)
+    if unresolved:
+        print(f"No value provided for: {', '.join(unresolved)}")
+        sys.exit(1)
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,95 @@
+import copy
+import json
+import os
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+sys.path.insert(0, str(Path(__file__).resolve().parents[2] / 'apimrt_utils'))
+
+import fetch_inventory  # noqa: E402
+
+INVENTORY = """10.0.0.9
+[ms]
+10.0.0.1 ansible_user=admin region=dc-1
+; a comment
+10.0.0.2 label="first node"  # trailing comment
+
+[router]
+10.0.0.3
+
+[ms:vars]
+ansible_port = 2222
+
+[gateway:children]
+router
+ms
+[router]
+10.0.0.4
+"""
+
+
+def legacy_inv_to_dict(inv_path):
+    """The section reader fetch_inventory.py used before apimrt.inventory existed."""
+
+    value = []
+    flag = 0
+    inv = {}
+
+    with open(inv_path, 'r') as file:
+        data = file.read()
+
+    for d in data.split("\n"):
+        if "[" in d:
+            if flag != 0:
+                inv[key] = copy.deepcopy(value)
+                value.clear()
+            key = d.replace("[", "").replace("]", "")
+            flag = 1
+        else:
+            if d != '':
+                value.append(d)
+    inv[key] = value
+    return inv
+
+
+class FetchInventoryTestCase(unittest.TestCase):
+
+    def setUp(self):
+        tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp_dir.cleanup)
+        self.tmp_dir = Path(tmp_dir.name)
+        self.inv_path = self.tmp_dir / 'inventory'
+        self.inv_path.write_text(INVENTORY)
+
+    def fetch(self, path):
+        path.mkdir()
+        argv = ['fetch_inventory.py', '-p', str(path), '-i', str(self.inv_path)]
+        with mock.patch.object(sys, 'argv', argv):
+            fetch_inventory.main()
+        return {name: (path / name).read_text() for name in sorted(os.listdir(path))}
+
+    def legacy_fetch(self, path):
+        inv = legacy_inv_to_dict(self.inv_path)
+        path.mkdir()
+        args = mock.MagicMock(path=str(path))
+        fetch_inventory.write_inventory_to_context(inv, args)
+        fetch_inventory.write_component_inventory_to_context(args, inv)
+        return {name: (path / name).read_text() for name in sorted(os.listdir(path))}
+
+    def test_output_is_unchanged(self):
+        written = self.fetch(self.tmp_dir / 'new')
+        self.assertEqual(written, self.legacy_fetch(self.tmp_dir / 'legacy'))
+        self.assertEqual(
+            written['ms_inventory'],
+            '10.0.0.9\n10.0.0.1 ansible_user=admin region=dc-1\n; a comment\n10.0.0.2 label="first node"  # trailing comment',
+        )
+        self.assertEqual(written['ms:vars_inventory'], 'ansible_port = 2222')
+        self.assertEqual(json.loads(written['inventory.json'])['router'], ['10.0.0.4'])
+
+
+if __name__ == '__main__':
+    unittest.main()
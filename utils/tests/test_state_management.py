@@ -0,0 +1,137 @@
+import fcntl
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+import unittest
+from pathlib import Path
+from unittest import mock
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+import state_management  # noqa: E402
+from state_management import StateStore, landscapestate  # noqa: E402
+
+
+class StateStoreTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp_dir.cleanup)
+        self.path = os.path.join(self.tmp_dir.name, 'state', 'network', 'state.json')
+
+    def read(self):
+        with open(self.path) as file:
+            return json.load(file)
+
+    def test_writes_all_keys_at_once(self):
+        with StateStore(self.path) as state:
+            state.set_many({'a': '1'})
+            state.set_many({'b': '2'})
+        self.assertEqual(self.read(), {'a': '1', 'b': '2'})
+        self.assertEqual(os.listdir(os.path.dirname(self.path)), ['state.json'])
+
+    def test_keeps_the_file_on_error(self):
+        with StateStore(self.path) as state:
+            state.set_many({'a': '1'})
+        with self.assertRaises(RuntimeError), StateStore(self.path) as state:
+            state.set_many({'a': '2'})
+            raise RuntimeError()
+        self.assertEqual(self.read(), {'a': '1'})
+
+    def test_releases_the_lock_on_unreadable_file(self):
+        os.makedirs(os.path.dirname(self.path))
+        with open(self.path, 'w') as file:
+            file.write('{"a": ')
+        open_fds = len(os.listdir('/proc/self/fd'))
+        with self.assertRaises(ValueError), StateStore(self.path):
+            pass
+        self.assertEqual(len(os.listdir('/proc/self/fd')), open_fds)
+        fd = os.open(os.path.dirname(self.path), os.O_RDONLY)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        finally:
+            os.close(fd)
+
+    def test_file_mode(self):
+        umask = os.umask(0o022)
+        try:
+            with StateStore(self.path) as state:
+                state.set_many({'a': '1'})
+            self.assertEqual(os.stat(self.path).st_mode & 0o777, 0o644)
+            os.chmod(self.path, 0o640)
+            with StateStore(self.path) as state:
+                state.set_many({'b': '2'})
+            self.assertEqual(os.stat(self.path).st_mode & 0o777, 0o640)
+        finally:
+            os.umask(umask)
+
+    def test_serializes_transactions(self):
+        def add(key):
+            with StateStore(self.path) as state:
+                data = dict(state.data)
+                time.sleep(0.05)
+                state.set_many({**data, key: key})
+
+        threads = [threading.Thread(target=add, args=(key,)) for key in 'abcd']
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(self.read(), {key: key for key in 'abcd'})
+
+
+class SetMissingKeysTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp_dir.cleanup)
+        self.state = landscapestate()
+        self.state._landscape_type = 'azure'
+        self.path = os.path.join(self.tmp_dir.name, 'state', 'network', 'state.json')
+        os.makedirs(os.path.dirname(self.path))
+        with open(self.path, 'w') as file:
+            json.dump({'vnet_id': 'existing'}, file)
+
+    def read(self):
+        with open(self.path) as file:
+            return json.load(file)
+
+    def test_non_interactive(self):
+        entries = {
+            'vpc_id,vnet_id,network,vpc': 'state/network/state.json',
+            'a,b,c,d': {'path': 'state/network/state.json', 'value': 'given'},
+            'e,f,g,h': 'state/network/state.json',
+        }
+        with mock.patch('builtins.input') as user_input:
+            unresolved = self.state.set_missing_keys(entries, self.tmp_dir.name, interactive=False)
+        user_input.assert_not_called()
+        self.assertEqual(unresolved, [f'f in {self.path}'])
+        self.assertEqual(self.read(), {'vnet_id': 'existing', 'b': 'given'})
+
+    def test_interactive(self):
+        entries = {'a,b,c,d': 'state/network/state.json', 'e,f,g,h': 'state/network/state.json'}
+        with mock.patch('builtins.input', side_effect=['first', 'y', 'second', 'y']):
+            with mock.patch.object(state_management, 'StateStore', wraps=StateStore) as store:
+                unresolved = self.state.set_missing_keys(entries, self.tmp_dir.name)
+        self.assertEqual(unresolved, [])
+        self.assertEqual(self.read(), {'vnet_id': 'existing', 'b': 'first', 'f': 'second'})
+        # One read and one write transaction for the file.
+        self.assertEqual(store.call_count, 2)
+
+    def test_main_non_interactive_fails_on_missing_values(self):
+        input_file = os.path.join(self.tmp_dir.name, 'input.json')
+        with open(input_file, 'w') as file:
+            json.dump({'a,b,c,d': 'state/network/state.json'}, file)
+        argv = ['state_management.py', '-n', '-i', input_file, '-r', self.tmp_dir.name]
+        with mock.patch.object(sys, 'argv', argv), mock.patch.object(landscapestate, 'run_command', return_value='ali'):
+            with self.assertRaises(SystemExit) as exit_info:
+                state_management.main()
+        self.assertEqual(exit_info.exception.code, 1)
+        self.assertEqual(self.read(), {'vnet_id': 'existing'})
+
+
+if __name__ == '__main__':
+    unittest.main()